@@ -2,39 +2,222 @@ import streamlit as st
 import openai
 import json
 import time
-from typing import Dict, Any, Optional
+import difflib
+from typing import Dict, Any, Callable, List, Optional
 import os
+import tempfile
+import uuid
+
+from backends import OPENAI_BACKEND, OPENAI_MODELS, ROUTABLE_STEPS, build_router, load_backends
+from batch import iter_jds
+from evaluation import DEFAULT_GOLDEN_SET, run_evaluation, summarize_evaluation
+from export import EXPORT_FORMATS, available_formats, write_export
+from extraction import (
+    EXTRACTION_NAMES,
+    base_info_text,
+    extraction_fingerprint,
+    plan_extraction_chunks,
+    planning_model,
+    planning_window,
+    run_chunked_extractions,
+    run_extractions,
+    run_single_pass_extraction
+)
+from jobs import JOB_DONE, JOB_FAILED, Job, JobRunner
+from neardup import DEFAULT_SIMILARITY_THRESHOLD
+from llm import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_TIMEOUT,
+    DEFAULT_CLIENT_RETRIES,
+    KeyValidationCache,
+    StepRouter,
+    chat_completion,
+    check_api_key,
+    create_client,
+    stream_chat_completion
+)
+from pipeline import estimate_enhancement_plan, fit_enhancement_budget, stream_pipelined
+from prompt_store import PromptStore
+from prompts import (
+    DEFAULT_PROMPT_TEMPLATES,
+    ENHANCEMENT_SYSTEM_PROMPT,
+    PROMPT_NAMES,
+    RESPONSIBILITIES_EXCERPT_TOKENS,
+    STEP1_PROMPT_TEMPLATE,
+    SKILLS_PROMPT_TEMPLATE,
+    RESPONSIBILITIES_PROMPT_TEMPLATE,
+    BASE_INFO_PROMPT_TEMPLATE,
+    step1_prompt_values,
+    extraction_prompt_values,
+    missing_required_slots,
+    render_prompt,
+    responsibilities_excerpt_truncated
+)
+from ratelimit import RateLimiter, client_scope
+from response_cache import ResponseCache
+from run_history import RunHistory, normalize_jd, prompt_version
+from telemetry import TelemetryLog
+from tokens import count_tokens, describe_plan, tokenizer_name
+from workspace import ITEM_DONE, jds_from_upload, run_workspace, split_pasted_jds, unique_ids, workspace_table
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Response cache shared by every session for enhancement and extraction calls
+
+    RESPONSE_CACHE picks the store: a directory (the default), a
+    sqlite:///path or a redis:// URL for caches shared between processes.
+    """
+    return ResponseCache(os.environ.get('RESPONSE_CACHE') or ".response_cache")
+
+THREE_CALL_MODE = "Three calls (parallel)"
+SINGLE_PASS_MODE = "Single pass (one JSON call)"
+
+# History exports are built in memory, spilling to an anonymous temp file past this size;
+# larger downloads are refused in favour of the export command line
+EXPORT_SPOOL_BYTES = 16 * 1024 * 1024
+MAX_EXPORT_DOWNLOAD_BYTES = 200 * 1024 * 1024
+
+# Background jobs: how often the jobs panel polls and how many jobs it lists
+JOB_POLL_INTERVAL = 0.5
+MAX_LISTED_JOBS = 8
+JOB_STATUS_ICONS = {
+    'queued': "🕒",
+    'running': "⏳",
+    'done': "✅",
+    'failed': "❌",
+    'cancelled': "🚫"
+}
+
+EXTRACTION_LABELS = {
+    'base_info': "Base Info",
+    'skills': "Skills",
+    'responsibilities': "Responsibilities"
+}
+STEP_LABELS = {'enhancement': "Enhancement", **EXTRACTION_LABELS}
+
+@st.cache_resource
+def get_key_validation_cache() -> KeyValidationCache:
+    """Shared record of recently accepted/rejected API keys, keyed by key hash"""
+    return KeyValidationCache()
+
+@st.cache_resource
+def get_run_history() -> RunHistory:
+    """Shared SQLite store of finished runs for the history browser and dedup lookups"""
+    return RunHistory("run_history.db")
+
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter:
+    """Per-model request/token budgets shared by every session, learned from rate limit headers"""
+    return RateLimiter()
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_openai_client(api_key: str, max_connections: int, timeout: float) -> openai.OpenAI:
+    """Pooled OpenAI client shared across reruns and sessions for the same key and settings"""
+    # Retries are done by chat_completion so they are counted in telemetry;
+    # every response also tells the validation cache whether the key works.
+    # The rate limiter queues requests and learns budgets from response headers
+    limiter = get_rate_limiter()
+    return create_client(
+        api_key,
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        timeout=timeout,
+        max_retries=0,
+        event_hooks={
+            'request': [limiter.request_hook()],
+            'response': [get_key_validation_cache().response_hook(api_key), limiter.response_hook()]
+        }
+    )
+
+@st.cache_resource
+def get_backends():
+    """The OpenAI API plus OpenAI-compatible backends from backends.json, and any config warnings"""
+    return load_backends("backends.json")
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_backend_client(base_url: str, api_key: str, max_connections: int, timeout: float) -> openai.OpenAI:
+    """Pooled client for an OpenAI-compatible backend, shared across reruns and sessions"""
+    limiter = get_rate_limiter()
+    return create_client(
+        api_key,
+        base_url=base_url,
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        timeout=timeout,
+        max_retries=0,
+        event_hooks={'request': [limiter.request_hook()], 'response': [limiter.response_hook()]}
+    )
+
+def get_session_client():
+    """Shared client for the current session's API key and connection settings
+
+    With steps routed to other backends or models this is a StepRouter over
+    the shared clients, which every pipeline function accepts as a client.
+    """
+    settings = st.session_state.client_settings
+    default_client = get_openai_client(
+        st.session_state.openai_key,
+        settings['max_connections'],
+        settings['timeout']
+    )
+    router = build_router(
+        default_client,
+        get_backends()[0],
+        st.session_state.step_routes,
+        lambda backend: get_backend_client(
+            backend['base_url'], backend['api_key'], settings['max_connections'], settings['timeout']
+        )
+    )
+    return router or default_client
+
+def routed_model(step: str, model: str) -> str:
+    """The model a step's calls go to: its route's, or the sidebar model"""
+    route = st.session_state.step_routes.get(step)
+    return route[1] if route else model
+
+def routed_window(step: str) -> Optional[int]:
+    """The context window configured for a routed step's backend, if any"""
+    route = st.session_state.step_routes.get(step)
+    backend = get_backends()[0].get(route[0]) if route else None
+    return backend.get('context_window') if backend else None
+
+def route_labels() -> Dict[str, str]:
+    """backend/model per routed step; part of fingerprints and run keys so routing changes re-run"""
+    return {step: f"{backend}/{model}" for step, (backend, model) in sorted(st.session_state.step_routes.items())}
+
+@st.cache_resource
+def get_telemetry() -> TelemetryLog:
+    """Shared SQLite log of per-call tokens, latency, retries and cost"""
+    return TelemetryLog("telemetry.db")
+
+def call_options() -> Dict[str, Any]:
+    """Cache, retry and telemetry options shared by every completion call in this session"""
+    return {
+        'cache': get_response_cache(),
+        'bypass_cache': st.session_state.bypass_cache,
+        'max_retries': st.session_state.client_settings['max_retries'],
+        'recorder': get_telemetry().recorder(st.session_state.session_id)
+    }
+
+@st.cache_resource
+def get_prompt_store() -> PromptStore:
+    """Shared in-memory prompt store backed by saved_prompts.json"""
+    return PromptStore("saved_prompts.json")
 
 # File storage functions for prompts
 def save_prompt_to_file(prompt_type: str, prompt_content: str):
-    """Save a prompt to a local JSON file"""
+    """Save a prompt to the prompt store, recording a new version"""
     try:
-        prompts_file = "saved_prompts.json"
-        if os.path.exists(prompts_file):
-            with open(prompts_file, 'r') as f:
-                prompts = json.load(f)
-        else:
-            prompts = {}
-        
-        prompts[prompt_type] = prompt_content
-        
-        with open(prompts_file, 'w') as f:
-            json.dump(prompts, f, indent=2)
-        
+        get_prompt_store().save(prompt_type, prompt_content)
         return True
     except Exception as e:
         st.error(f"Error saving prompt: {str(e)}")
         return False
 
 def load_prompt_from_file(prompt_type: str, default_prompt: str) -> str:
-    """Load a prompt from a local JSON file"""
+    """Load a prompt from the in-memory prompt store"""
     try:
-        prompts_file = "saved_prompts.json"
-        if os.path.exists(prompts_file):
-            with open(prompts_file, 'r') as f:
-                prompts = json.load(f)
-                return prompts.get(prompt_type, default_prompt)
-        return default_prompt
+        return get_prompt_store().get(prompt_type, default_prompt)
     except Exception as e:
         st.error(f"Error loading prompt: {str(e)}")
         return default_prompt
@@ -42,14 +225,53 @@ def load_prompt_from_file(prompt_type: str, default_prompt: str) -> str:
 def reset_prompts_to_default():
     """Reset all prompts to their default values"""
     try:
-        if os.path.exists("saved_prompts.json"):
-            os.remove("saved_prompts.json")
+        if get_prompt_store().reset():
             st.success("✅ All prompts reset to default values!")
         else:
             st.info("ℹ️ No saved prompts found to reset.")
     except Exception as e:
         st.error(f"Error resetting prompts: {str(e)}")
 
+def restore_prompt_version(prompt_type: str, content: str):
+    """Callback: save an earlier version as current and load it into the editor"""
+    if save_prompt_to_file(prompt_type, content):
+        st.session_state[prompt_type] = content
+
+def warn_missing_slots(prompt_type: str, template: str):
+    """Warn when an edited prompt no longer has a slot for its input text"""
+    missing = missing_required_slots(prompt_type, template)
+    if missing:
+        slots = ", ".join("{" + slot + "}" for slot in missing)
+        st.warning(f"⚠️ This prompt has no {slots} placeholder, so the input text will not be included.")
+
+def show_prompt_preview(prompt_type: str, template: str, get_values: Callable[[], Dict[str, str]]):
+    """Render the filled-in prompt only when asked, so reruns never build it"""
+    if st.checkbox("👁️ Preview rendered prompt", key=f"preview_{prompt_type}"):
+        st.code(render_prompt(template, get_values()), language=None)
+
+def show_prompt_history(prompt_type: str):
+    """Show saved versions of a prompt with a button to restore one"""
+    versions = get_prompt_store().history(prompt_type)
+    if not versions:
+        return
+    
+    st.markdown("**🕘 Version History**")
+    by_label = {
+        f"v{entry['version']} — {entry['saved_at']}": entry
+        for entry in reversed(versions)
+    }
+    label = st.selectbox(
+        "Saved versions:",
+        list(by_label),
+        key=f"{prompt_type}_history"
+    )
+    st.button(
+        "↩️ Restore This Version",
+        key=f"restore_{prompt_type}",
+        on_click=restore_prompt_version,
+        args=(prompt_type, by_label[label]['content'])
+    )
+
 # Page configuration
 st.set_page_config(
     page_title="JD Extraction Prompt Tester",
@@ -110,22 +332,76 @@ def initialize_session_state():
             'company_size': '',
             'headquarters': ''
         }
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 1
+    if 'bypass_cache' not in st.session_state:
+        st.session_state.bypass_cache = False
+    if 'near_duplicate_threshold' not in st.session_state:
+        st.session_state.near_duplicate_threshold = DEFAULT_SIMILARITY_THRESHOLD
+    if 'job_runner' not in st.session_state:
+        st.session_state.job_runner = JobRunner()
+    if 'extraction_outputs' not in st.session_state:
+        st.session_state.extraction_outputs = {}
+    if 'extraction_mode_stats' not in st.session_state:
+        st.session_state.extraction_mode_stats = {}
+    if 'pipeline_latency_stats' not in st.session_state:
+        st.session_state.pipeline_latency_stats = {}
+    if 'step_routes' not in st.session_state:
+        st.session_state.step_routes = {}
+    if 'client_settings' not in st.session_state:
+        st.session_state.client_settings = {
+            'max_connections': DEFAULT_MAX_CONNECTIONS,
+            'timeout': DEFAULT_TIMEOUT,
+            'max_retries': DEFAULT_CLIENT_RETRIES
+        }
 
-def validate_openai_key(api_key: str) -> bool:
-    """Validate OpenAI API key by making a test call"""
+def validate_openai_key(api_key: str) -> Optional[bool]:
+    """Validate OpenAI API key with a non-billable models listing; None if it couldn't be checked"""
     try:
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": "Hello"}],
-            max_tokens=5
-        )
-        return True
+        settings = st.session_state.client_settings
+        client = get_openai_client(api_key, settings['max_connections'], settings['timeout'])
+        valid = check_api_key(client)
+        get_key_validation_cache().set(api_key, valid)
+        return valid
     except Exception as e:
-        st.error(f"Invalid OpenAI API key: {str(e)}")
-        return False
+        st.warning(f"⚠️ Couldn't verify the API key: {str(e)}")
+        return None
+
+def show_step_routing():
+    """Choose a backend and model per step; steps left on default use the sidebar model"""
+    backends, warnings = get_backends()
+    for warning in warnings:
+        st.warning(f"⚠️ {warning}")
+    options = [None] + [(name, model) for name, backend in backends.items() for model in backend['models']]
+    routes = {}
+    for step in ROUTABLE_STEPS:
+        choice = st.selectbox(
+            STEP_LABELS[step],
+            options,
+            format_func=lambda option: "Sidebar model" if option is None else f"{option[0]} · {option[1]}",
+            key=f"route_{step}"
+        )
+        if choice is not None:
+            routes[step] = choice
+    st.session_state.step_routes = routes
+    if len(backends) == 1:
+        st.caption(f"Add local or other OpenAI-compatible servers (llama.cpp, vLLM, ...) to backends.json "
+                   f"to route steps to them; only {OPENAI_BACKEND} is configured.")
+
+def show_key_status(api_key: str):
+    """Show the cached validation result for a key, checking it only on request"""
+    # Unknown keys are verified by the first real call instead of a round trip on every edit
+    status = get_key_validation_cache().get(api_key)
+    if status is None:
+        st.caption("🔑 The key will be verified on the first request.")
+        if st.button("🔍 Verify Key Now", use_container_width=True):
+            status = validate_openai_key(api_key)
+    if status is True:
+        st.success("✅ API key validated successfully!")
+    elif status is False:
+        st.error("❌ Invalid API key")
 
 def show_step1_text_enhancement(model: str, temperature: float, max_tokens: int):
     """Step 1: Text Enhancement"""
@@ -136,6 +412,16 @@ def show_step1_text_enhancement(model: str, temperature: float, max_tokens: int)
     You can modify the prompt below to improve the enhancement quality.
     """)
     
+    input_mode = st.radio(
+        "Input:",
+        ["📄 Single JD", "📚 Multiple JDs"],
+        horizontal=True,
+        key="step1_input_mode"
+    )
+    if input_mode == "📚 Multiple JDs":
+        show_workspace_input(model, temperature, max_tokens)
+        return
+    
     # Input area
     st.markdown("### 📥 Input Job Description")
     jd_text = st.text_area(
@@ -144,115 +430,24 @@ def show_step1_text_enhancement(model: str, temperature: float, max_tokens: int)
         placeholder="Paste your job description text here..."
     )
     
+    # Reposts with minor edits can reuse a stored run instead of paying for new calls
+    if jd_text.strip():
+        show_near_duplicates(jd_text, model, temperature, max_tokens)
+    
     # Prompt customization
     st.markdown("### ✏️ Prompt Customization")
     
-    # Company context section
-    company_context_section = f"""
-# MINIMAL COMPANY CONTEXT (FOR ROLE ANALYSIS ONLY):
-Company Information Available (for context only - DO NOT include in output):
-- Name: {st.session_state.company_context['name'] or 'Not specified'}
-- Industry: {st.session_state.company_context['industry'] or 'Not specified'}
-- Size: {st.session_state.company_context['company_size'] or 'Not specified'}
-- Location: {st.session_state.company_context['headquarters'] or 'Not specified'}
-
-CONTEXT APPLICATION RULES:
-1. USE FOR ROLE ANALYSIS ONLY: Use company context only to understand the role better
-2. DO NOT INCLUDE COMPANY INFO: Do not display company information in the enhanced output
-3. FOCUS ON JOB CONTENT: Prioritize and enhance the actual job description content
-4. ROLE-SPECIFIC ENHANCEMENT: Enhance based on what the role actually requires, not company details
-"""
-    
-    # Main prompt
-    main_prompt = f"""You are a professional job description writer and enhancer with expertise in talent acquisition and HR. 
-Extract and significantly enhance the following job description to create a comprehensive, compelling, and precise document.
-
-Your task is to transform this job description into a well-formatted, enhanced text document that covers all the important fields that would typically be in a structured job description. The output should be in PLAIN TEXT format for display in a simple text box.
-
-{company_context_section}
-
-# ENHANCEMENT REQUIREMENTS:
-
-## Format the output as readable plain text covering these sections:
-1. Job Title and Basic Information - Include job title, job code (if any), department, job level, job function, and seniority level
-2. Industry Classification - List the most relevant industries this position belongs to
-3. Experience Requirements - Detail the experience range and qualifications needed
-4. Job Summary - A comprehensive overview of the position
-5. Key Responsibilities - Detailed list of what the person will do
-6. Required Qualifications - Education, experience, and mandatory requirements including college/university preferences
-7. Preferred Qualifications - Nice-to-have qualifications, postgraduate degrees, and field of study preferences
-8. Skills Required - Technical, domain, and soft skills with proficiency levels
-9. Languages and Certifications - Required languages and certifications (if any). If no specific language is mentioned, automatically detect the language of the input text and list it as a required language with "Fluent" proficiency
-10. Work Environment and Arrangements:
-    - Employment type (full-time, part-time, contract)
-    - Workplace type (remote, hybrid, onsite)
-    - Location information
-    - Travel requirements and shift types
-11. Compensation and Benefits (if specified):
-    - Base salary and salary ranges
-    - Benefits package and perks
-    - Relocation assistance and visa sponsorship details
-12. Interview Process (if specified):
-    - Number of interview rounds
-    - Reporting structure and team dynamics
-13. Key Performance Indicators - Success metrics for the role
-
-# DETAILED ENHANCEMENT INSTRUCTIONS:
-
-## IMPORTANT: FOCUS ON JOB CONTENT ONLY
-- DO NOT include company information sections
-- Focus entirely on the job description content and requirements
-- Enhance and structure the actual job-related information
-- Make the output clean, professional, and focused on the role itself
-
-## For ALL fields:
-- Transform vague or generic descriptions into specific, detailed, and meaningful content
-- Use professional, industry-standard terminology and clear language
-- Ensure all content is actionable, measurable, and relevant for candidate evaluation
-- For any fields with no information available, mention "Not specified" or skip the section
-- Remove redundant language and filler content that doesn't add value
-- **CRITICAL: PRESERVE ALL INFORMATION** - Ensure no information from the original job description is lost or omitted. Every detail, requirement, qualification, responsibility, and specification must be included in the enhanced output
-
-## EXCLUSIVE GUIDELINE -
-- Use every single field provided as context or input.
-- Establish a user-based relationship by leveraging all available context.
-- When generating or enhancing the job description, identify and incorporate all context in a logical, coherent flow.
-- Ensure the flow of information justifies the creation or enhancement of the job description.
-- The enhanced job description must contribute to the relevance and accuracy of future candidate searches.
-- Prioritize sub-industry and company context provided by the user for industry tagging. If additional relevant industries are found, add them; if any are missing, note as such.
-
-## JOB TITLE GENERATION (MOST CRITICAL - COMPREHENSIVE ANALYSIS ACROSS ALL PARAMETERS):
-- Generate exactly 4-5 OPTIMAL job titles through COMPREHENSIVE PARAMETER ANALYSIS
-- Analyze ALL parameters: responsibilities, skills, experience level, company industry, company size, company stage, qualifications, and role scope
-- These titles MUST be optimized for LinkedIn matching and cover different ways this role might be advertised across ALL industries
-- Base titles on COMPLETE analysis of job content, company context, and market standards
-
-## IMPORTANT OUTPUT FORMAT:
-- Return ONLY formatted text paragraphs, NOT JSON
-- Use clear section headers with proper formatting
-- Make the text readable and professional with good spacing
-- Include all relevant information in a structured, easy-to-read format
-- Do NOT include any JSON formatting, brackets, or technical syntax
-- The output should be human-readable text suitable for display in a text box
-- For skills: Use format "Skill Name (Proficiency Level)" - NOT JSON objects
-- For all sections: Use bullet points or numbered lists with plain text, not structured data
-- **SPACING**: Add extra line breaks between sections for better readability
-- **SECTION SEPARATION**: Use clear visual separation between major sections
-- **FORMATTING**: Use consistent formatting with proper indentation and spacing
-
-Enhanced Job Description Text:
-{jd_text}
-
-Return only the enhanced job description text in a readable, formatted paragraph structure without any JSON formatting. Focus on the job content, requirements, and responsibilities - do not include company information sections."""
-
+    # Company context and JD text are bound into the template slots at send time
+    step1_values = step1_prompt_values(jd_text, st.session_state.company_context)
+    
     # Display the prompt
     with st.expander("🔍 View/Edit Prompt", expanded=False):
         # Load saved prompt if available
-        saved_prompt = load_prompt_from_file("step1_prompt", main_prompt)
+        saved_template = load_prompt_from_file("step1_prompt", STEP1_PROMPT_TEMPLATE)
         
         edited_prompt = st.text_area(
-            "Prompt (you can edit this):",
-            value=saved_prompt,
+            "Prompt template (you can edit this; {company_context} and {jd_text} are filled in when executed):",
+            value=saved_template,
             height=400,
             key="step1_prompt"
         )
@@ -264,8 +459,41 @@ Return only the enhanced job description text in a readable, formatted paragraph
             else:
                 st.error("❌ Failed to save prompt")
         
-        # Use the edited prompt directly
-        prompt_to_use = edited_prompt
+        show_prompt_history("step1_prompt")
+        
+        warn_missing_slots("step1_prompt", edited_prompt)
+        
+        show_prompt_preview("step1_prompt", edited_prompt, lambda: step1_values)
+    
+    # Streaming renders tokens as they arrive instead of waiting for the full completion
+    stream_output = st.checkbox(
+        "⚡ Stream output as it is generated",
+        value=True,
+        key="stream_step1"
+    )
+    prefetch = st.checkbox(
+        "🔮 Prefetch Step 2 extractions when enhancement finishes",
+        value=False,
+        key="prefetch_step2",
+        help="Runs the three extractions with the current prompts in the background, so Step 2 is ready when you get there"
+    )
+    pipelined = st.checkbox(
+        "🧪 Pipelined (experimental): start base info extraction while Step 1 is still streaming",
+        value=False,
+        key="pipelined_step1",
+        disabled=not stream_output,
+        help="Base info is extracted from the partial text once the sections it reads from have arrived; "
+             "skills and responsibilities follow when the stream ends"
+    ) and stream_output
+    
+    # Pre-flight token budget, counted locally before anything is sent
+    enhancement_model = routed_model('enhancement', model)
+    budget_plan = estimate_enhancement_plan(
+        enhancement_model, edited_prompt, step1_values, max_tokens, routed_window('enhancement')
+    )
+    st.caption(f"🧮 Token budget: {describe_plan(budget_plan)} ({tokenizer_name(enhancement_model)})")
+    if not budget_plan['fits']:
+        st.warning("⚠️ This prompt plus Max Tokens exceeds the model's context window.")
     
     # Execute button
     if st.button("🚀 Execute Text Enhancement", type="primary", use_container_width=True):
@@ -273,40 +501,285 @@ Return only the enhanced job description text in a readable, formatted paragraph
             st.error("Please enter job description text first.")
             return
         
-        with st.spinner("Enhancing job description..."):
-            try:
-                client = openai.OpenAI(api_key=st.session_state.openai_key)
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are a world-class job description enhancement specialist with deep expertise in HR, recruiting, and talent acquisition. Your job is to transform basic job descriptions into comprehensive, precise, and compelling documents focused on the job content itself. DO NOT include company information sections. Focus on enhancing and structuring the actual job requirements, responsibilities, and qualifications. For industry classification, use ONLY actual business sector industries (not job functions) from standard categories. Return only formatted text paragraphs, not JSON. For skills, use format 'Skill Name (Proficiency Level)' not JSON objects."},
-                        {"role": "user", "content": prompt_to_use}
-                    ],
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                
-                enhanced_text = response.choices[0].message.content
-                
-                # Store in session state for step 2
-                st.session_state.enhanced_text = enhanced_text
-                
-                # Display result
-                st.markdown('<h3 class="section-header">✅ Enhanced Job Description</h3>', unsafe_allow_html=True)
-                st.markdown('<div class="result-box">', unsafe_allow_html=True)
-                st.text_area(
-                    "Enhanced Text:",
-                    value=enhanced_text,
-                    height=400,
-                    disabled=True
-                )
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                # Copy button
-                st.button("📋 Copy to Clipboard", on_click=lambda: st.write("Copied!"))
-                
-            except Exception as e:
-                st.error(f"Error during enhancement: {str(e)}")
+        # A JD already processed with the same prompts and settings is answered from history
+        run_templates = {name: current_prompt_template(name) for name in PROMPT_NAMES}
+        if not st.session_state.bypass_cache:
+            stored = get_run_history().find(
+                jd_text, st.session_state.company_context, run_templates, model, temperature, max_tokens,
+                route_labels()
+            )
+            if stored is not None:
+                load_run_into_session(stored)
+                st.success(f"📚 Loaded run #{stored['id']} from history; this JD was already processed "
+                           "with the same prompts and settings, so no API call was made.")
+                show_enhancement_result()
+                return
+        
+        prompt_to_use = render_prompt(edited_prompt, step1_values)
+        try:
+            budget = fit_enhancement_budget(
+                enhancement_model, prompt_to_use, max_tokens, routed_window('enhancement')
+            )
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+            return
+        if budget['warning']:
+            st.warning(f"⚠️ {budget['warning']}")
+        
+        # Pipelined runs extract with the current Step 2 prompts as part of the same job
+        extraction_templates = None
+        if pipelined:
+            extraction_templates = {name: current_prompt_template(f"{name}_prompt") for name in EXTRACTION_NAMES}
+        
+        # Runs off the script thread so navigating or editing doesn't abort it
+        job = st.session_state.job_runner.submit(
+            'enhancement',
+            f"Enhance JD ({enhancement_model})",
+            run_enhancement_job,
+            get_session_client(),
+            model,
+            prompt_to_use,
+            temperature,
+            budget['max_tokens'],
+            stream_output,
+            call_options(),
+            dict(st.session_state.company_context),
+            extraction_templates,
+            meta={
+                'jd_text': jd_text,
+                'company_context': dict(st.session_state.company_context),
+                'template': edited_prompt,
+                'settings': (model, temperature, max_tokens),
+                'prefetch': prefetch and not pipelined,
+                'templates': extraction_templates,
+                'routes': route_labels()
+            }
+        )
+        st.info(f"🧵 Enhancement queued as job {job.id}; you can keep editing while it runs.")
+    
+    show_live(show_enhancement_progress, 'enhancement')
+    show_enhancement_result()
+
+def run_enhancement_job(job: Job, client, model: str, prompt: str, temperature: float,
+                        max_tokens: int, stream: bool, options: Dict[str, Any],
+                        company_context: Optional[Dict[str, str]] = None,
+                        templates: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Background job: run the Step 1 call, streaming partial text into job.progress
+
+    With extraction templates the run is pipelined: Step 2 extractions overlap
+    the stream and their results come back under 'extractions'.
+    """
+    if not stream:
+        result = chat_completion(
+            client, model, ENHANCEMENT_SYSTEM_PROMPT, prompt, temperature, max_tokens,
+            step='enhancement', **options
+        )
+        return {**result, 'streamed': False}
+    
+    stats = {}
+    job.progress['partial'] = ''
+    if templates:
+        deltas = stream_pipelined(
+            client, model, prompt, temperature, max_tokens, stats, templates, company_context, **options
+        )
+    else:
+        deltas = stream_chat_completion(
+            client, model, ENHANCEMENT_SYSTEM_PROMPT, prompt, temperature, max_tokens, stats,
+            step='enhancement', **options
+        )
+    for delta in deltas:
+        job.progress['partial'] += delta
+        job.check_cancelled()
+    return {**stats, 'streamed': True}
+
+def show_near_duplicates(jd_text: str, model: str, temperature: float, max_tokens: int):
+    """Flag stored runs whose JD is a near-duplicate and offer to reuse or diff against them"""
+    history = get_run_history()
+    inputs = {
+        'company_context': st.session_state.company_context,
+        'templates': {name: current_prompt_template(name) for name in PROMPT_NAMES},
+        'model': model,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'routes': route_labels()
+    }
+    matches = history.similar(jd_text, st.session_state.near_duplicate_threshold, inputs=inputs)
+    if not matches:
+        return
+    match = matches[0]
+    if match['differences']:
+        provenance = (f"made with different {', '.join(match['differences'])} "
+                      f"(prompts {match['prompt_version']} vs {prompt_version(inputs['templates'])})")
+    else:
+        provenance = "made with the same prompts and settings"
+    st.warning(
+        f"🔁 This JD is {match['similarity']:.0%} similar to run #{match['id']} "
+        f"({match['job_title'] or 'untitled'}, {match['model']}, {match['created_at']}), {provenance}."
+        + (f" {len(matches) - 1} other near-duplicate(s) found." if len(matches) > 1 else "")
+    )
+    stored = history.get(match['id'])
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        if st.button(f"♻️ Reuse run #{match['id']}", key=f"reuse_run_{match['id']}", use_container_width=True,
+                     help="Load its enhancement and extraction as-is; they were made from its JD, not this one"):
+            load_run_into_session(stored)
+            st.success(f"📚 Loaded run #{match['id']}; its enhancement and extraction are now in Steps 1-3.")
+    with col2:
+        with st.expander(f"🔍 Diff against run #{match['id']}", expanded=False):
+            show_run_diff(stored, jd_text, inputs)
+
+def show_run_diff(stored: Dict[str, Any], jd_text: str, inputs: Dict[str, Any]):
+    """Diff a stored run's JD, enhancement and extraction against this JD and its own outputs
+
+    This JD's outputs come from its run with the current inputs, or for the
+    enhancement from Step 1 in this session, once it has been processed.
+    """
+    label = f"run #{stored['id']}"
+    jd_tab, enhanced_tab, extraction_tab = st.tabs(["JD", "Enhanced text", "Extraction"])
+    with jd_tab:
+        diff = difflib.unified_diff(stored['jd_text'].splitlines(), jd_text.splitlines(), label, "this JD", lineterm='')
+        st.code('\n'.join(diff) or "Only whitespace differs.", language='diff')
+    
+    current = get_run_history().find(
+        jd_text, inputs['company_context'], inputs['templates'], inputs['model'], inputs['temperature'],
+        inputs['max_tokens'], inputs['routes']
+    )
+    enhanced_text = current['enhanced_text'] if current else None
+    session_inputs = st.session_state.get('enhancement_inputs') or {}
+    if enhanced_text is None and normalize_jd(session_inputs.get('jd_text') or '') == normalize_jd(jd_text):
+        enhanced_text = st.session_state.get('enhanced_text')
+    with enhanced_tab:
+        if enhanced_text:
+            diff = difflib.unified_diff(
+                (stored['enhanced_text'] or '').splitlines(), enhanced_text.splitlines(), label, "this JD", lineterm=''
+            )
+            st.code('\n'.join(diff) or "The enhanced texts are identical.", language='diff')
+        else:
+            st.caption("Run Step 1 on this JD to compare its enhancement.")
+    with extraction_tab:
+        if current:
+            diff = difflib.unified_diff(
+                json.dumps(stored['extraction_results'], indent=2, ensure_ascii=False, sort_keys=True).splitlines(),
+                json.dumps(current['extraction_results'], indent=2, ensure_ascii=False, sort_keys=True).splitlines(),
+                label, f"this JD (run #{current['id']})", lineterm=''
+            )
+            st.code('\n'.join(diff) or "The extraction results are identical.", language='diff')
+        else:
+            st.caption("Run Steps 1 and 2 on this JD to compare its extraction.")
+
+def show_workspace_input(model: str, temperature: float, max_tokens: int):
+    """Collect many JDs from uploads or pasted text and run Steps 1-2 on all of them in parallel"""
+    st.markdown("### 📚 Job Description Workspace")
+    st.caption("Each JD runs enhancement and extraction with the current prompts; results appear in Step 3.")
+    
+    uploads = st.file_uploader(
+        "Upload job descriptions (.txt/.md: one JD per file; .jsonl: one JD per line):",
+        type=['txt', 'md', 'jsonl'],
+        accept_multiple_files=True,
+        key="workspace_uploads"
+    )
+    pasted = st.text_area(
+        "...or paste several job descriptions, separated by a line of ---:",
+        height=200,
+        key="workspace_paste"
+    )
+    
+    items = []
+    for upload in uploads or []:
+        try:
+            items.extend(jds_from_upload(upload.name, upload.getvalue().decode('utf-8')))
+        except (UnicodeDecodeError, ValueError) as e:
+            st.error(f"Could not read {upload.name}: {str(e)}")
+    items.extend({'id': f"pasted #{index}", 'text': text}
+                 for index, text in enumerate(split_pasted_jds(pasted), start=1))
+    items = unique_ids([item for item in items if item['text'].strip()])
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(f"📄 {len(items)} job description(s) ready")
+    with col2:
+        concurrency = st.number_input("Parallel JDs", min_value=1, max_value=16, value=4, step=1)
+    reuse_similar = st.checkbox(
+        "♻️ Reuse stored results for near-duplicate JDs",
+        value=False,
+        help=f"JDs at least {st.session_state.near_duplicate_threshold:.0%} similar to a stored run made with the "
+             "same prompts, model and settings are answered from it instead of the API. Near-duplicates are "
+             "labelled in the results either way."
+    )
+    
+    if st.button("🚀 Process All", type="primary", use_container_width=True):
+        if not items:
+            st.error("Please upload or paste at least one job description.")
+            return
+        
+        templates = {name: current_prompt_template(name) for name in PROMPT_NAMES}
+        job = st.session_state.job_runner.submit(
+            'workspace',
+            f"Process {len(items)} JDs ({model})",
+            run_workspace_job,
+            get_session_client(),
+            items,
+            dict(st.session_state.company_context),
+            templates,
+            model,
+            temperature,
+            max_tokens,
+            concurrency,
+            {
+                **call_options(),
+                'history': get_run_history(),
+                'reuse_similar': st.session_state.near_duplicate_threshold,
+                'reuse_stored_similar': reuse_similar
+            }
+        )
+        st.info(f"🧵 Workspace queued as job {job.id}; per-JD progress is shown under Background Jobs.")
+    
+    status = st.session_state.get('workspace_status')
+    if status:
+        kind, message = status
+        getattr(st, kind)(message)
+
+def run_workspace_job(job: Job, client, items: List[Dict[str, Any]], company_context: Dict[str, str],
+                      templates: Dict[str, str], model: str, temperature: float, max_tokens: int,
+                      concurrency: int, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Background job: fan the workspace JDs out over a worker pool, publishing per-JD status"""
+    job.progress['items'] = {}
+    job.progress['results'] = {}
+    job.progress['total'] = len(items)
+    for record in run_workspace(
+        client, items, company_context, templates, model, temperature, max_tokens,
+        concurrency=concurrency, statuses=job.progress['items'],
+        should_stop=lambda: job.cancelled, **options
+    ):
+        job.progress['results'][record['id']] = record
+    order = {item['id']: index for index, item in enumerate(items)}
+    return sorted(job.progress['results'].values(), key=lambda record: order[record['id']])
+
+def show_enhancement_result():
+    """Show the latest finished enhancement with its timing and streaming metrics"""
+    result = st.session_state.get('enhancement_result')
+    if not result:
+        return
+    
+    st.markdown('<h3 class="section-header">✅ Enhanced Job Description</h3>', unsafe_allow_html=True)
+    st.markdown('<div class="result-box">', unsafe_allow_html=True)
+    st.text_area(
+        "Enhanced Text:",
+        value=result['content'],
+        height=400,
+        disabled=True
+    )
+    st.markdown('</div>', unsafe_allow_html=True)
+    st.caption(f"⏱️ {result['elapsed']:.2f}s" + (" (cached)" if result['cached'] else ""))
+    
+    if result['streamed'] and not result['cached']:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Time to first token", f"{result['ttft']:.2f}s" if result['ttft'] is not None else "n/a")
+        col2.metric("Tokens/sec", f"{result['tokens_per_second']:.1f}" if result['tokens_per_second'] else "n/a")
+        col3.metric("Completion tokens", result['completion_tokens'])
+    
+    # Copy button
+    st.button("📋 Copy to Clipboard", on_click=lambda: st.write("Copied!"))
 
 def show_step2_structured_extraction(model: str, temperature: float, max_tokens: int):
     """Step 2: Structured Extraction"""
@@ -331,182 +804,19 @@ def show_step2_structured_extraction(model: str, temperature: float, max_tokens:
         disabled=True
     )
     
+    # Slot values are only computed when a preview or an execution needs them
+    def extraction_values() -> Dict[str, str]:
+        return extraction_prompt_values(st.session_state.enhanced_text, st.session_state.company_context)
+    
     # Skills extraction prompt
     st.markdown("### 🎯 Skills Extraction Prompt")
-    skills_prompt = f"""You are a skill extraction expert. ALWAYS prioritize the job role over company context. Extract skills appropriate for the specific role, not the company's main business. Return ONLY a JSON array.
-
-Job Title: [Extract from text]
-Industry: [Extract from text]
-Experience Level: [Extract from text]
-Company Info: {st.session_state.company_context}
-
-CRITICAL ROLE-BASED SKILL SELECTION RULES:
-1. **MANDATORY ROLE-FIRST APPROACH**: Extract skills appropriate for THIS SPECIFIC ROLE, NOT the company's main business
-2. **FOR UNRELATED ROLES**: Use ONLY standard industry skills for that role, ignore company-specific technologies
-3. **ONLY for DIRECTLY RELATED ROLES**: Integrate relevant company-specific technologies
-4. **VALIDATION**: If role is NOT related to company's main business, company-specific tech skills should NOT appear
-5. **CRITICAL**: Do NOT include advertising, marketing, or tech skills unless the role is directly related to those functions
-
-**EXPLICIT UNRELATED ROLE INSTRUCTIONS - CRITICAL FOR SKILLS GENERATION:**
-- **IF THE ROLE IS UNRELATED TO COMPANY'S MAIN BUSINESS**: 
-  - DO NOT use any company-specific technologies, tools, or platforms mentioned in company context
-  - DO NOT use company's industry-specific skills unless they directly apply to the role
-  - DO NOT use company's proprietary systems or internal tools
-  - DO NOT use company's specific methodologies or frameworks unless they are industry-standard for the role
-  - DO NOT use company's business domain knowledge unless it's directly relevant to the role
-  - **ONLY use standard, industry-appropriate skills for the specific role type**
-  - **IGNORE company context completely for skill selection**
-
-**EXAMPLES OF UNRELATED ROLES:**
-- If company is a tech company but hiring an HR Manager → Use HR skills, NOT tech skills
-- If company is a healthcare company but hiring an Accountant → Use accounting skills, NOT healthcare skills  
-- If company is a finance company but hiring a Marketing Specialist → Use marketing skills, NOT finance skills
-- If company is a manufacturing company but hiring a Sales Representative → Use sales skills, NOT manufacturing skills
-
-**EXAMPLES OF RELATED ROLES:**
-- If company is a tech company hiring a Software Engineer → Use tech skills + company-specific technologies
-- If company is a healthcare company hiring a Nurse → Use healthcare skills + company-specific medical systems
-- If company is a finance company hiring a Financial Analyst → Use finance skills + company-specific financial tools
-
-DOMAIN-SPECIFIC SKILLS (60-70% of skills):
-- Focus on skills that are specific to the role's domain and industry
-- Select skills that professionals in this exact role would list on LinkedIn
-- Avoid generic skills that don't match the role's specific domain
-- Use industry-standard skills for the role's domain
-
-TECHNICAL SKILLS (if relevant, 20-30%):
-- Use standard tool/platform names relevant to the role's domain
-- Use standard methodologies appropriate for the role's industry
-- Use standard technologies that professionals in this role would use
-
-SOFT SKILLS (10-20% maximum):
-- Use common LinkedIn terms appropriate for the role's seniority level
-- Focus on leadership, communication, and management skills relevant to the role
-
-Format:
-   - Return ONLY a JSON array of skill objects
-   - Each object: {{"skill_name": "skill", "skill_type": "technical/domain/soft", "proficiency_level": "Beginner/Intermediate/Advanced/Expert"}}
-   - Order by importance: domain skills first, then technical, soft skills last
-   - No repetition or compound skills
-   - Extract EXACTLY 8-10 skills - no more, no less
-
-Remember: Skills must match what successful professionals in this exact role/industry list on LinkedIn.
-
-Enhanced Job Description Text:
-{st.session_state.enhanced_text}"""
-
-    # Responsibilities extraction prompt
-    st.markdown("### 📋 Responsibilities Extraction Prompt")
-    responsibilities_prompt = f"""You are a LinkedIn talent sourcing expert. Extract EXACTLY 6 responsibilities that match how real professionals describe their work on LinkedIn.
-
-Job Title: [Extract from text]
-Job Description:
-{st.session_state.enhanced_text[:4000]}
-
-CRITICAL RULES FOR LINKEDIN OPTIMIZATION:
-1. Think about the ACTUAL day-to-day work:
-   - For technical roles: Focus on technical tasks, tools used, and team interactions
-   - For business roles: Focus on business impact, client/stakeholder interaction, and deliverables
-   - For manual/operational roles: Focus on physical tasks, equipment operated, and procedures followed
-
-2. Format each responsibility:
-   - Use 3-6 words, action-oriented
-   - Start with strong verbs (e.g., "Lead", "Develop", "Manage", "Implement")
-   - Include measurable outcomes where possible
-   - Use industry-standard terminology
-
-3. AVOID:
-   - Generic responsibilities that could apply to any job
-   - Company-specific jargon or acronyms
-   - Overly detailed or technical descriptions
-   - Responsibilities that don't match the seniority level
-
-4. Structure:
-   - Return ONLY a JSON array of 6 strings
-   - Order by importance (most critical first)
-   - No repetition
-   - Each responsibility should be distinct
-
-Example for a Senior Software Engineer:
-[
-    "Lead backend development team",
-    "Architect cloud infrastructure solutions",
-    "Implement CI/CD automation pipelines",
-    "Mentor junior developers",
-    "Design system architecture",
-    "Optimize application performance"
-]
-
-Example for a Warehouse Operator:
-[
-    "Operate forklift equipment safely",
-    "Manage inventory tracking system",
-    "Load/unload delivery trucks",
-    "Maintain warehouse organization",
-    "Process shipping documentation",
-    "Perform equipment maintenance checks"
-]
-
-Remember: These responsibilities should match what successful professionals in similar roles list on their LinkedIn profiles."""
-
-    # Base info extraction prompt (NEW - matches original system)
-    st.markdown("### 🎯 Base Info Extraction Prompt")
-    base_info_prompt = f"""Extract ONLY these fields from the job description. Return ONLY JSON.
-
-CRITICAL RULES:
-1. Return ONLY a JSON object with these fields: job_title, job_code, job_level, department, job_function, jd_industry, experience_range, job_summary, required_qualifications, seniority_level, location
-2. Use null for missing fields
-3. PROCESS ORDER: First extract experience range, then use that to determine seniority level
-4. For job titles: 4-5 LinkedIn-optimized titles
-5. For jd_industry: CRITICAL ROLE-BASED CLASSIFICATION - Use ONLY industry names from standard categories:
-   **MANDATORY RULE**: Classify based on the ROLE'S industry, NOT the company's industry
-   **VALIDATION**: If role is NOT related to company's main business, the company industry should NOT appear in jd_industry
-   **EXAMPLES OF PROPER INDUSTRIES**: "Software Development", "IT Services and IT Consulting", "Financial Services", "Healthcare", "Manufacturing", "Retail", "Education", "Consulting"
-   **EXAMPLES OF WHAT NOT TO USE**: "Quality Assurance", "Testing", "Development", "Sales", "Marketing" (these are job functions, not industries)
-
-6. For experience: {{min: X, max: Y}} - CRITICAL RULES:
-   - Extract the EXACT minimum years from the job description
-   - If job says "11 years experience" = min: 11, max: 11 (NOT min: 8, max: 11)
-   - If job says "8-11 years experience" = min: 8, max: 11
-   - If job says "5+ years experience" = min: 5, max: based on seniority level
-   - Set MAXIMUM based on seniority level (don't set both min and max to the same value unless job specifies exact years):
-     * Internship: max 1 year
-     * Entry Level: max 3 years
-     * Junior: max 5 years
-     * Junior to Mid: max 7 years
-     * Mid Level: max 10 years
-     * Mid - Senior: max 12 years
-     * Senior Level: max 15 years
-     * CXO: max 20 years
-
-7. For seniority_level: Use EXACTLY these values: Internship/Entry Level/Junior/Junior to Mid/Mid Level/Mid - Senior/Senior Level/CXO
-   - Determine from experience range and job requirements
-   - If experience is 0-1 years: Internship
-   - If experience is 1-3 years: Entry Level
-   - If experience is 3-5 years: Junior
-   - If experience is 5-7 years: Junior to Mid
-   - If experience is 7-10 years: Mid Level
-   - If experience is 10-12 years: Mid - Senior
-   - If experience is 12+ years: Senior Level
-   - If job title contains C-level terms (CEO, CTO, CFO, etc.): CXO
-
-8. For location: Extract ONLY the physical location, not remote/hybrid status
-   - Examples: "San Francisco, CA", "New York, NY", "London, UK"
-   - Do NOT include: "Remote", "Hybrid", "On-site" in location field
-
-Enhanced Job Description Text:
-{st.session_state.enhanced_text}
-
-Return ONLY a valid JSON object with the specified fields."""
-
-    # Display prompts
     with st.expander("🔍 View/Edit Skills Prompt", expanded=False):
         # Load saved prompt if available
-        saved_skills_prompt = load_prompt_from_file("skills_prompt", skills_prompt)
+        saved_skills_template = load_prompt_from_file("skills_prompt", SKILLS_PROMPT_TEMPLATE)
         
         edited_skills_prompt = st.text_area(
-            "Skills Extraction Prompt:",
-            value=saved_skills_prompt,
+            "Skills Extraction Prompt ({company_info} and {enhanced_text} are filled in when executed):",
+            value=saved_skills_template,
             height=300,
             key="skills_prompt"
         )
@@ -518,16 +828,23 @@ Return ONLY a valid JSON object with the specified fields."""
             else:
                 st.error("❌ Failed to save skills prompt")
         
+        show_prompt_history("skills_prompt")
+        
+        warn_missing_slots("skills_prompt", edited_skills_prompt)
+        show_prompt_preview("skills_prompt", edited_skills_prompt, extraction_values)
+        
         # Use the edited prompt directly
         skills_prompt_to_use = edited_skills_prompt
     
+    # Responsibilities extraction prompt
+    st.markdown("### 📋 Responsibilities Extraction Prompt")
     with st.expander("🔍 View/Edit Responsibilities Prompt", expanded=False):
         # Load saved prompt if available
-        saved_responsibilities_prompt = load_prompt_from_file("responsibilities_prompt", responsibilities_prompt)
+        saved_responsibilities_template = load_prompt_from_file("responsibilities_prompt", RESPONSIBILITIES_PROMPT_TEMPLATE)
         
         edited_responsibilities_prompt = st.text_area(
-            "Responsibilities Extraction Prompt:",
-            value=saved_responsibilities_prompt,
+            "Responsibilities Extraction Prompt ({enhanced_text_excerpt} is filled in when executed):",
+            value=saved_responsibilities_template,
             height=300,
             key="responsibilities_prompt"
         )
@@ -539,16 +856,23 @@ Return ONLY a valid JSON object with the specified fields."""
             else:
                 st.error("❌ Failed to save responsibilities prompt")
         
+        show_prompt_history("responsibilities_prompt")
+        
+        warn_missing_slots("responsibilities_prompt", edited_responsibilities_prompt)
+        show_prompt_preview("responsibilities_prompt", edited_responsibilities_prompt, extraction_values)
+        
         # Use the edited prompt directly
         responsibilities_prompt_to_use = edited_responsibilities_prompt
     
+    # Base info extraction prompt
+    st.markdown("### 🎯 Base Info Extraction Prompt")
     with st.expander("🔍 View/Edit Base Info Prompt", expanded=False):
         # Load saved prompt if available
-        saved_base_info_prompt = load_prompt_from_file("base_info_prompt", base_info_prompt)
+        saved_base_info_template = load_prompt_from_file("base_info_prompt", BASE_INFO_PROMPT_TEMPLATE)
         
         edited_base_info_prompt = st.text_area(
-            "Base Info Extraction Prompt:",
-            value=saved_base_info_prompt,
+            "Base Info Extraction Prompt ({enhanced_text} is filled in when executed):",
+            value=saved_base_info_template,
             height=300,
             key="base_info_prompt"
         )
@@ -560,100 +884,633 @@ Return ONLY a valid JSON object with the specified fields."""
             else:
                 st.error("❌ Failed to save base info prompt")
         
+        show_prompt_history("base_info_prompt")
+        
+        warn_missing_slots("base_info_prompt", edited_base_info_prompt)
+        show_prompt_preview("base_info_prompt", edited_base_info_prompt, extraction_values)
+        
         # Use the edited prompt directly
         base_info_prompt_to_use = edited_base_info_prompt
     
+    # Extraction mode
+    extraction_mode = st.radio(
+        "Extraction mode:",
+        [THREE_CALL_MODE, SINGLE_PASS_MODE],
+        horizontal=True,
+        help="Single pass sends the enhanced text once and asks for all three results in one JSON response"
+    )
+    
+    templates = {
+        'base_info': base_info_prompt_to_use,
+        'skills': skills_prompt_to_use,
+        'responsibilities': responsibilities_prompt_to_use
+    }
+    st.caption(
+        f"🧮 Enhanced text: {count_tokens(st.session_state.enhanced_text, model):,} tokens "
+        f"({tokenizer_name(model)}); long text is split into chunks in three-call mode"
+    )
+    if extraction_mode == THREE_CALL_MODE and responsibilities_excerpt_truncated(st.session_state.enhanced_text):
+        st.warning(
+            f"⚠️ Responsibilities are extracted from the first {RESPONSIBILITIES_EXCERPT_TOKENS:,} tokens of "
+            "the enhanced text unless it is long enough to be split into chunks, which are read in full."
+        )
+    
+    # Fingerprints of the current inputs decide what is up to date and which prefetches are stale
+    fingerprints = {
+        name: extraction_fingerprint(
+            name, templates[name], st.session_state.enhanced_text, st.session_state.company_context,
+            route_labels().get(name, model), temperature, max_tokens
+        )
+        for name in EXTRACTION_NAMES
+    }
+    discard_stale_prefetch(fingerprints)
+    
+    # Per-extraction re-run buttons make a fresh call for just that extraction
+    forced = None
+    rerun_columns = st.columns(3)
+    for column, name in zip(rerun_columns, EXTRACTION_NAMES):
+        with column:
+            if st.button(
+                f"🔁 Re-run {EXTRACTION_LABELS[name]}",
+                key=f"rerun_{name}",
+                use_container_width=True,
+                disabled=extraction_mode == SINGLE_PASS_MODE
+            ):
+                forced = name
+    
     # Execute button
-    if st.button("🚀 Execute Structured Extraction", type="primary", use_container_width=True):
-        with st.spinner("Extracting structured data..."):
-            try:
-                client = openai.OpenAI(api_key=st.session_state.openai_key)
-                
-                # Extract base info
-                base_info_response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are a base info extraction expert. Return ONLY a valid JSON object."},
-                        {"role": "user", "content": base_info_prompt_to_use}
-                    ],
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                
-                # Extract skills
-                skills_response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are a skill extraction expert. ALWAYS prioritize the job role over company context. Extract skills appropriate for the specific role, not the company's main business. Return ONLY a JSON array."},
-                        {"role": "user", "content": skills_prompt_to_use}
-                    ],
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                
-                # Extract responsibilities
-                responsibilities_response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are a responsibility extraction expert. Return ONLY a JSON array."},
-                        {"role": "user", "content": responsibilities_prompt_to_use}
-                    ],
-                    temperature=temperature,
-                    max_tokens=max_tokens
+    execute = st.button("🚀 Execute Structured Extraction", type="primary", use_container_width=True)
+    if execute or forced:
+        # Only extractions whose prompt, input text or model parameters changed are re-run
+        previous = st.session_state.extraction_outputs
+        for output in previous.values():
+            # Executing adopts prefetched results; from here on they behave like any other output
+            output.pop('prefetched', None)
+        # Extractions already running with identical inputs (e.g. a prefetch) are waited on, not resent
+        in_flight = {
+            name
+            for job in st.session_state.job_runner.active('extraction')
+            for name in job.meta['to_run']
+            if job.meta['fingerprints'][name] == fingerprints[name]
+        }
+        if forced:
+            to_run = [forced]
+        elif extraction_mode == SINGLE_PASS_MODE:
+            to_run = list(EXTRACTION_NAMES)
+        else:
+            to_run = [
+                name for name in EXTRACTION_NAMES
+                if name not in in_flight and (
+                    name not in previous or previous[name]['error'] or previous[name]['fingerprint'] != fingerprints[name]
                 )
-                
-                # Parse responses
-                base_info_text = base_info_response.choices[0].message.content
-                skills_text = skills_response.choices[0].message.content
-                responsibilities_text = responsibilities_response.choices[0].message.content
-                
-                # Store results
-                st.session_state.extraction_results = {
-                    'base_info': base_info_text,
-                    'skills': skills_text,
-                    'responsibilities': responsibilities_text
+            ]
+        
+        if not to_run and in_flight:
+            st.session_state.extraction_status = ('info', "⏳ Waiting for the extractions already running with these inputs.")
+        elif not to_run:
+            st.session_state.extraction_status = ('info', "♻️ All extractions are up to date; nothing was re-run.")
+        else:
+            options = call_options()
+            if forced:
+                # An explicit re-run asks for a new sample, not the cached response
+                options['bypass_cache'] = True
+            job_templates = templates if extraction_mode == SINGLE_PASS_MODE else {name: templates[name] for name in to_run}
+            job = st.session_state.job_runner.submit(
+                'extraction',
+                f"Extract {', '.join(EXTRACTION_LABELS[name] for name in to_run)} ({model})",
+                run_extraction_job,
+                get_session_client(),
+                extraction_mode,
+                job_templates,
+                st.session_state.enhanced_text,
+                dict(st.session_state.company_context),
+                model,
+                temperature,
+                max_tokens,
+                options,
+                meta={
+                    'mode': extraction_mode,
+                    'to_run': to_run,
+                    'fingerprints': fingerprints,
+                    'templates': templates,
+                    'settings': (model, temperature, max_tokens),
+                    'routes': route_labels()
                 }
-                
-                # Display results
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.markdown("### 🎯 Extracted Base Info")
-                    st.markdown('<div class="result-box">', unsafe_allow_html=True)
-                    st.text_area(
-                        "Base Info:",
-                        value=base_info_text,
-                        height=200,
-                        disabled=True
-                    )
-                    st.markdown('</div>', unsafe_allow_html=True)
-                
-                with col2:
-                    st.markdown("### 🎯 Extracted Skills")
-                    st.markdown('<div class="result-box">', unsafe_allow_html=True)
-                    st.text_area(
-                        "Skills:",
-                        value=skills_text,
-                        height=200,
-                        disabled=True
-                    )
-                    st.markdown('</div>', unsafe_allow_html=True)
-                
-                with col3:
-                    st.markdown("### 📋 Extracted Responsibilities")
-                    st.markdown('<div class="result-box">', unsafe_allow_html=True)
-                    st.text_area(
-                        "Responsibilities:",
-                        value=responsibilities_text,
-                        height=200,
-                        disabled=True
-                    )
-                    st.markdown('</div>', unsafe_allow_html=True)
-                
-                st.success("✅ Structured extraction completed successfully!")
-                
-            except Exception as e:
-                st.error(f"Error during extraction: {str(e)}")
+            )
+            st.session_state.extraction_status = (
+                'info', f"🧵 Extraction queued as job {job.id}; you can keep editing while it runs."
+            )
+    
+    show_live(show_extraction_outputs, 'extraction')
+    
+    show_extraction_mode_comparison()
+    
+    show_pipeline_comparison()
+
+def run_extraction_job(job: Job, client, mode: str, templates: Dict[str, str], enhanced_text: str,
+                       company_context: Dict[str, str], model: str, temperature: float,
+                       max_tokens: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Background job: run the given extractions, publishing each result to job.progress as it lands"""
+    started = time.perf_counter()
+    results = job.progress['results'] = {}
+    job.progress['total'] = len(templates)
+    chunks = 1
+    
+    if mode == SINGLE_PASS_MODE:
+        single_pass = run_single_pass_extraction(
+            client, templates, enhanced_text, company_context, model, temperature, max_tokens,
+            **options
+        )
+        for name in EXTRACTION_NAMES:
+            results[name] = {
+                'name': name,
+                'text': single_pass['texts'].get(name),
+                'data': single_pass['data'].get(name),
+                'repaired': single_pass['repaired'].get(name),
+                'elapsed': single_pass['elapsed'],
+                'cached': single_pass['cached'],
+                'error': None if name in single_pass['data'] else single_pass['error']
+            }
+        call_usages = [single_pass['usage']]
+    else:
+        chunk_list = plan_extraction_chunks(
+            templates, enhanced_text, company_context, planning_model(client, templates, model), max_tokens,
+            planning_window(client, templates, model)
+        )
+        chunks = len(chunk_list)
+        if chunks > 1:
+            extraction_results = run_chunked_extractions(
+                client, templates, chunk_list, company_context, model, temperature, max_tokens,
+                **options
+            )
+        else:
+            # Enhanced text and company context are bound into the template slots at send time
+            prompt_values = extraction_prompt_values(enhanced_text, company_context)
+            prompts = {name: render_prompt(template, prompt_values) for name, template in templates.items()}
+            extraction_results = run_extractions(
+                client, prompts, model, temperature, max_tokens,
+                **options
+            )
+        for result in extraction_results:
+            results[result['name']] = result
+            job.check_cancelled()
+        call_usages = [result['usage'] for result in results.values()]
+    
+    return {
+        'results': dict(results),
+        'wall_clock': time.perf_counter() - started,
+        'call_usages': call_usages,
+        'chunks': chunks
+    }
+
+def apply_enhancement_job(job: Job):
+    """Move a finished enhancement job's output into session state for Step 2"""
+    if job.status != JOB_DONE:
+        return
+    st.session_state.enhanced_text = job.result['content']
+    st.session_state.enhancement_result = job.result
+    st.session_state.enhancement_inputs = job.meta
+    
+    # Prefetches for earlier enhanced text can no longer be used
+    runner = st.session_state.job_runner
+    for active in runner.active('extraction'):
+        if active.meta.get('prefetch'):
+            runner.cancel(active.id)
+    if job.meta.get('prefetch'):
+        submit_extraction_prefetch(job)
+    if job.result.get('extractions'):
+        apply_pipelined_extractions(job)
+
+def apply_pipelined_extractions(job: Job):
+    """Store the Step 2 results a pipelined enhancement produced and time it against the sequential flow"""
+    model, temperature, max_tokens = job.meta['settings']
+    results = job.result['extractions']
+    content = job.result['content']
+    # Base info read the text up to its cutoff, which is current as long as the sections
+    # it reads came out the same in the finished text; otherwise executing Step 2 re-runs it
+    seen = content[:job.result['base_info_chars'] or len(content)]
+    partial = base_info_text(seen) != base_info_text(content)
+    outputs = st.session_state.extraction_outputs = {}
+    for name in EXTRACTION_NAMES:
+        fingerprint = extraction_fingerprint(
+            name, job.meta['templates'][name], seen if name == 'base_info' else content,
+            job.meta['company_context'], job.meta['routes'].get(name, model), temperature, max_tokens
+        )
+        # Flagged like a prefetch, so editing prompts or settings in Step 2 discards them;
+        # out-of-date base info stays until it is re-run
+        outputs[name] = {**results[name], 'fingerprint': fingerprint, 'reused': False,
+                         'prefetched': name != 'base_info' or not partial}
+    st.session_state.extraction_timings = {name: output['elapsed'] for name, output in outputs.items()}
+    st.session_state.extraction_timings['wall_clock'] = job.result['wall_clock'] - job.result['elapsed']
+    st.session_state.pop('extraction_results', None)
+    
+    failed = [name for name in EXTRACTION_NAMES if outputs[name]['error']]
+    if failed:
+        st.session_state.extraction_status = ('error', f"Extraction failed for: {', '.join(failed)}")
+        return
+    st.session_state.extraction_results = {name: outputs[name]['data'] for name in EXTRACTION_NAMES}
+    if not partial:
+        # History answers later runs of the full text, so out-of-date base info isn't stored
+        record_run(job)
+    
+    started = job.result['base_info_started']
+    overlap = (f"base info started {started:.2f}s in, {job.result['elapsed'] - started:.2f}s before the stream ended"
+               if started is not None else "base info waited for the full text")
+    message = f"🧪 Pipelined run finished in {job.result['wall_clock']:.2f}s end to end ({overlap})."
+    if partial:
+        message += (f" Base info read the first {len(seen):,} of {len(content):,} characters, which changed "
+                    "before the stream ended; executing Step 2 re-runs it on the full text.")
+    st.session_state.extraction_status = ('success', message)
+    record_pipeline_latency('pipelined', job.result['wall_clock'], job.result['cached'])
+
+def submit_extraction_prefetch(enhancement_job: Job):
+    """Start all three extractions for fresh Step 1 output so Step 2 is ready on arrival"""
+    model, temperature, max_tokens = enhancement_job.meta['settings']
+    company_context = enhancement_job.meta['company_context']
+    enhanced_text = enhancement_job.result['content']
+    templates = {name: current_prompt_template(f"{name}_prompt") for name in EXTRACTION_NAMES}
+    fingerprints = {
+        name: extraction_fingerprint(
+            name, templates[name], enhanced_text, company_context, route_labels().get(name, model),
+            temperature, max_tokens
+        )
+        for name in EXTRACTION_NAMES
+    }
+    st.session_state.job_runner.submit(
+        'extraction',
+        f"Prefetch extractions ({model})",
+        run_extraction_job,
+        get_session_client(),
+        THREE_CALL_MODE,
+        templates,
+        enhanced_text,
+        dict(company_context),
+        model,
+        temperature,
+        max_tokens,
+        call_options(),
+        meta={
+            'mode': THREE_CALL_MODE,
+            'to_run': list(EXTRACTION_NAMES),
+            'fingerprints': fingerprints,
+            'templates': templates,
+            'settings': (model, temperature, max_tokens),
+            'routes': route_labels(),
+            'prefetch': True,
+            'enhanced_text': enhanced_text
+        }
+    )
+
+def discard_stale_prefetch(fingerprints: Dict[str, str]):
+    """Drop prefetched extractions, running or finished, whose inputs no longer match Step 2"""
+    runner = st.session_state.job_runner
+    for job in runner.active('extraction'):
+        if job.meta.get('prefetch') and job.meta['fingerprints'] != fingerprints:
+            runner.cancel(job.id)
+    outputs = st.session_state.extraction_outputs
+    stale = [
+        name for name, output in outputs.items()
+        if output.get('prefetched') and output['fingerprint'] != fingerprints[name]
+    ]
+    for name in stale:
+        del outputs[name]
+    if stale:
+        st.session_state.pop('extraction_results', None)
+        st.session_state.extraction_status = (
+            'info', "🗑️ Prefetched extractions were discarded because the prompts or settings changed."
+        )
+
+def apply_extraction_job(job: Job):
+    """Store a finished extraction job's results and summarize the run"""
+    prefetch = job.meta.get('prefetch')
+    if prefetch and (job.status != JOB_DONE or job.meta['enhanced_text'] != st.session_state.get('enhanced_text')):
+        # Superseded or cancelled speculative work is dropped silently
+        return
+    if job.status == JOB_FAILED:
+        st.session_state.extraction_status = ('error', f"Error during extraction: {job.error}")
+        return
+    if job.status != JOB_DONE:
+        st.session_state.extraction_status = ('info', f"Extraction job {job.id} was cancelled.")
+        return
+    
+    mode, to_run = job.meta['mode'], job.meta['to_run']
+    results, wall_clock = job.result['results'], job.result['wall_clock']
+    outputs = st.session_state.extraction_outputs
+    for name in outputs:
+        outputs[name]['reused'] = True
+    for name in to_run:
+        outputs[name] = {**results[name], 'fingerprint': job.meta['fingerprints'][name], 'reused': False}
+        if prefetch:
+            outputs[name]['prefetched'] = True
+    st.session_state.extraction_timings = {name: output['elapsed'] for name, output in outputs.items()}
+    st.session_state.extraction_timings['wall_clock'] = wall_clock
+    
+    failed = [name for name in EXTRACTION_NAMES if name in outputs and outputs[name]['error']]
+    if failed:
+        st.session_state.extraction_status = ('error', f"Extraction failed for: {', '.join(failed)}")
+        return
+    if any(name not in outputs for name in EXTRACTION_NAMES):
+        return
+    
+    # Store the parsed, validated objects rather than raw model text
+    st.session_state.extraction_results = {
+        name: outputs[name]['data'] for name in EXTRACTION_NAMES
+    }
+    
+    record_run(job)
+    
+    chunk_note = f" over {job.result['chunks']} chunks" if job.result['chunks'] > 1 else ""
+    if mode == THREE_CALL_MODE and len(to_run) < len(EXTRACTION_NAMES):
+        message = (f"⏱️ Re-ran {', '.join(EXTRACTION_LABELS[name] for name in to_run)} in {wall_clock:.2f}s{chunk_note}; "
+                   "unchanged extractions were reused")
+    elif mode == THREE_CALL_MODE:
+        record_extraction_mode_stats(mode, wall_clock, job.result['call_usages'])
+        sequential = sum(result['elapsed'] for result in results.values())
+        message = f"⏱️ Completed in {wall_clock:.2f}s{chunk_note} (sequential calls would take ~{sequential:.2f}s)"
+        enhancement = st.session_state.get('enhancement_result')
+        if enhancement and enhancement['content'] == st.session_state.enhanced_text:
+            record_pipeline_latency('sequential', enhancement['elapsed'] + wall_clock, enhancement['cached'])
+    else:
+        record_extraction_mode_stats(mode, wall_clock, job.result['call_usages'])
+        message = f"⏱️ Completed in {wall_clock:.2f}s with a single call"
+    if prefetch:
+        message = f"🔮 Prefetched while you were on Step 1. {message}"
+    st.session_state.extraction_status = ('success', message)
+
+def apply_workspace_job(job: Job):
+    """Store a workspace job's per-JD records, keeping what finished before a cancel"""
+    if job.status == JOB_FAILED:
+        st.session_state.workspace_status = ('error', f"Error during workspace run: {job.error}")
+        return
+    records = job.result if job.status == JOB_DONE else list(job.progress.get('results', {}).values())
+    st.session_state.workspace_records = records
+    succeeded = sum(1 for record in records if record['status'] == ITEM_DONE)
+    message = f"✅ Processed {succeeded}/{len(records)} JDs in {job.elapsed:.2f}s; see Step 3 for results."
+    if job.status != JOB_DONE:
+        st.session_state.workspace_status = ('info', f"Workspace job {job.id} was cancelled. {message}")
+    elif succeeded < len(records):
+        st.session_state.workspace_status = ('warning', message)
+    else:
+        st.session_state.workspace_status = ('success', message)
+
+def record_run(job: Job):
+    """Add the completed Step 1 + Step 2 run to the history, if both used the same settings"""
+    inputs = st.session_state.get('enhancement_inputs')
+    if not inputs or inputs['settings'] != job.meta['settings']:
+        return
+    model, temperature, max_tokens = inputs['settings']
+    templates = {'step1_prompt': inputs['template']}
+    templates.update({f"{name}_prompt": job.meta['templates'][name] for name in EXTRACTION_NAMES})
+    timings = dict(st.session_state.extraction_timings)
+    timings['enhancement'] = st.session_state.enhancement_result['elapsed']
+    # Each step is keyed by the route it actually ran on
+    routes = {step: label for step, label in inputs.get('routes', {}).items() if step == 'enhancement'}
+    routes.update({step: label for step, label in job.meta.get('routes', {}).items() if step in EXTRACTION_NAMES})
+    get_run_history().add(
+        inputs['jd_text'], inputs['company_context'], templates, model, temperature, max_tokens,
+        st.session_state.enhanced_text, st.session_state.extraction_results, timings, routes=routes
+    )
+
+def load_run_into_session(run: Dict[str, Any]):
+    """Make a stored run the current Step 1/Step 2 result"""
+    timings = run['timings'] or {}
+    st.session_state.enhanced_text = run['enhanced_text']
+    st.session_state.enhancement_result = {
+        'content': run['enhanced_text'],
+        'elapsed': timings.get('enhancement', 0.0),
+        'cached': True,
+        'streamed': False
+    }
+    st.session_state.enhancement_inputs = {
+        'jd_text': run['jd_text'],
+        'company_context': run['company_context'],
+        'template': run['prompts']['step1_prompt'],
+        'settings': (run['model'], run['temperature'], run['max_tokens'])
+    }
+    st.session_state.extraction_results = run['extraction_results']
+    # No fingerprints: Step 2 re-runs every extraction the next time it is executed
+    st.session_state.extraction_outputs = {
+        name: {
+            'name': name,
+            'text': json.dumps(data, indent=2, ensure_ascii=False),
+            'data': data,
+            'repaired': None,
+            'elapsed': timings.get(name, 0.0),
+            'usage': None,
+            'cached': True,
+            'error': None,
+            'fingerprint': None,
+            'reused': True
+        }
+        for name, data in run['extraction_results'].items()
+    }
+    st.session_state.extraction_timings = {name: timings.get(name, 0.0) for name in EXTRACTION_NAMES}
+    st.session_state.extraction_status = ('info', f"📚 Showing run #{run['id']} from history.")
+
+def apply_finished_jobs() -> bool:
+    """Apply finished jobs to session state, oldest first; True if anything changed"""
+    applied = False
+    for job in reversed(st.session_state.job_runner.jobs()):
+        if not job.finished or job.applied:
+            continue
+        job.applied = True
+        if job.kind == 'enhancement':
+            apply_enhancement_job(job)
+        elif job.kind == 'extraction':
+            apply_extraction_job(job)
+        elif job.kind == 'workspace':
+            apply_workspace_job(job)
+        applied = True
+    return applied
+
+def poll_finished_jobs():
+    """Apply jobs that finished since the last poll and redraw the page if any did"""
+    if apply_finished_jobs():
+        st.rerun()
+
+def show_live(render: Callable[[], None], kind: str):
+    """Render a section as a fragment that re-polls itself while jobs of this kind are running"""
+    polling = JOB_POLL_INTERVAL if st.session_state.job_runner.active(kind) else None
+    st.fragment(run_every=polling)(render)()
+
+def show_enhancement_progress():
+    """Show the text a running enhancement job has streamed so far"""
+    poll_finished_jobs()
+    for job in st.session_state.job_runner.active('enhancement'):
+        partial = job.progress.get('partial')
+        if partial:
+            st.markdown('<h3 class="section-header">⏳ Enhanced Job Description (streaming)</h3>', unsafe_allow_html=True)
+            st.text_area("Enhanced Text (so far):", value=partial, height=400, disabled=True)
+            st.caption(f"{len(partial):,} characters after {job.elapsed:.1f}s")
+        return
+
+def show_extraction_outputs():
+    """Show the latest result per extraction, filling in each column as a running job delivers it"""
+    poll_finished_jobs()
+    running = {}
+    for job in st.session_state.job_runner.active('extraction'):
+        for name in job.meta['to_run']:
+            running.setdefault(name, job)
+    outputs = st.session_state.extraction_outputs
+    if not outputs and not running:
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    columns = {
+        'base_info': (col1, "### 🎯 Extracted Base Info", "Base Info:"),
+        'skills': (col2, "### 🎯 Extracted Skills", "Skills:"),
+        'responsibilities': (col3, "### 📋 Extracted Responsibilities", "Responsibilities:")
+    }
+    for name, (column, header, label) in columns.items():
+        with column:
+            st.markdown(header)
+            arrived = running[name].progress.get('results', {}).get(name) if name in running else None
+            if arrived is not None:
+                show_extraction_result(st.empty(), label, arrived)
+            elif name in running:
+                st.info(f"⏳ Extracting (job {running[name].id})...")
+            elif name in outputs:
+                show_extraction_result(st.empty(), label, outputs[name])
+    
+    status = st.session_state.get('extraction_status')
+    if status:
+        kind, message = status
+        getattr(st, kind)(message)
+
+def show_jobs_panel():
+    """Live status of this session's background jobs, with cancel buttons"""
+    runner = st.session_state.job_runner
+    # Redraw the whole page when a job finishes so the steps pick up the new results
+    poll_finished_jobs()
+    
+    jobs = runner.jobs()
+    if not jobs:
+        return
+    active = [job for job in jobs if not job.finished]
+    with st.expander(f"🧵 Background Jobs ({len(active)} running)", expanded=bool(active)):
+        for job in jobs[:MAX_LISTED_JOBS]:
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.markdown(f"{JOB_STATUS_ICONS[job.status]} **{job.label}** · `{job.id}` · {job.status} · {job.elapsed:.1f}s")
+                if job.error:
+                    st.caption(f"❌ {job.error}")
+                if not job.finished and job.progress.get('partial'):
+                    st.caption(f"✍️ {len(job.progress['partial']):,} characters streamed; the text is shown in Step 1")
+                if not job.finished and job.progress.get('total'):
+                    st.progress(len(job.progress['results']) / job.progress['total'])
+                if not job.finished and job.progress.get('items'):
+                    counts = {}
+                    for item_status in list(job.progress['items'].values()):
+                        counts[item_status] = counts.get(item_status, 0) + 1
+                    st.caption(" · ".join(f"{count} {item_status}" for item_status, count in counts.items()))
+            with col2:
+                if not job.finished and st.button("✖️ Cancel", key=f"cancel_{job.id}"):
+                    runner.cancel(job.id)
+
+def show_extraction_result(placeholder, label: str, result: Dict[str, Any]):
+    """Render one extraction result (or its error) into its column placeholder"""
+    with placeholder.container():
+        if result['error']:
+            st.error(f"Error during extraction: {result['error']}")
+        else:
+            st.markdown('<div class="result-box">', unsafe_allow_html=True)
+            st.text_area(
+                label,
+                value=result['text'],
+                height=200,
+                disabled=True
+            )
+            st.markdown('</div>', unsafe_allow_html=True)
+        if result.get('reused'):
+            st.caption("♻️ Inputs unchanged; previous result reused")
+        else:
+            st.caption(f"⏱️ {result['elapsed']:.2f}s" + (" (cached)" if result['cached'] else ""))
+        if result.get('repaired') == 'local':
+            st.caption("🩹 Output was repaired locally (code fences, prose or trailing commas)")
+        elif result.get('repaired') == 'retry':
+            st.caption("🔁 Output failed validation and was fixed with one repair call")
+
+def record_extraction_mode_stats(mode: str, latency: float, usages: List[Optional[Dict[str, int]]]):
+    """Keep the latest token/latency figures per extraction mode for comparison"""
+    known = [usage for usage in usages if usage]
+    st.session_state.extraction_mode_stats[mode] = {
+        'text_hash': hash(st.session_state.enhanced_text),
+        'calls': len(usages),
+        'latency': latency,
+        'prompt_tokens': sum(usage['prompt_tokens'] for usage in known),
+        'completion_tokens': sum(usage['completion_tokens'] for usage in known),
+        'total_tokens': sum(usage['total_tokens'] for usage in known),
+        'usage_complete': len(known) == len(usages)
+    }
+
+def show_extraction_mode_comparison():
+    """Show token and latency figures for the three-call and single-pass modes side by side"""
+    stats = st.session_state.extraction_mode_stats
+    if not stats:
+        return
+    
+    st.markdown("### ⚖️ Extraction Mode Comparison")
+    col1, col2 = st.columns(2)
+    for column, mode in ((col1, THREE_CALL_MODE), (col2, SINGLE_PASS_MODE)):
+        with column:
+            st.markdown(f"**{mode}**")
+            if mode not in stats:
+                st.caption("Not run yet")
+                continue
+            mode_stats = stats[mode]
+            st.metric("Latency", f"{mode_stats['latency']:.2f}s")
+            st.metric("Input tokens", mode_stats['prompt_tokens'])
+            st.metric("Output tokens", mode_stats['completion_tokens'])
+            st.caption(f"{mode_stats['calls']} call(s)" + ("" if mode_stats['usage_complete'] else " · usage unavailable for some calls"))
+    
+    if THREE_CALL_MODE in stats and SINGLE_PASS_MODE in stats:
+        three_call, single_pass = stats[THREE_CALL_MODE], stats[SINGLE_PASS_MODE]
+        if three_call['text_hash'] != single_pass['text_hash']:
+            st.caption("ℹ️ The two modes were last run on different enhanced text; re-run both to compare.")
+        elif three_call['prompt_tokens']:
+            saved = 1 - single_pass['prompt_tokens'] / three_call['prompt_tokens']
+            st.info(
+                f"Single pass used {saved:.0%} fewer input tokens "
+                f"and took {single_pass['latency'] - three_call['latency']:+.2f}s relative to three calls."
+            )
+
+def record_pipeline_latency(flow: str, latency: float, cached: bool):
+    """Keep the latest end-to-end Step 1 + Step 2 latency of the pipelined and sequential flows"""
+    st.session_state.pipeline_latency_stats[flow] = {
+        'jd_hash': hash(st.session_state.enhancement_inputs['jd_text']),
+        'latency': latency,
+        'cached': cached
+    }
+
+def show_pipeline_comparison():
+    """Show end-to-end latency per JD for the pipelined flow next to the sequential one"""
+    stats = st.session_state.pipeline_latency_stats
+    if not stats:
+        return
+    
+    st.markdown("### 🧪 Pipelined vs Sequential (per JD, Step 1 + Step 2)")
+    col1, col2 = st.columns(2)
+    for column, flow, label in ((col1, 'sequential', "Sequential"), (col2, 'pipelined', "Pipelined")):
+        with column:
+            st.markdown(f"**{label}**")
+            if flow not in stats:
+                st.caption("Not run yet")
+                continue
+            st.metric("End-to-end latency", f"{stats[flow]['latency']:.2f}s")
+            if stats[flow]['cached']:
+                st.caption("Step 1 was answered from the cache")
+    
+    if 'sequential' in stats and 'pipelined' in stats:
+        sequential, pipelined = stats['sequential'], stats['pipelined']
+        if sequential['jd_hash'] != pipelined['jd_hash']:
+            st.caption("ℹ️ The two flows were last run on different JDs; run both on the same JD to compare.")
+        elif sequential['cached'] or pipelined['cached']:
+            st.caption("ℹ️ A cached Step 1 skews the comparison; tick 'Bypass cache' and re-run both.")
+        else:
+            st.info(
+                f"Pipelining took {pipelined['latency'] - sequential['latency']:+.2f}s "
+                f"({pipelined['latency'] / sequential['latency'] - 1:+.0%}) relative to running the steps one after another."
+            )
 
 def show_step3_results_comparison():
     """Step 3: Results Comparison"""
@@ -663,6 +1520,17 @@ def show_step3_results_comparison():
     Compare and analyze the results from previous steps.
     """)
     
+    with st.expander("📈 Token & Latency Telemetry", expanded=False):
+        show_telemetry_dashboard()
+    
+    with st.expander("🗂️ Run History", expanded=False):
+        show_run_history()
+    
+    if st.session_state.get('workspace_records'):
+        show_workspace_results()
+        if 'enhanced_text' not in st.session_state:
+            return
+    
     if 'enhanced_text' not in st.session_state:
         st.warning("⚠️ Please complete Step 1 first.")
         return
@@ -686,29 +1554,279 @@ def show_step3_results_comparison():
     with col2:
         st.markdown("### 🔧 Structured Data (Step 2)")
         st.markdown("**Base Info:**")
-        st.code(st.session_state.extraction_results['base_info'])
+        st.json(st.session_state.extraction_results['base_info'])
         st.markdown("**Skills:**")
-        st.code(st.session_state.extraction_results['skills'])
+        st.json(st.session_state.extraction_results['skills'])
         st.markdown("**Responsibilities:**")
-        st.code(st.session_state.extraction_results['responsibilities'])
+        st.json(st.session_state.extraction_results['responsibilities'])
     
     # Export functionality
     st.markdown("### 📤 Export Results")
     
-    if st.button("💾 Export as JSON", use_container_width=True):
-        export_data = {
-            'enhanced_text': st.session_state.enhanced_text,
-            'extraction_results': st.session_state.extraction_results,
-            'company_context': st.session_state.company_context,
-            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+    export_data = {
+        'enhanced_text': st.session_state.enhanced_text,
+        'extraction_results': st.session_state.extraction_results,
+        'company_context': st.session_state.company_context,
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+    st.download_button(
+        label="📥 Download JSON",
+        data=json.dumps(export_data, indent=2),
+        file_name=f"jd_extraction_results_{time.strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json",
+        use_container_width=True
+    )
+
+def show_run_history():
+    """Search stored runs by JD text or job title and load one into Step 3"""
+    history = get_run_history()
+    query = st.text_input("Search JD text and job titles:", key="history_query")
+    runs = history.search(query)
+    st.caption(f"{len(runs)} of {history.count()} stored run(s)"
+               + ("" if history.full_text else " · full-text search unavailable, using substring match"))
+    if not runs:
+        return
+    st.dataframe(runs, use_container_width=True, hide_index=True)
+    
+    show_history_export(query)
+    
+    labels = {run['id']: f"#{run['id']} · {run['job_title'] or 'untitled'} · {run['created_at']}" for run in runs}
+    run_id = st.selectbox("Run:", list(labels), format_func=labels.get, key="history_run")
+    if st.button("📂 Load into Step 3", use_container_width=True):
+        run = history.get(run_id)
+        if run is None:
+            st.error(f"Run #{run_id} no longer exists.")
+            return
+        load_run_into_session(run)
+        st.rerun()
+
+def show_history_export(query: str):
+    """Write every run matching the search to a compressed file and offer it for download"""
+    history = get_run_history()
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        export_format = st.selectbox("Export format:", available_formats(), key="history_export_format")
+    with col2:
+        st.write("")
+        build = st.button(f"📦 Export {history.count(query)} matching run(s)", use_container_width=True)
+    
+    if build:
+        st.session_state.pop('history_export', None)
+        extension, mime = EXPORT_FORMATS[export_format]
+        # Runs are streamed from SQLite into a spooled file, deleted on close; only the
+        # (compressed) result is kept for download
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as out:
+            count = write_export(history.iter_runs(query), export_format, out)
+            size = out.tell()
+            if size > MAX_EXPORT_DOWNLOAD_BYTES:
+                st.error(f"❌ The export is {size / 1024 / 1024:,.0f} MB, too large to download here; "
+                         f"use `python export.py -o runs{extension}` instead.")
+                return
+            out.seek(0)
+            data = out.read()
+        st.session_state.history_export = {
+            'data': data,
+            'file_name': f"jd_runs_{time.strftime('%Y%m%d_%H%M%S')}{extension}",
+            'mime': mime,
+            'count': count
         }
-        
+    
+    export = st.session_state.get('history_export')
+    if export:
         st.download_button(
-            label="📥 Download JSON",
-            data=json.dumps(export_data, indent=2),
-            file_name=f"jd_extraction_results_{time.strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
+            label=f"📥 Download {export['count']} runs ({len(export['data']) / 1024:,.0f} KB)",
+            data=export['data'],
+            file_name=export['file_name'],
+            mime=export['mime'],
+            use_container_width=True
+        )
+
+def show_workspace_results():
+    """Summary table of the last workspace run, per-JD detail and a JSONL export"""
+    records = st.session_state.workspace_records
+    st.markdown("### 📚 Workspace Results")
+    st.dataframe(workspace_table(records), use_container_width=True, hide_index=True)
+    
+    selected = st.selectbox("Show details for:", [record['id'] for record in records], key="workspace_detail")
+    record = next(record for record in records if record['id'] == selected)
+    if record['status'] != ITEM_DONE:
+        st.error(f"Error processing {record['id']}: {record['error']}")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.text_area("Enhanced Text:", value=record['enhanced_text'], height=300, disabled=True,
+                         key=f"workspace_text_{record['id']}")
+        with col2:
+            st.json(record['extraction_results'])
+    
+    st.download_button(
+        label="📥 Download Workspace Results (JSONL)",
+        data="\n".join(json.dumps(record, ensure_ascii=False) for record in records) + "\n",
+        file_name=f"jd_workspace_results_{time.strftime('%Y%m%d_%H%M%S')}.jsonl",
+        mime="application/jsonl",
+        use_container_width=True
+    )
+    st.markdown("---")
+
+def current_prompt_template(prompt_type: str) -> str:
+    """The template in the prompt editor, or the saved/default one if the editor isn't open"""
+    return st.session_state.get(prompt_type) or load_prompt_from_file(prompt_type, DEFAULT_PROMPT_TEMPLATES[prompt_type])
+
+def show_step4_prompt_evaluation(model: str, temperature: float, max_tokens: int):
+    """Step 4: Prompt A/B Evaluation"""
+    st.markdown('<h2 class="section-header">🧪 Step 4: Prompt A/B Evaluation</h2>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    Compare versions of one prompt by running the full pipeline over a golden set of job descriptions.
+    Outputs are scored for JSON validity, 8-10 skills, exactly 6 responsibilities and base info field coverage.
+    """)
+    
+    prompt_type = st.selectbox("Prompt to compare:", list(PROMPT_NAMES), key="eval_prompt_type")
+    
+    # Candidate variants: the current editor, the default and every saved version
+    candidates = {
+        "Current": current_prompt_template(prompt_type),
+        "Default": DEFAULT_PROMPT_TEMPLATES[prompt_type]
+    }
+    for entry in reversed(get_prompt_store().history(prompt_type)):
+        candidates[f"v{entry['version']} — {entry['saved_at']}"] = entry['content']
+    selected = st.multiselect(
+        "Variants:",
+        list(candidates),
+        default=list(candidates)[:2],
+        key="eval_variants"
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        golden_path = st.text_input(
+            "Golden set",
+            value=DEFAULT_GOLDEN_SET,
+            help="Text file, directory of .txt/.md files, or JSONL file of job descriptions"
         )
+    with col2:
+        concurrency = st.number_input("Parallel runs", min_value=1, max_value=16, value=4, step=1)
+    
+    if st.button("🧪 Run Evaluation", type="primary", use_container_width=True):
+        if not selected:
+            st.error("Please select at least one variant.")
+            return
+        try:
+            jds = [jd for jd in iter_jds(golden_path) if jd['text'].strip()]
+        except OSError as e:
+            st.error(f"Could not read the golden set: {str(e)}")
+            return
+        if not jds:
+            st.error("The golden set has no job descriptions.")
+            return
+        
+        base_templates = {name: current_prompt_template(name) for name in PROMPT_NAMES}
+        variants = {label: {**base_templates, prompt_type: candidates[label]} for label in selected}
+        total = len(variants) * len(jds)
+        progress = st.progress(0.0, text=f"Running {total} evaluations...")
+        runs = []
+        try:
+            for run in run_evaluation(
+                get_session_client(), variants, jds, st.session_state.company_context,
+                model, temperature, max_tokens, concurrency=concurrency,
+                **call_options()
+            ):
+                runs.append(run)
+                progress.progress(len(runs) / total, text=f"{len(runs)}/{total} evaluations done")
+        except Exception as e:
+            st.error(f"Error during evaluation: {str(e)}")
+            return
+        progress.empty()
+        
+        order = {label: index for index, label in enumerate(selected)}
+        st.session_state.evaluation = {
+            'prompt_type': prompt_type,
+            'summary': sorted(summarize_evaluation(runs), key=lambda row: order[row['variant']]),
+            'runs': sorted(runs, key=lambda run: (order[run['variant']], run['jd_id']))
+        }
+    
+    evaluation = st.session_state.get('evaluation')
+    if evaluation:
+        st.markdown(f"### 📊 Results for `{evaluation['prompt_type']}`")
+        st.dataframe(evaluation['summary'], use_container_width=True, hide_index=True)
+        st.caption("Quality columns are averages in [0, 1]; tokens and cost include calls answered from the "
+                   "response cache, which the cached columns break out.")
+        with st.expander("🔍 Per-JD runs", expanded=False):
+            st.dataframe(evaluation['runs'], use_container_width=True, hide_index=True)
+
+def show_cache_stats(placeholder):
+    """Render the response cache hit/miss counters into a sidebar placeholder"""
+    stats = get_response_cache().stats()
+    with placeholder.container():
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Hits", stats['hits'], help=f"{stats['coalesced']} waited for an identical call in flight")
+        col2.metric("Misses", stats['misses'])
+        col3.metric("Entries", stats['entries'])
+        st.caption(
+            f"Shared by all sessions · {stats['backend']} store · "
+            f"{stats['memory_entries']} in memory ({stats['memory_bytes'] / 1024:.0f} KB)"
+            + (f" · {stats['in_flight']} in flight" if stats['in_flight'] else "")
+        )
+
+def session_budget_scopes() -> List[str]:
+    """Rate limit budget scopes of the session's clients: its API key plus any routed backends"""
+    if not st.session_state.openai_key:
+        return []
+    client = get_session_client()
+    clients = [client]
+    if isinstance(client, StepRouter):
+        clients = [client.default_client] + [route['client'] for route in client.routes.values()]
+    return [client_scope(each) for each in clients]
+
+def show_rate_limit_stats(placeholder):
+    """Render the shared rate limiter's queue and throttling metrics into a sidebar placeholder
+
+    Only the budgets of this session's key and backends are listed.
+    """
+    stats = get_rate_limiter().stats(session_budget_scopes())
+    with placeholder.container():
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Queued", stats['queue_depth'], help=f"Peak: {stats['peak_queue_depth']}")
+        col2.metric("Throttled", f"{stats['throttle_seconds']:.1f}s", help=f"{stats['throttled_calls']} call(s) waited")
+        col3.metric("429s", stats['rate_limited'])
+        for model, budget in stats['models'].items():
+            if budget['remaining_requests'] is not None or budget['remaining_tokens'] is not None:
+                st.caption(
+                    f"{model}: {budget['remaining_requests']}/{budget['requests_per_minute']} requests · "
+                    f"{budget['remaining_tokens']}/{budget['tokens_per_minute']} tokens left"
+                )
+
+def show_session_usage(placeholder):
+    """Render this session's call, token and cost totals into a sidebar placeholder"""
+    totals = get_telemetry().totals(st.session_state.session_id)
+    with placeholder.container():
+        col1, col2 = st.columns(2)
+        col1.metric("API calls", totals['calls'] - totals['cached_calls'])
+        col2.metric("Est. cost", f"${totals['cost']:.4f}")
+        st.caption(
+            f"{totals['prompt_tokens']:,} input · {totals['completion_tokens']:,} output tokens"
+            + (f" · {totals['errors']} failed" if totals['errors'] else "")
+        )
+
+def show_telemetry_dashboard():
+    """Per-step latency percentiles, token totals and cost from the telemetry log"""
+    st.markdown("### 📈 Token & Latency Telemetry")
+    scope = st.radio("Scope:", ["This session", "All sessions"], horizontal=True, key="telemetry_scope")
+    session_id = st.session_state.session_id if scope == "This session" else None
+    
+    summary = get_telemetry().step_summary(session_id)
+    if not summary:
+        st.info("ℹ️ No calls recorded yet.")
+        return
+    
+    totals = get_telemetry().totals(session_id)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Calls", totals['calls'])
+    col2.metric("Input tokens", f"{totals['prompt_tokens']:,}")
+    col3.metric("Output tokens", f"{totals['completion_tokens']:,}")
+    col4.metric("Est. cost", f"${totals['cost']:.4f}")
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+    st.caption("Latency percentiles cover live calls only; cached calls are counted but cost nothing.")
 
 def main():
     st.markdown('<h1 class="main-header">🔍 JD Extraction Prompt Tester</h1>', unsafe_allow_html=True)
@@ -716,6 +1834,9 @@ def main():
     # Initialize session state
     initialize_session_state()
     
+    # Pick up jobs that finished since the last run before anything reads their results
+    apply_finished_jobs()
+    
     # Sidebar for configuration
     with st.sidebar:
         st.markdown("## ⚙️ Configuration")
@@ -730,10 +1851,8 @@ def main():
         
         if api_key != st.session_state.openai_key:
             st.session_state.openai_key = api_key
-            if api_key and validate_openai_key(api_key):
-                st.success("✅ API key validated successfully!")
-            elif api_key:
-                st.error("❌ Invalid API key")
+        if api_key:
+            show_key_status(api_key)
         
         # Company Context
         st.markdown("### 🏢 Company Context")
@@ -765,10 +1884,14 @@ def main():
         st.markdown("### 🤖 Model Selection")
         model = st.selectbox(
             "OpenAI Model",
-            ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"],
+            OPENAI_MODELS,
             index=0
         )
         
+        # Per-step routing to other models or OpenAI-compatible servers
+        with st.expander("🧭 Step Routing", expanded=bool(st.session_state.step_routes)):
+            show_step_routing()
+        
         # Temperature
         temperature = st.slider(
             "Temperature",
@@ -793,14 +1916,72 @@ def main():
         if st.button("🔄 Reset All Prompts to Default", use_container_width=True):
             reset_prompts_to_default()
             st.rerun()
+        
+        # Connection Settings
+        with st.expander("🔌 Connection Settings", expanded=False):
+            settings = st.session_state.client_settings
+            settings['max_connections'] = st.number_input(
+                "Max pooled connections",
+                min_value=1,
+                max_value=100,
+                value=settings['max_connections'],
+                help="Keep-alive connections shared by all steps"
+            )
+            settings['timeout'] = float(st.number_input(
+                "Request timeout (s)",
+                min_value=10,
+                max_value=600,
+                value=int(settings['timeout']),
+                step=10
+            ))
+            settings['max_retries'] = st.number_input(
+                "Max retries",
+                min_value=0,
+                max_value=10,
+                value=settings['max_retries'],
+                help="Retries on connection errors, rate limits and server errors"
+            )
+        
+        # Response Cache
+        st.markdown("### 🗄️ Response Cache")
+        st.session_state.bypass_cache = st.checkbox(
+            "Bypass cache",
+            value=st.session_state.bypass_cache,
+            help="Always call the API and refresh the cached response"
+        )
+        st.session_state.near_duplicate_threshold = st.slider(
+            "Near-duplicate threshold",
+            min_value=0.5,
+            max_value=1.0,
+            value=st.session_state.near_duplicate_threshold,
+            step=0.05,
+            help="How similar a JD must be to a stored run to be flagged as a repost"
+        )
+        cache_stats_placeholder = st.empty()
+        if st.button("🧹 Clear Response Cache", use_container_width=True):
+            get_response_cache().clear()
+        
+        # Rate limits
+        st.markdown("### 🚦 Rate Limits")
+        rate_limit_placeholder = st.empty()
+        
+        # Telemetry
+        st.markdown("### 📈 Session Usage")
+        telemetry_placeholder = st.empty()
     
     # Main content area
     if not st.session_state.openai_key:
         st.warning("⚠️ Please enter your OpenAI API key in the sidebar to continue.")
+        show_cache_stats(cache_stats_placeholder)
+        show_rate_limit_stats(rate_limit_placeholder)
+        show_session_usage(telemetry_placeholder)
         return
     
+    # Filled at the end of the run, so jobs submitted during it are already listed
+    jobs_container = st.container()
+    
     # Step navigation
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         if st.button("📝 Step 1: Text Enhancement", use_container_width=True):
             st.session_state.current_step = 1
@@ -810,6 +1991,9 @@ def main():
     with col3:
         if st.button("📊 Step 3: Results Comparison", use_container_width=True):
             st.session_state.current_step = 3
+    with col4:
+        if st.button("🧪 Step 4: Prompt Evaluation", use_container_width=True):
+            st.session_state.current_step = 4
     
     # Step content
     if st.session_state.current_step == 1:
@@ -818,6 +2002,18 @@ def main():
         show_step2_structured_extraction(model, temperature, max_tokens)
     elif st.session_state.current_step == 3:
         show_step3_results_comparison()
+    elif st.session_state.current_step == 4:
+        show_step4_prompt_evaluation(model, temperature, max_tokens)
+    
+    # Poll only while jobs are running; a finished job triggers a full rerun
+    with jobs_container:
+        polling = JOB_POLL_INTERVAL if st.session_state.job_runner.active() else None
+        st.fragment(run_every=polling)(show_jobs_panel)()
+    
+    # Render counters last so they include this run's calls
+    show_cache_stats(cache_stats_placeholder)
+    show_rate_limit_stats(rate_limit_placeholder)
+    show_session_usage(telemetry_placeholder)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,131 @@
+import json
+import os
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from llm import StepRouter
+
+# The OpenAI API is always available; other backends come from the backends file
+OPENAI_BACKEND = 'openai'
+OPENAI_MODELS = ['gpt-4o-mini', 'gpt-4o', 'gpt-3.5-turbo']
+
+# Steps that can be sent to their own backend and model; repairs follow
+# their extraction and single-pass extraction stays on the default model
+ROUTABLE_STEPS = ('enhancement', 'base_info', 'skills', 'responsibilities')
+
+# Local servers (llama.cpp, vLLM, Ollama) ignore the key, but the client needs one
+LOCAL_API_KEY = 'not-needed'
+
+
+def load_backends(path: str = "backends.json") -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """The OpenAI API plus the OpenAI-compatible backends listed in a JSON file
+
+    The file maps a backend name to {"base_url": ..., "models": [...]} with
+    an optional "api_key" or "api_key_env" (the environment variable holding
+    it) and "context_window" for its models, e.g.
+
+        {"local": {"base_url": "http://localhost:8080/v1", "models": ["llama-3.1-8b-instruct"],
+                   "context_window": 8192}}
+
+    A missing file means OpenAI only; unusable entries are skipped with a
+    warning. The OpenAI entry has no key, since that comes from the user,
+    and no context_window, since its models' windows are known.
+    """
+    backends = {OPENAI_BACKEND: {'base_url': None, 'api_key': None, 'models': list(OPENAI_MODELS),
+                                 'context_window': None}}
+    warnings = []
+    if not os.path.exists(path):
+        return backends, warnings
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return backends, [f"Could not read {path}: {str(e)}"]
+
+    if not isinstance(config, dict):
+        return backends, [f"Could not read {path}: expected an object mapping backend names to settings"]
+
+    for name, entry in config.items():
+        problem = _entry_problem(name, entry)
+        if problem:
+            warnings.append(f"Skipping backend {name!r}: {problem}")
+            continue
+        api_key = entry.get('api_key') or os.environ.get(entry.get('api_key_env') or '') or LOCAL_API_KEY
+        backends[name] = {
+            'base_url': entry['base_url'],
+            'api_key': api_key,
+            'models': list(entry['models']),
+            'context_window': int(entry['context_window']) if entry.get('context_window') is not None else None
+        }
+    return backends, warnings
+
+
+def _entry_problem(name: str, entry: Any) -> Optional[str]:
+    """Why a backends file entry can't be used, or None if it can"""
+    if name == OPENAI_BACKEND:
+        return "the name is reserved for the OpenAI API"
+    if not isinstance(entry, dict):
+        return "expected an object"
+    if not isinstance(entry.get('base_url'), str) or not entry['base_url']:
+        return "it needs a base_url"
+    models = entry.get('models')
+    if not isinstance(models, list) or not models or not all(isinstance(model, str) and model for model in models):
+        return "models must be a non-empty list of model names"
+    for field in ('api_key', 'api_key_env'):
+        if entry.get(field) is not None and not isinstance(entry[field], str):
+            return f"{field} must be a string"
+    window = entry.get('context_window')
+    if window is not None:
+        try:
+            valid = not isinstance(window, bool) and int(window) == float(window) and int(window) > 0
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            return f"context_window must be a positive whole number of tokens, not {window!r}"
+    return None
+
+
+def parse_route(spec: str) -> Tuple[str, str, str]:
+    """Split a step=backend/model route, as given on the command line"""
+    step, _, target = spec.partition('=')
+    backend, _, model = target.partition('/')
+    if step not in ROUTABLE_STEPS or not backend or not model:
+        raise ValueError(
+            f"Invalid route {spec!r}; expected step=backend/model with step one of {', '.join(ROUTABLE_STEPS)}"
+        )
+    return step, backend, model
+
+
+def build_router(default_client, backends: Dict[str, Dict[str, Any]], routes: Dict[str, Tuple[str, str]],
+                 make_client: Callable[[Dict[str, Any]], Any]) -> Optional[StepRouter]:
+    """A StepRouter for {step: (backend, model)} routes, or None when nothing is routed
+
+    OpenAI routes reuse the default client; every other backend gets one
+    client from make_client(backend), shared by all of its steps.
+    """
+    if not routes:
+        return None
+    clients = {OPENAI_BACKEND: default_client}
+    step_routes = {}
+    for step, (backend, model) in routes.items():
+        if backend not in backends:
+            raise ValueError(f"Unknown backend {backend!r} for {step}; known: {', '.join(backends)}")
+        if backend not in clients:
+            clients[backend] = make_client(backends[backend])
+        step_routes[step] = {'client': clients[backend], 'model': model, 'backend': backend,
+                             'context_window': backends[backend].get('context_window')}
+    return StepRouter(default_client, step_routes)
+
+
+def route_client(default_client, backends_path: str, route_specs: List[str],
+                 make_client: Callable[[Dict[str, Any]], Any]) -> Tuple[Any, List[str]]:
+    """The client for command-line step=backend/model routes, plus backends file warnings
+
+    Returns the default client itself when nothing is routed. Raises
+    ValueError for a malformed route or an unknown backend.
+    """
+    backends, warnings = load_backends(backends_path)
+    routes = {}
+    for spec in route_specs:
+        step, backend, model = parse_route(spec)
+        routes[step] = (backend, model)
+    return build_router(default_client, backends, routes, make_client) or default_client, warnings
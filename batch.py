@@ -0,0 +1,237 @@
+"""Headless batch mode for the enhance -> extract pipeline
+
+Examples:
+    python batch.py sample_jd.txt -o results.jsonl
+    python batch.py jds/ -o results.jsonl --concurrency 8
+    python batch.py jds.jsonl -o results.jsonl --model gpt-4o
+    python batch.py jds/ -o results.jsonl --cache-dir sqlite:///response_cache.db
+    python batch.py jds/ --route skills=local/llama-3.1-8b-instruct --route responsibilities=local/llama-3.1-8b-instruct
+
+Input can be a single text file, a directory of .txt/.md files, or a JSONL
+file whose lines hold {"id": ..., "text": ...}. Results are appended to the
+output JSONL as each job description finishes; rerunning the same command
+skips every id already written with status "ok", so an interrupted backfill
+resumes where it stopped. --route sends single steps to another model or to
+an OpenAI-compatible server (llama.cpp, vLLM, ...) listed in backends.json.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, Set
+
+from dotenv import load_dotenv
+
+from backends import route_client
+from llm import create_client
+from pipeline import process_jd
+from prompts import load_prompt_templates, merge_company_context
+from ratelimit import RateLimiter
+from response_cache import ResponseCache
+from telemetry import TelemetryLog
+
+JD_FILE_EXTENSIONS = ('.txt', '.md')
+
+
+def iter_jds(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream job descriptions from a file, a directory or a JSONL file"""
+    if os.path.isdir(input_path):
+        for root, dirs, files in os.walk(input_path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if not file_name.endswith(JD_FILE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, file_name)
+                with open(path, 'r', encoding='utf-8') as f:
+                    yield {'id': os.path.relpath(path, input_path), 'text': f.read()}
+    elif input_path.endswith('.jsonl'):
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield {
+                    'id': str(record.get('id', f"line-{line_number}")),
+                    'text': record.get('text') or record.get('jd_text') or '',
+                    'company_context': record.get('company_context')
+                }
+    else:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            yield {'id': os.path.basename(input_path), 'text': f.read()}
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """Collect ids already processed successfully in a previous run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash is simply redone
+                continue
+            if record.get('status') == 'ok':
+                completed.add(record['id'])
+    return completed
+
+
+def _process_item(client, item: Dict[str, Any], company_context: Dict[str, str],
+                  templates: Dict[str, str], args, cache, recorder) -> Dict[str, Any]:
+    """Run one job description through the pipeline, capturing failures as records"""
+    started = time.perf_counter()
+    record = {'id': item['id'], 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")}
+    if not item['text'].strip():
+        record.update({'status': 'error', 'error': 'Empty job description'})
+        return record
+    try:
+        result = process_jd(
+            client, item['text'], merge_company_context(company_context, item.get('company_context')), templates,
+            args.model, args.temperature, args.max_tokens,
+            cache=cache, max_retries=args.max_retries, recorder=recorder
+        )
+        record.update({'status': 'ok', **result})
+    except Exception as e:
+        record.update({'status': 'error', 'error': str(e), 'elapsed': time.perf_counter() - started})
+    return record
+
+
+def run_batch(args) -> int:
+    """Process every pending job description and append results to the output file"""
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        print("OPENAI_API_KEY is not set", file=sys.stderr)
+        return 2
+
+    templates, warnings = load_prompt_templates(args.prompts_file)
+    for warning in warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+
+    company_context = {
+        'name': args.company_name,
+        'industry': args.company_industry,
+        'company_size': args.company_size,
+        'headquarters': args.headquarters
+    }
+    # Retries are handled by our own backoff and the limiter paces every
+    # worker by the per-model budgets the API reports
+    limiter = RateLimiter(args.rpm, args.tpm)
+    client_options = {
+        'max_connections': args.concurrency * 3,
+        'max_keepalive_connections': args.concurrency * 3,
+        'max_retries': 0,
+        'event_hooks': {'request': [limiter.request_hook()], 'response': [limiter.response_hook()]}
+    }
+    try:
+        client, backend_warnings = route_client(
+            create_client(api_key, **client_options), args.backends, args.route,
+            lambda backend: create_client(backend['api_key'], base_url=backend['base_url'], **client_options)
+        )
+        cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    for warning in backend_warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+    recorder = TelemetryLog(args.telemetry_db).recorder(f"batch-{time.strftime('%Y%m%d_%H%M%S')}")
+
+    completed = load_completed_ids(args.output)
+    counts = {'ok': 0, 'error': 0, 'skipped': 0}
+
+    # Make sure a line cut short by a crash doesn't swallow the next record
+    if os.path.exists(args.output) and os.path.getsize(args.output) > 0:
+        with open(args.output, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    else:
+        needs_newline = False
+
+    def write_record(out, record: Dict[str, Any]):
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+        counts[record['status']] += 1
+        elapsed = record.get('timings', {}).get('total', record.get('elapsed', 0))
+        message = f"[{counts['ok'] + counts['error']}] {record['id']}: {record['status']} ({elapsed:.1f}s)"
+        if record['status'] == 'error':
+            message += f" - {record['error']}"
+        print(message, file=sys.stderr)
+
+    started = time.perf_counter()
+    with open(args.output, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if needs_newline:
+            out.write('\n')
+        pending = set()
+        for item in iter_jds(args.input):
+            if item['id'] in completed:
+                counts['skipped'] += 1
+                continue
+            # Bound the number of queued items so huge inputs are streamed, not loaded
+            if len(pending) >= args.concurrency * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write_record(out, future.result())
+            pending.add(executor.submit(
+                _process_item, client, item, company_context, templates, args, cache, recorder
+            ))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                write_record(out, future.result())
+
+    print(
+        f"Done in {time.perf_counter() - started:.1f}s: {counts['ok']} ok, "
+        f"{counts['error']} failed, {counts['skipped']} already completed",
+        file=sys.stderr
+    )
+    throttling = limiter.stats()
+    if throttling['throttled_calls'] or throttling['rate_limited']:
+        print(
+            f"Rate limits: {throttling['throttled_calls']} calls waited {throttling['throttle_seconds']:.1f}s, "
+            f"{throttling['rate_limited']} 429 responses, peak queue {throttling['peak_queue_depth']}",
+            file=sys.stderr
+        )
+    return 1 if counts['error'] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the JD enhance -> extract pipeline over many job descriptions")
+    parser.add_argument("input", help="Text file, directory of .txt/.md files, or JSONL file of job descriptions")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--route", action="append", default=[], metavar="STEP=BACKEND/MODEL",
+                        help="Send one step (enhancement, base_info, skills, responsibilities) to another "
+                             "backend and model, e.g. skills=local/llama-3.1-8b-instruct; repeatable")
+    parser.add_argument("--backends", default="backends.json", help="OpenAI-compatible backends routes can name")
+    parser.add_argument("--temperature", type=float, default=0.4)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4, help="Job descriptions processed in parallel")
+    parser.add_argument("--max-retries", type=int, default=6, help="Retries per call on rate limits and transient errors")
+    parser.add_argument("--rpm", type=int, help="Requests per minute to stay under until the API reports its limit")
+    parser.add_argument("--tpm", type=int, help="Tokens per minute to stay under until the API reports its limit")
+    parser.add_argument("--prompts-file", default="saved_prompts.json", help="Saved prompt templates to use over the defaults")
+    parser.add_argument("--cache-dir", default=".response_cache",
+                        help="Response cache directory, or a sqlite:///path or redis:// URL")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the response cache")
+    parser.add_argument("--telemetry-db", default="telemetry.db", help="SQLite file per-call token/latency telemetry is logged to")
+    parser.add_argument("--company-name", default="")
+    parser.add_argument("--company-industry", default="")
+    parser.add_argument("--company-size", default="")
+    parser.add_argument("--headquarters", default="")
+    return parser
+
+
+def main() -> int:
+    load_dotenv()
+    args = build_parser().parse_args()
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1", file=sys.stderr)
+        return 2
+    return run_batch(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Local stand-in for the OpenAI chat completions API, for benchmarks
+
+Examples:
+    python benchmarks/mock_server.py --port 8900 --latency 0.3 --tokens-per-second 200
+    python benchmarks/mock_server.py --rate-limit-every 10
+
+Point the app or the CLIs at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+and any API key. Responses are canned but shaped like the real ones for each
+pipeline step (enhanced text, base info object, skills and responsibilities
+arrays, single-pass object), with usage, streaming and x-ratelimit headers.
+Latency is a fixed delay plus generation time at the configured
+tokens-per-second; every Nth request can be answered with a 429.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import EXTRACTION_SYSTEM_PROMPTS  # noqa: E402
+from prompts import ENHANCEMENT_SYSTEM_PROMPT, REPAIR_SYSTEM_PROMPT, SINGLE_PASS_SYSTEM_PROMPT  # noqa: E402
+
+ENHANCED_TEXT = """1. Job Title and Basic Information
+Senior Software Engineer - Backend Development
+Department: Engineering · Location: San Francisco, CA (Hybrid)
+
+2. Job Summary
+Design, build and operate the backend services behind a high-traffic platform, working with product
+and infrastructure teams to ship reliable, observable systems.
+
+3. Key Responsibilities
+Design scalable APIs; own services in production; mentor engineers; review code; improve CI/CD;
+collaborate with product on technical roadmaps.
+
+4. Required Skills
+Python (Expert), Go (Advanced), PostgreSQL (Advanced), Kubernetes (Intermediate), AWS (Advanced),
+System Design (Expert), Communication (Advanced), Mentoring (Intermediate), Observability (Intermediate)
+
+5. Work Environment and Arrangements
+Full-time · Hybrid · San Francisco, CA · Occasional travel
+
+6. Compensation and Benefits
+Not specified
+"""
+
+BASE_INFO = {
+    "job_title": "Senior Software Engineer", "job_code": None, "job_level": "Senior",
+    "department": "Engineering", "job_function": "Software Engineering", "jd_industry": "Technology",
+    "experience_range": {"min": 5, "max": 8}, "job_summary": "Build and operate backend services.",
+    "required_qualifications": ["BS in Computer Science or equivalent"],
+    "seniority_level": "Senior Level", "location": "San Francisco, CA"
+}
+SKILLS = [
+    {"skill_name": name, "skill_type": kind, "proficiency_level": level}
+    for name, kind, level in (
+        ("Python", "technical", "Expert"), ("Go", "technical", "Advanced"),
+        ("PostgreSQL", "technical", "Advanced"), ("Kubernetes", "technical", "Intermediate"),
+        ("AWS", "technical", "Advanced"), ("System Design", "technical", "Expert"),
+        ("Communication", "soft", "Advanced"), ("Mentoring", "soft", "Intermediate"),
+        ("Observability", "technical", "Intermediate")
+    )
+]
+RESPONSIBILITIES = [
+    "Design and build scalable backend APIs",
+    "Own services in production, including on-call",
+    "Mentor engineers and review code",
+    "Improve CI/CD and developer tooling",
+    "Collaborate with product on the technical roadmap",
+    "Drive reliability and observability improvements"
+]
+
+
+def canned_content(system_prompt: str) -> str:
+    """The response text for a request, chosen by the step its system prompt belongs to"""
+    if system_prompt == ENHANCEMENT_SYSTEM_PROMPT:
+        return ENHANCED_TEXT
+    if system_prompt == SINGLE_PASS_SYSTEM_PROMPT:
+        return json.dumps({"base_info": BASE_INFO, "skills": SKILLS, "responsibilities": RESPONSIBILITIES})
+    if system_prompt == EXTRACTION_SYSTEM_PROMPTS['base_info']:
+        return json.dumps(BASE_INFO)
+    if system_prompt == EXTRACTION_SYSTEM_PROMPTS['skills']:
+        return json.dumps(SKILLS)
+    if system_prompt in (EXTRACTION_SYSTEM_PROMPTS['responsibilities'], REPAIR_SYSTEM_PROMPT):
+        return json.dumps(RESPONSIBILITIES)
+    return "OK"
+
+
+class MockSettings:
+    """Behaviour knobs shared by every request handler, adjustable while the server runs"""
+
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 0.2,
+                 requests_per_minute: int = 10000, tokens_per_minute: int = 2000000):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+
+    def next_request(self) -> bool:
+        """Count a request; True if it should be rejected with a 429"""
+        with self._lock:
+            self.requests += 1
+            reject = bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+            if reject:
+                self.rate_limited += 1
+            return reject
+
+
+def _make_handler(settings: MockSettings):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('content-type', 'application/json')
+            self.send_header('content-length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _rate_limit_headers(self) -> Dict[str, str]:
+            return {
+                'x-ratelimit-limit-requests': str(settings.requests_per_minute),
+                'x-ratelimit-remaining-requests': str(settings.requests_per_minute - 1),
+                'x-ratelimit-reset-requests': '6ms',
+                'x-ratelimit-limit-tokens': str(settings.tokens_per_minute),
+                'x-ratelimit-remaining-tokens': str(settings.tokens_per_minute - 1000),
+                'x-ratelimit-reset-tokens': '30ms'
+            }
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/models'):
+                self._send_json(200, {'object': 'list', 'data': [{'id': 'gpt-4o-mini', 'object': 'model'}]})
+            else:
+                self._send_json(404, {'error': {'message': 'Not found'}})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('content-length', 0))) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {'error': {'message': 'Not found'}})
+                return
+            if settings.next_request():
+                self._send_json(429, {'error': {'message': 'Rate limit reached (mock)', 'type': 'requests',
+                                                'code': 'rate_limit_exceeded'}},
+                                {'retry-after-ms': str(int(settings.retry_after * 1000)), **self._rate_limit_headers()})
+                return
+
+            messages = body.get('messages', [])
+            content = canned_content(messages[0]['content'] if messages else '')
+            prompt_tokens = sum(len(str(message.get('content', ''))) for message in messages) // 4
+            completion_tokens = max(1, len(content) // 4)
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                     'total_tokens': prompt_tokens + completion_tokens}
+            model = body.get('model', 'gpt-4o-mini')
+            time.sleep(settings.latency)
+            if body.get('stream'):
+                self._stream(model, content, usage)
+                return
+            if settings.tokens_per_second:
+                time.sleep(completion_tokens / settings.tokens_per_second)
+            self._send_json(200, {
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            }, self._rate_limit_headers())
+
+        def _stream(self, model: str, content: str, usage: Dict[str, int]):
+            self.send_response(200)
+            self.send_header('content-type', 'text/event-stream')
+            self.send_header('transfer-encoding', 'chunked')
+            for name, value in self._rate_limit_headers().items():
+                self.send_header(name, value)
+            self.end_headers()
+
+            def send_event(payload):
+                data = f"data: {payload}\n\n".encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            words = content.split(' ')
+            # Roughly one token per word at the configured generation speed
+            delay = 1 / settings.tokens_per_second if settings.tokens_per_second else 0.0
+            for index, word in enumerate(words):
+                delta = word if index == len(words) - 1 else word + ' '
+                send_event(json.dumps({
+                    'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                    'model': model, 'choices': [{'index': 0, 'delta': {'content': delta}, 'finish_reason': None}]
+                }))
+                if delay:
+                    time.sleep(delay)
+            send_event(json.dumps({
+                'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                'model': model, 'choices': [], 'usage': usage
+            }))
+            send_event('[DONE]')
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+class MockOpenAIServer:
+    """Threaded mock server; use as a context manager or call start() and stop()"""
+
+    def __init__(self, settings: Optional[MockSettings] = None, host: str = '127.0.0.1', port: int = 0):
+        self.settings = settings or MockSettings()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self.settings))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'MockOpenAIServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockOpenAIServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before each response starts")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Generation speed after the first token (0 = instant)")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="retry-after sent with injected 429s, in seconds")
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    settings = MockSettings(args.latency, args.tokens_per_second, args.rate_limit_every, args.retry_after)
+    server = MockOpenAIServer(settings, args.host, args.port)
+    print(f"Mock OpenAI API listening on {server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Benchmark the enhance -> extract pipeline against the local mock OpenAI server
+
+Examples:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --latency 0.5 --rate-limit-every 20 -o bench.json
+    python benchmarks/run_benchmarks.py --scenarios multi_jd sessions --baseline bench.json
+
+Scenarios:
+    single_jd   one JD at a time through Step 1 + Step 2 (three parallel extraction calls)
+    multi_jd    a workspace of many JDs fanned out over a worker pool
+    sessions    several concurrent sessions sharing one client and rate limiter
+    streaming   streamed Step 1 calls: time to first token and total time
+    pipelined   streamed Step 1 with base info extraction overlapping the stream
+    render      Streamlit reruns of app.py with a JD pasted into Step 1
+
+Each scenario reports throughput, p50/p95/p99 latency and peak traced Python
+memory. Nothing costs money: every call goes to an in-process mock server
+with configurable latency, generation speed and injected 429s, and the app's
+caches and databases live in a temporary directory. With --baseline the run
+is compared to an earlier report and exits 1 if p95 latency or throughput
+regressed by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from llm import create_client, stream_chat_completion  # noqa: E402
+from mock_server import MockOpenAIServer, MockSettings  # noqa: E402
+from pipeline import process_jd, stream_pipelined  # noqa: E402
+from prompts import DEFAULT_PROMPT_TEMPLATES, ENHANCEMENT_SYSTEM_PROMPT, render_prompt, step1_prompt_values  # noqa: E402
+from ratelimit import RateLimiter  # noqa: E402
+from telemetry import percentile  # noqa: E402
+from workspace import run_workspace  # noqa: E402
+
+SCENARIOS = ('single_jd', 'multi_jd', 'sessions', 'streaming', 'pipelined', 'render')
+
+COMPANY_CONTEXT = {'name': 'TechCorp Inc.', 'industry': 'Software', 'company_size': '500-1000',
+                   'headquarters': 'San Francisco, CA'}
+MODEL = 'gpt-4o-mini'
+TEMPERATURE = 0.4
+MAX_TOKENS = 2000
+
+
+def _sample_jd() -> str:
+    with open(os.path.join(REPO_DIR, 'sample_jd.txt'), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _measure(fn: Callable[[], List[float]]) -> Dict[str, Any]:
+    """Run a scenario body returning per-item latencies; add wall time, throughput and peak memory"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        latencies = fn()
+    finally:
+        wall_clock = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        'items': len(latencies),
+        'wall_clock_s': wall_clock,
+        'throughput_per_s': len(latencies) / wall_clock if wall_clock else None,
+        'p50_s': percentile(latencies, 0.50),
+        'p95_s': percentile(latencies, 0.95),
+        'p99_s': percentile(latencies, 0.99),
+        'peak_memory_mb': peak / 1_000_000
+    }
+
+
+def _client(connections: int, limiter: Optional[RateLimiter] = None):
+    hooks = None
+    if limiter is not None:
+        hooks = {'request': [limiter.request_hook()], 'response': [limiter.response_hook()]}
+    return create_client('sk-benchmark', max_connections=connections, max_keepalive_connections=connections,
+                         max_retries=0, event_hooks=hooks)
+
+
+def bench_single_jd(args) -> Dict[str, Any]:
+    client = _client(4)
+    jd_text = _sample_jd()
+
+    def body():
+        latencies = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            process_jd(client, jd_text, COMPANY_CONTEXT, DEFAULT_PROMPT_TEMPLATES, MODEL, TEMPERATURE,
+                       MAX_TOKENS, max_retries=args.max_retries)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+    return _measure(body)
+
+
+def bench_multi_jd(args) -> Dict[str, Any]:
+    client = _client(args.concurrency * 3)
+    jd_text = _sample_jd()
+    items = [{'id': f"jd-{index}", 'text': f"{jd_text}\n\nReference: {index}"} for index in range(args.jds)]
+
+    def body():
+        latencies = []
+        for record in run_workspace(client, items, COMPANY_CONTEXT, DEFAULT_PROMPT_TEMPLATES, MODEL, TEMPERATURE,
+                                    MAX_TOKENS, concurrency=args.concurrency, max_retries=args.max_retries):
+            if record['error']:
+                raise RuntimeError(f"{record['id']}: {record['error']}")
+            latencies.append(record['elapsed'])
+        return latencies
+    return _measure(body)
+
+
+def bench_sessions(args) -> Dict[str, Any]:
+    limiter = RateLimiter()
+    client = _client(args.sessions * 3, limiter)
+    jd_text = _sample_jd()
+    lock = threading.Lock()
+
+    def session(latencies: List[float]):
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            process_jd(client, jd_text, COMPANY_CONTEXT, DEFAULT_PROMPT_TEMPLATES, MODEL, TEMPERATURE,
+                       MAX_TOKENS, max_retries=args.max_retries)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    def body():
+        latencies = []
+        with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+            for future in [executor.submit(session, latencies) for _ in range(args.sessions)]:
+                future.result()
+        return latencies
+    result = _measure(body)
+    throttling = limiter.stats()
+    result.update({'throttle_s': throttling['throttle_seconds'], 'rate_limited': throttling['rate_limited'],
+                   'peak_queue_depth': throttling['peak_queue_depth']})
+    return result
+
+
+def bench_streaming(args) -> Dict[str, Any]:
+    client = _client(4)
+    prompt = render_prompt(DEFAULT_PROMPT_TEMPLATES['step1_prompt'], step1_prompt_values(_sample_jd(), COMPANY_CONTEXT))
+    first_tokens = []
+
+    def body():
+        latencies = []
+        for _ in range(args.iterations):
+            stats = {}
+            for _ in stream_chat_completion(client, MODEL, ENHANCEMENT_SYSTEM_PROMPT, prompt, TEMPERATURE,
+                                            MAX_TOKENS, stats, max_retries=args.max_retries):
+                pass
+            first_tokens.append(stats['ttft'])
+            latencies.append(stats['elapsed'])
+        return latencies
+    result = _measure(body)
+    result.update({'ttft_p50_s': percentile(first_tokens, 0.50), 'ttft_p95_s': percentile(first_tokens, 0.95)})
+    return result
+
+
+def bench_pipelined(args) -> Dict[str, Any]:
+    client = _client(4)
+    prompt = render_prompt(DEFAULT_PROMPT_TEMPLATES['step1_prompt'], step1_prompt_values(_sample_jd(), COMPANY_CONTEXT))
+    templates = {name: DEFAULT_PROMPT_TEMPLATES[f"{name}_prompt"] for name in ('base_info', 'skills', 'responsibilities')}
+    head_starts = []
+
+    def body():
+        latencies = []
+        for _ in range(args.iterations):
+            stats = {}
+            for _ in stream_pipelined(client, MODEL, prompt, TEMPERATURE, MAX_TOKENS, stats, templates,
+                                      COMPANY_CONTEXT, max_retries=args.max_retries):
+                pass
+            if stats['base_info_started'] is not None:
+                head_starts.append(stats['elapsed'] - stats['base_info_started'])
+            latencies.append(stats['wall_clock'])
+        return latencies
+    result = _measure(body)
+    result['base_info_head_start_p50_s'] = percentile(head_starts, 0.50)
+    return result
+
+
+def bench_render(args) -> Dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(REPO_DIR, 'app.py'), default_timeout=60)
+    app.run()
+    app.sidebar.text_input[0].input('sk-benchmark').run()
+    app.text_area[0].input(_sample_jd()).run()
+
+    def body():
+        latencies = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            app.run()
+            latencies.append(time.perf_counter() - started)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        return latencies
+    return _measure(body)
+
+
+BENCHMARKS = {
+    'single_jd': bench_single_jd,
+    'multi_jd': bench_multi_jd,
+    'sessions': bench_sessions,
+    'streaming': bench_streaming,
+    'pipelined': bench_pipelined,
+    'render': bench_render
+}
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                        tolerance: float) -> List[str]:
+    """Scenarios whose p95 latency rose or throughput fell by more than the tolerance"""
+    regressions = []
+    for scenario, result in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        if previous.get('p95_s') and result['p95_s'] > previous['p95_s'] * (1 + tolerance):
+            regressions.append(f"{scenario}: p95 {previous['p95_s']:.3f}s -> {result['p95_s']:.3f}s")
+        if previous.get('throughput_per_s') and result['throughput_per_s'] < previous['throughput_per_s'] * (1 - tolerance):
+            regressions.append(
+                f"{scenario}: throughput {previous['throughput_per_s']:.2f}/s -> {result['throughput_per_s']:.2f}/s"
+            )
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    print(f"{'scenario':<10} {'items':>6} {'wall s':>8} {'per s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'peak MB':>8}")
+    for scenario, result in results.items():
+        print(f"{scenario:<10} {result['items']:>6} {result['wall_clock_s']:>8.2f} {result['throughput_per_s']:>8.2f} "
+              f"{result['p50_s']:>8.3f} {result['p95_s']:>8.3f} {result['p99_s']:>8.3f} {result['peak_memory_mb']:>8.1f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the JD pipeline against a local mock OpenAI server")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=10, help="Runs per scenario (per session for 'sessions')")
+    parser.add_argument("--jds", type=int, default=32, help="JDs in the multi_jd workspace")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker pool size for multi_jd")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions for 'sessions'")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock server delay before each response")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Mock generation speed")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Inject a 429 every Nth request")
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("-o", "--output", help="JSON file the report is written to")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression vs the baseline")
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    settings = MockSettings(args.latency, args.tokens_per_second, args.rate_limit_every)
+    results = {}
+    with MockOpenAIServer(settings) as server, tempfile.TemporaryDirectory() as workdir:
+        # The SDK and the app pick the mock up from the environment; app state stays out of the repo
+        os.environ['OPENAI_BASE_URL'] = server.base_url
+        os.chdir(workdir)
+        for scenario in args.scenarios:
+            print(f"Running {scenario}...", file=sys.stderr)
+            results[scenario] = BENCHMARKS[scenario](args)
+        os.chdir(REPO_DIR)
+
+    print_report(results)
+    report = {
+        'settings': {name: value for name, value in vars(args).items() if name not in ('output', 'baseline')},
+        'mock_requests': settings.requests,
+        'mock_rate_limited': settings.rate_limited,
+        'results': results
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
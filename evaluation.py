@@ -0,0 +1,278 @@
+"""Prompt A/B evaluation over a golden set of job descriptions
+
+Examples:
+    python evaluation.py variants.json
+    python evaluation.py variants.json golden_jds/ --concurrency 8 -o report.json
+
+variants.json maps each variant name to the prompt templates it overrides,
+e.g. {"baseline": {}, "terse skills": {"skills_prompt": "..."}}; prompts a
+variant doesn't override come from the saved prompts or the defaults. Every
+variant runs the full enhance -> extract pipeline on every golden JD, and
+the outputs are scored for JSON validity, skill and responsibility counts
+and base info field coverage alongside latency and token cost.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from batch import iter_jds
+from backends import route_client
+from llm import create_client, route_labels
+from pipeline import process_jd
+from prompts import load_prompt_templates, merge_company_context
+from ratelimit import RateLimiter
+from response_cache import ResponseCache
+from telemetry import TelemetryLog, estimate_cost, percentile
+from validation import BASE_INFO_FIELDS
+
+# Targets the extraction prompts ask for
+SKILL_COUNT_RANGE = (8, 10)
+RESPONSIBILITY_COUNT = 6
+
+DEFAULT_GOLDEN_SET = "sample_jd.txt"
+
+
+def score_extraction(data: Dict[str, Any], repaired: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Score one JD's validated extraction results against what the prompts ask for
+
+    json_valid is the share of extractions that were valid JSON as returned,
+    without local repair or a repair retry. score is the mean of JSON
+    validity, skills in range, exact responsibility count and base info
+    field coverage, each in [0, 1].
+    """
+    valid_as_returned = sum(1 for name in data if data[name] is not None and not repaired.get(name))
+    json_valid = valid_as_returned / max(1, len(data))
+
+    skills = data.get('skills')
+    skill_count = len(skills) if isinstance(skills, list) else 0
+    responsibilities = data.get('responsibilities')
+    responsibility_count = len(responsibilities) if isinstance(responsibilities, list) else 0
+    base_info = data.get('base_info')
+    covered = sum(
+        1 for field in BASE_INFO_FIELDS
+        if isinstance(base_info, dict) and base_info.get(field) not in (None, '', [], {})
+    )
+
+    skills_in_range = SKILL_COUNT_RANGE[0] <= skill_count <= SKILL_COUNT_RANGE[1]
+    responsibilities_exact = responsibility_count == RESPONSIBILITY_COUNT
+    field_coverage = covered / len(BASE_INFO_FIELDS)
+    return {
+        'json_valid': json_valid,
+        'skill_count': skill_count,
+        'skills_in_range': skills_in_range,
+        'responsibility_count': responsibility_count,
+        'responsibilities_exact': responsibilities_exact,
+        'field_coverage': field_coverage,
+        'score': (json_valid + skills_in_range + responsibilities_exact + field_coverage) / 4
+    }
+
+
+def _run_cell(client, variant: str, templates: Dict[str, str], jd: Dict[str, Any],
+              company_context: Dict[str, str], model: str, temperature: float, max_tokens: int,
+              cache=None, bypass_cache: bool = False, max_retries: int = 0,
+              recorder=None) -> Dict[str, Any]:
+    """Run and score one variant on one JD, collecting the tokens and cost of its calls
+
+    Tokens and cost include calls answered from the response cache;
+    cached_calls and cached_cost say how much of that was not paid again.
+    """
+    events = []
+
+    def collect(event: Dict[str, Any]):
+        events.append(event)
+        if recorder is not None:
+            recorder(event)
+
+    started = time.perf_counter()
+    run = {'variant': variant, 'jd_id': jd['id']}
+    try:
+        result = process_jd(
+            client, jd['text'], merge_company_context(company_context, jd.get('company_context')), templates,
+            model, temperature, max_tokens, cache=cache, bypass_cache=bypass_cache,
+            max_retries=max_retries, recorder=collect
+        )
+        run.update({'ok': True, 'error': None,
+                    **score_extraction(result['extraction_results'], result['repaired'])})
+    except Exception as e:
+        run.update({'ok': False, 'error': str(e), **score_extraction({}, {})})
+    run['latency'] = time.perf_counter() - started
+
+    # Cached answers count at the cost of the call that produced them, so a variant's totals
+    # don't depend on whether another variant happened to fill the cache first
+    def cost(event: Dict[str, Any]) -> float:
+        usage = event['usage'] or {}
+        # Each call is priced by the model it was routed to, not the sidebar model
+        return estimate_cost(event.get('model') or model, usage.get('prompt_tokens', 0),
+                             usage.get('completion_tokens', 0)) or 0.0
+
+    run['prompt_tokens'] = sum((event['usage'] or {}).get('prompt_tokens', 0) for event in events)
+    run['completion_tokens'] = sum((event['usage'] or {}).get('completion_tokens', 0) for event in events)
+    run['cost'] = sum(cost(event) for event in events)
+    cached = [event for event in events if event['cached']]
+    run['cached_calls'] = len(cached)
+    run['cached_cost'] = sum(cost(event) for event in cached)
+    return run
+
+
+def run_evaluation(client, variants: Dict[str, Dict[str, str]], jds: List[Dict[str, Any]],
+                   company_context: Dict[str, str], model: str, temperature: float,
+                   max_tokens: int, concurrency: int = 4, cache=None, bypass_cache: bool = False,
+                   max_retries: int = 0, recorder=None) -> Iterator[Dict[str, Any]]:
+    """Run every variant on every JD with bounded concurrency, yielding runs as they finish
+
+    variants maps each variant name to its full set of prompt templates.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [
+            executor.submit(
+                _run_cell, client, variant, templates, jd, company_context, model,
+                temperature, max_tokens, cache, bypass_cache, max_retries, recorder
+            )
+            for variant, templates in variants.items()
+            for jd in jds
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def summarize_evaluation(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-variant quality, latency and cost, in the order variants first appear"""
+    by_variant: Dict[str, List[Dict[str, Any]]] = {}
+    for run in runs:
+        by_variant.setdefault(run['variant'], []).append(run)
+
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    summary = []
+    for variant, variant_runs in by_variant.items():
+        latencies = [run['latency'] for run in variant_runs if run['ok']]
+        summary.append({
+            'variant': variant,
+            'runs': len(variant_runs),
+            'failures': sum(1 for run in variant_runs if not run['ok']),
+            'score': mean([run['score'] for run in variant_runs]),
+            'json_valid': mean([run['json_valid'] for run in variant_runs]),
+            'skills_in_range': mean([float(run['skills_in_range']) for run in variant_runs]),
+            'responsibilities_exact': mean([float(run['responsibilities_exact']) for run in variant_runs]),
+            'field_coverage': mean([run['field_coverage'] for run in variant_runs]),
+            'p50_latency_s': percentile(latencies, 0.50),
+            'p95_latency_s': percentile(latencies, 0.95),
+            'prompt_tokens': sum(run['prompt_tokens'] for run in variant_runs),
+            'completion_tokens': sum(run['completion_tokens'] for run in variant_runs),
+            'cost_usd': sum(run['cost'] for run in variant_runs),
+            'cached_calls': sum(run['cached_calls'] for run in variant_runs),
+            'cached_cost_usd': sum(run['cached_cost'] for run in variant_runs)
+        })
+    return summary
+
+
+def build_variants(base_templates: Dict[str, str],
+                   overrides: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """Expand per-variant prompt overrides into full template sets"""
+    return {name: {**base_templates, **override} for name, override in overrides.items()}
+
+
+def run_cli(args) -> int:
+    """Evaluate every variant over the golden set and print the per-variant summary"""
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        print("OPENAI_API_KEY is not set", file=sys.stderr)
+        return 2
+
+    base_templates, warnings = load_prompt_templates(args.prompts_file)
+    for warning in warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+    with open(args.variants, 'r', encoding='utf-8') as f:
+        variants = build_variants(base_templates, json.load(f))
+    jds = [jd for jd in iter_jds(args.golden) if jd['text'].strip()]
+
+    limiter = RateLimiter(args.rpm, args.tpm)
+    client_options = {'max_connections': args.concurrency * 3, 'max_keepalive_connections': args.concurrency * 3,
+                      'max_retries': 0,
+                      'event_hooks': {'request': [limiter.request_hook()], 'response': [limiter.response_hook()]}}
+    try:
+        client, backend_warnings = route_client(
+            create_client(api_key, **client_options), args.backends, args.route,
+            lambda backend: create_client(backend['api_key'], base_url=backend['base_url'], **client_options)
+        )
+        cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    for warning in backend_warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+    recorder = TelemetryLog(args.telemetry_db).recorder(f"eval-{time.strftime('%Y%m%d_%H%M%S')}")
+
+    company_context = {
+        'name': args.company_name,
+        'industry': args.company_industry,
+        'company_size': args.company_size,
+        'headquarters': args.headquarters
+    }
+
+    runs = []
+    for run in run_evaluation(
+        client, variants, jds, company_context, args.model, args.temperature, args.max_tokens,
+        concurrency=args.concurrency, cache=cache, max_retries=args.max_retries, recorder=recorder
+    ):
+        runs.append(run)
+        status = f"score {run['score']:.2f}" if run['ok'] else f"error - {run['error']}"
+        print(f"[{len(runs)}/{len(variants) * len(jds)}] {run['variant']} / {run['jd_id']}: {status}",
+              file=sys.stderr)
+
+    summary = summarize_evaluation(runs)
+    report = {'model': args.model, 'routes': route_labels(client), 'summary': summary, 'runs': runs}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compare prompt variants over a golden set of job descriptions")
+    parser.add_argument("variants", help="JSON file mapping variant names to the prompt templates they override")
+    parser.add_argument("golden", nargs="?", default=DEFAULT_GOLDEN_SET,
+                        help="Text file, directory of .txt/.md files, or JSONL file of golden job descriptions")
+    parser.add_argument("-o", "--output", help="JSON file the full report is written to")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--route", action="append", default=[], metavar="STEP=BACKEND/MODEL",
+                        help="Send one step (enhancement, base_info, skills, responsibilities) to another "
+                             "backend and model, e.g. skills=local/llama-3.1-8b-instruct; repeatable")
+    parser.add_argument("--backends", default="backends.json", help="OpenAI-compatible backends routes can name")
+    parser.add_argument("--temperature", type=float, default=0.4)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4, help="Variant/JD runs in parallel")
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--rpm", type=int, help="Requests per minute to stay under until the API reports its limit")
+    parser.add_argument("--tpm", type=int, help="Tokens per minute to stay under until the API reports its limit")
+    parser.add_argument("--prompts-file", default="saved_prompts.json")
+    parser.add_argument("--cache-dir", default=".response_cache",
+                        help="Response cache directory, or a sqlite:///path or redis:// URL")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--telemetry-db", default="telemetry.db")
+    parser.add_argument("--company-name", default="")
+    parser.add_argument("--company-industry", default="")
+    parser.add_argument("--company-size", default="")
+    parser.add_argument("--headquarters", default="")
+    return parser
+
+
+def main() -> int:
+    load_dotenv()
+    args = build_parser().parse_args()
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1", file=sys.stderr)
+        return 2
+    return run_cli(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
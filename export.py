@@ -0,0 +1,206 @@
+"""Stream stored runs out of the run history as JSONL, compressed JSONL, CSV or Parquet
+
+Examples:
+    python export.py -o runs.jsonl.gz
+    python export.py -o data_engineers.csv --query "data engineer"
+    python export.py -o runs.parquet --db run_history.db
+
+The format follows the output file's extension unless --format is given.
+Runs are read from SQLite a page at a time and written as they are read, so
+exporting thousands of runs uses about as much memory as exporting one.
+zstd needs the zstandard package and Parquet needs pyarrow.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from typing import Dict, Any, BinaryIO, Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+from run_history import RunHistory
+
+# Format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'jsonl': ('.jsonl', 'application/jsonl'),
+    'jsonl.gz': ('.jsonl.gz', 'application/gzip'),
+    'jsonl.zst': ('.jsonl.zst', 'application/zstd'),
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet')
+}
+
+# One row per run for the tabular formats; nested values are JSON-encoded
+FLAT_COLUMNS = (
+    'id', 'created_at', 'source', 'model', 'temperature', 'max_tokens', 'job_title',
+    'seniority_level', 'location', 'skill_count', 'responsibility_count', 'jd_text',
+    'enhanced_text', 'base_info', 'skills', 'responsibilities', 'company_context', 'timings'
+)
+
+# Rows per Parquet row group
+PARQUET_BATCH_SIZE = 500
+
+
+def available_formats() -> List[str]:
+    """Export formats whose optional dependencies are installed"""
+    return [
+        name for name in EXPORT_FORMATS
+        if not (name == 'jsonl.zst' and zstandard is None) and not (name == 'parquet' and pyarrow is None)
+    ]
+
+
+def format_for_path(path: str) -> Optional[str]:
+    """The export format implied by a file name, longest extension first"""
+    for name, (extension, _) in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[1][0])):
+        if path.endswith(extension):
+            return name
+    return None
+
+
+def export_record(run: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored run as written to JSONL, with a readable timestamp"""
+    return {**run, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(run['created_at']))}
+
+
+def flatten_run(run: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored run as one CSV/Parquet row"""
+    results = run['extraction_results'] or {}
+    base_info = results.get('base_info') or {}
+    skills = results.get('skills') or []
+    responsibilities = results.get('responsibilities') or []
+
+    def encoded(value):
+        # Only nested values are JSON; plain text is written as it is
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return None if value is None else str(value)
+
+    return {
+        'id': run['id'],
+        'created_at': export_record(run)['created_at'],
+        'source': run['source'],
+        'model': run['model'],
+        'temperature': run['temperature'],
+        'max_tokens': run['max_tokens'],
+        'job_title': run['job_title'],
+        'seniority_level': encoded(base_info.get('seniority_level')),
+        'location': encoded(base_info.get('location')),
+        'skill_count': len(skills),
+        'responsibility_count': len(responsibilities),
+        'jd_text': run['jd_text'],
+        'enhanced_text': run['enhanced_text'],
+        'base_info': encoded(base_info),
+        'skills': encoded(skills),
+        'responsibilities': encoded(responsibilities),
+        'company_context': encoded(run['company_context']),
+        'timings': encoded(run['timings'])
+    }
+
+
+def _write_jsonl(runs: Iterable[Dict[str, Any]], out) -> int:
+    count = 0
+    for run in runs:
+        out.write(json.dumps(export_record(run), ensure_ascii=False).encode('utf-8') + b'\n')
+        count += 1
+    return count
+
+
+def _write_csv(runs: Iterable[Dict[str, Any]], out: BinaryIO) -> int:
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.DictWriter(text, fieldnames=FLAT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for run in runs:
+        writer.writerow(flatten_run(run))
+        count += 1
+    text.flush()
+    # Leave the caller's stream open
+    text.detach()
+    return count
+
+
+def _write_parquet(runs: Iterable[Dict[str, Any]], out: BinaryIO) -> int:
+    schema = pyarrow.schema([
+        (column, pyarrow.int64() if column in ('id', 'max_tokens', 'skill_count', 'responsibility_count')
+         else pyarrow.float64() if column == 'temperature' else pyarrow.string())
+        for column in FLAT_COLUMNS
+    ])
+    count = 0
+    batch = []
+    with parquet.ParquetWriter(out, schema) as writer:
+        for run in runs:
+            batch.append(flatten_run(run))
+            count += 1
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch or not count:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+    return count
+
+
+def write_export(runs: Iterable[Dict[str, Any]], export_format: str, out: BinaryIO) -> int:
+    """Write runs to a binary stream in the given format as they arrive; returns the run count
+
+    Nothing is buffered beyond the compressor's window or one Parquet row
+    group, so runs can come straight from RunHistory.iter_runs.
+    """
+    if export_format not in available_formats():
+        raise ValueError(f"Export format {export_format!r} is unknown or its package is not installed")
+    if export_format == 'jsonl':
+        return _write_jsonl(runs, out)
+    if export_format == 'jsonl.gz':
+        with gzip.GzipFile(fileobj=out, mode='wb') as compressed:
+            return _write_jsonl(runs, compressed)
+    if export_format == 'jsonl.zst':
+        with zstandard.ZstdCompressor().stream_writer(out, closefd=False) as compressed:
+            return _write_jsonl(runs, compressed)
+    if export_format == 'csv':
+        return _write_csv(runs, out)
+    return _write_parquet(runs, out)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Export stored runs from the run history")
+    parser.add_argument("-o", "--output", required=True, help="File to write; '-' writes to stdout")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS),
+                        help="Export format (default: taken from the output file extension)")
+    parser.add_argument("--query", default="", help="Only export runs whose JD text or job title match")
+    parser.add_argument("--db", default="run_history.db", help="Run history SQLite file")
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    export_format = args.format or format_for_path(args.output)
+    if export_format is None:
+        print("Can't tell the format from the output name; pass --format", file=sys.stderr)
+        return 2
+    if export_format not in available_formats():
+        print(f"{export_format} export needs {'zstandard' if export_format == 'jsonl.zst' else 'pyarrow'}",
+              file=sys.stderr)
+        return 2
+
+    runs = RunHistory(args.db).iter_runs(args.query)
+    if args.output == '-':
+        count = write_export(runs, export_format, sys.stdout.buffer)
+    else:
+        with open(args.output, 'wb') as out:
+            count = write_export(runs, export_format, out)
+    print(f"Exported {count} runs as {export_format}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
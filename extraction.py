@@ -0,0 +1,358 @@
+import hashlib
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional
+
+from llm import StepRouter, chat_completion, resolve_client
+from prompts import (
+    REPAIR_SYSTEM_PROMPT,
+    SINGLE_PASS_SYSTEM_PROMPT,
+    build_repair_prompt,
+    build_single_pass_prompt,
+    extraction_prompt_values,
+    render_prompt
+)
+from tokens import (
+    SAFETY_MARGIN_TOKENS,
+    chunk_text,
+    context_window,
+    count_message_tokens,
+    count_tokens,
+    describe_plan,
+    fit_max_tokens,
+    plan_call
+)
+from validation import parse_extraction
+
+# Order in which the extractions are displayed and stored
+EXTRACTION_NAMES = ('base_info', 'skills', 'responsibilities')
+
+EXTRACTION_SYSTEM_PROMPTS = {
+    'base_info': "You are a base info extraction expert. Return ONLY a valid JSON object.",
+    'skills': "You are a skill extraction expert. ALWAYS prioritize the job role over company context. Extract skills appropriate for the specific role, not the company's main business. Return ONLY a JSON array.",
+    'responsibilities': "You are a responsibility extraction expert. Return ONLY a JSON array."
+}
+
+# Caps applied when merging per-chunk results, matching what the prompts ask for
+MAX_MERGED_SKILLS = 10
+MAX_MERGED_RESPONSIBILITIES = 6
+
+
+# Headings of the Step 1 sections that follow everything base info is read from
+# (title and level, industry, experience, summary, required qualifications and
+# the location under work arrangements); the first one to stream in marks the
+# point where base info extraction can start on the partial text, and
+# what follows it never changes the base info result
+_AFTER_BASE_INFO_HEADING = re.compile(
+    r'^[\s#*]*(?:\d{1,2}[.)]\s*)?\**\s*(?:compensation|interview process|key performance indicators)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def base_info_cutoff(text: str, start: int = 0) -> Optional[int]:
+    """Offset in streamed Step 1 text where the base info sections end, or None if not reached yet
+
+    start must be 0 or just after a newline; only text from there on is scanned.
+    """
+    match = _AFTER_BASE_INFO_HEADING.search(text, start)
+    return match.start() if match else None
+
+
+def base_info_text(text: str) -> str:
+    """The part of Step 1 text that base info is read from"""
+    # The heading match can start on a preceding blank line, so trailing whitespace is ignored
+    return text[:base_info_cutoff(text)].rstrip()
+
+
+def extraction_fingerprint(name: str, template: str, enhanced_text: str,
+                           company_context: Dict[str, str], model: str,
+                           temperature: float, max_tokens: int) -> str:
+    """Hash everything that determines an extraction's output, to tell when it needs re-running
+
+    Base info only hashes the sections it reads, so a result from text cut
+    off before the later sections stays current for the finished text.
+    """
+    if name == 'base_info':
+        enhanced_text = base_info_text(enhanced_text)
+    payload = json.dumps({
+        'name': name,
+        'system_prompt': EXTRACTION_SYSTEM_PROMPTS[name],
+        'template': template,
+        'enhanced_text': enhanced_text,
+        'company_context': company_context,
+        'model': model,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _sum_usage(usages: List[Optional[Dict[str, int]]]) -> Optional[Dict[str, int]]:
+    """Add up the token usage of several calls, ignoring calls without usage"""
+    known = [usage for usage in usages if usage]
+    if not known:
+        return None
+    return {key: sum(usage[key] for usage in known)
+            for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')}
+
+
+def _validate_with_repair(client, name: str, output: Optional[str], model: str, max_tokens: int,
+                          cache=None, bypass_cache: bool = False, max_retries: int = 0,
+                          recorder=None) -> Dict[str, Any]:
+    """Parse and validate an extraction output, asking the model to fix it once if that fails
+
+    Local repair (code fences, surrounding prose, trailing commas) is tried
+    first; only output that still fails gets one targeted retry, which sends
+    the bad output and its problems rather than redoing the extraction.
+    Returns parse_extraction's result plus the retry's usage, if any.
+    """
+    parsed = parse_extraction(name, output)
+    parsed['repaired'] = 'local' if parsed['repaired'] else None
+    parsed['usage'] = None
+    if parsed['data'] is not None or not output:
+        return parsed
+
+    repair = chat_completion(
+        client, model, REPAIR_SYSTEM_PROMPT, build_repair_prompt(name, output, parsed['errors']),
+        0.0, max_tokens, cache=cache, bypass_cache=bypass_cache, max_retries=max_retries,
+        step=f"{name}_repair", recorder=recorder
+    )
+    retried = parse_extraction(name, repair['content'])
+    retried['repaired'] = 'retry' if retried['data'] is not None else None
+    retried['usage'] = repair['usage']
+    return retried
+
+
+def _run_single_extraction(client, name: str, prompt: str, model: str,
+                           temperature: float, max_tokens: int, cache=None,
+                           bypass_cache: bool = False, max_retries: int = 0,
+                           recorder=None) -> Dict[str, Any]:
+    """Run one extraction call and validate its output, capturing timing and any error
+
+    data holds the parsed, validated result; text is its pretty-printed
+    JSON, or the raw output when validation failed.
+    """
+    started = time.perf_counter()
+    try:
+        result = chat_completion(
+            client, model, EXTRACTION_SYSTEM_PROMPTS[name], prompt, temperature, max_tokens,
+            cache=cache, bypass_cache=bypass_cache, max_retries=max_retries,
+            step=name, recorder=recorder
+        )
+        parsed = _validate_with_repair(
+            client, name, result['content'], model, max_tokens,
+            cache=cache, bypass_cache=bypass_cache, max_retries=max_retries, recorder=recorder
+        )
+        valid = parsed['data'] is not None
+        return {
+            'name': name,
+            'text': json.dumps(parsed['data'], indent=2) if valid else result['content'],
+            'data': parsed['data'],
+            'repaired': parsed['repaired'],
+            'elapsed': time.perf_counter() - started,
+            'usage': _sum_usage([result['usage'], parsed['usage']]),
+            'cached': result['cached'],
+            'error': None if valid else f"Invalid {name} output: {'; '.join(parsed['errors'])}"
+        }
+    except Exception as e:
+        return {'name': name, 'text': None, 'data': None, 'repaired': None,
+                'elapsed': time.perf_counter() - started,
+                'usage': None, 'cached': False, 'error': str(e)}
+
+
+def run_extractions(client, prompts: Dict[str, str], model: str, temperature: float,
+                    max_tokens: int, max_workers: int = 3, cache=None,
+                    bypass_cache: bool = False, max_retries: int = 0,
+                    recorder=None) -> Iterator[Dict[str, Any]]:
+    """Dispatch all extraction calls concurrently and yield each result as it finishes"""
+    if not prompts:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as executor:
+        futures = [
+            executor.submit(_run_single_extraction, client, name, prompt, model, temperature,
+                            max_tokens, cache, bypass_cache, max_retries, recorder)
+            for name, prompt in prompts.items()
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_single_pass_extraction(client, templates: Dict[str, str], enhanced_text: str,
+                               company_context: Dict[str, str], model: str, temperature: float,
+                               max_tokens: int, cache=None, bypass_cache: bool = False,
+                               max_retries: int = 0, recorder=None) -> Dict[str, Any]:
+    """Run all extractions in one JSON-mode call and split the result per extraction
+
+    templates maps each extraction name to its prompt template. Returns the
+    per-extraction parsed data and texts (pretty-printed JSON) alongside
+    timing and usage; a part that fails validation gets one repair retry.
+    """
+    started = time.perf_counter()
+    prompt = build_single_pass_prompt(templates, enhanced_text, company_context)
+    try:
+        plan = plan_call(model, SINGLE_PASS_SYSTEM_PROMPT, prompt, max_tokens)
+        if fit_max_tokens(plan) is None:
+            raise ValueError(f"Too long for a single pass ({describe_plan(plan)}); use the three-call mode, "
+                             "which splits long text into chunks")
+        result = chat_completion(
+            client, model, SINGLE_PASS_SYSTEM_PROMPT, prompt, temperature, fit_max_tokens(plan),
+            cache=cache, bypass_cache=bypass_cache, max_retries=max_retries,
+            response_format={"type": "json_object"},
+            step='single_pass', recorder=recorder
+        )
+        combined = json.loads(result['content'])
+        missing = [name for name in templates if name not in combined]
+        if missing:
+            raise ValueError(f"Single-pass response is missing: {', '.join(missing)}")
+
+        data, texts, repaired, errors = {}, {}, {}, []
+        usages = [result['usage']]
+        for name in templates:
+            parsed = _validate_with_repair(
+                client, name, json.dumps(combined[name]), model, max_tokens,
+                cache=cache, bypass_cache=bypass_cache, max_retries=max_retries, recorder=recorder
+            )
+            usages.append(parsed['usage'])
+            if parsed['data'] is None:
+                errors.append(f"Invalid {name} output: {'; '.join(parsed['errors'])}")
+                continue
+            data[name] = parsed['data']
+            texts[name] = json.dumps(parsed['data'], indent=2)
+            repaired[name] = parsed['repaired']
+        return {
+            'data': data,
+            'texts': texts,
+            'repaired': repaired,
+            'elapsed': time.perf_counter() - started,
+            'usage': _sum_usage(usages),
+            'cached': result['cached'],
+            'error': "; ".join(errors) or None
+        }
+    except Exception as e:
+        return {'data': {}, 'texts': {}, 'repaired': {}, 'elapsed': time.perf_counter() - started,
+                'usage': None, 'cached': False, 'error': str(e)}
+
+
+def plan_extraction_chunks(templates: Dict[str, str], enhanced_text: str,
+                           company_context: Dict[str, str], model: str,
+                           max_tokens: int, window: Optional[int] = None) -> List[str]:
+    """Split the enhanced text so every extraction prompt fits the model's context window
+
+    templates maps each extraction name to its prompt template; window
+    overrides the model's known window. Returns the text unchanged as a
+    single chunk when it already fits.
+    """
+    window = window or context_window(model)
+    empty_values = extraction_prompt_values('', company_context)
+    # The largest prompt without any job text sets the fixed per-call overhead
+    overhead = max(
+        count_message_tokens([
+            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPTS[name]},
+            {"role": "user", "content": render_prompt(template, empty_values)}
+        ], model)
+        for name, template in templates.items()
+    )
+    budget = window - max_tokens - overhead - SAFETY_MARGIN_TOKENS
+    if count_tokens(enhanced_text, model) <= budget:
+        return [enhanced_text]
+    if budget <= 0:
+        raise ValueError(
+            f"Max tokens ({max_tokens}) leaves no room for the job description in the "
+            f"{window:,}-token window of {model}; lower Max Tokens."
+        )
+    return chunk_text(enhanced_text, budget, model)
+
+
+def step_context_window(client, step: str, model: str) -> int:
+    """Context window for a step's calls: its backend's configured window, else its routed model's"""
+    configured = client.context_window(step) if isinstance(client, StepRouter) else None
+    return configured or context_window(resolve_client(client, step, model)[1])
+
+
+def planning_model(client, names, model: str) -> str:
+    """The model to plan chunks for: the one with the smallest context window among the extractions' routes"""
+    name = min(names, key=lambda name: step_context_window(client, name, model))
+    return resolve_client(client, name, model)[1]
+
+
+def planning_window(client, names, model: str) -> int:
+    """The smallest context window among the extractions' routes, which every chunk must fit"""
+    return min(step_context_window(client, name, model) for name in names)
+
+
+def merge_extraction_data(name: str, values: List[Any]) -> Any:
+    """Merge one extraction's validated per-chunk results into a single result
+
+    Skills are deduplicated by name, responsibilities by text, and base info
+    keeps the first non-empty value for each field; list results are capped
+    at the counts the prompts ask for.
+    """
+    if name == 'base_info':
+        merged: Dict[str, Any] = {}
+        for value in values:
+            for field, field_value in value.items():
+                if merged.get(field) in (None, '', [], {}):
+                    merged[field] = field_value
+        return merged
+
+    limit = MAX_MERGED_SKILLS if name == 'skills' else MAX_MERGED_RESPONSIBILITIES
+    merged_items = []
+    seen = set()
+    for value in values:
+        for item in value:
+            key = item['skill_name'] if name == 'skills' else item
+            key = key.strip().lower()
+            if key not in seen:
+                seen.add(key)
+                merged_items.append(item)
+    return merged_items[:limit]
+
+
+def run_chunked_extractions(client, templates: Dict[str, str], chunks: List[str],
+                            company_context: Dict[str, str], model: str, temperature: float,
+                            max_tokens: int, max_workers: int = 6, cache=None,
+                            bypass_cache: bool = False, max_retries: int = 0,
+                            recorder=None) -> Iterator[Dict[str, Any]]:
+    """Run every extraction over every chunk concurrently and yield merged results
+
+    A merged result is yielded per extraction as soon as all of its chunks
+    finish; elapsed is the wall-clock time until then.
+    """
+    started = time.perf_counter()
+    pending = {name: len(chunks) for name in templates}
+    partials: Dict[str, Dict[int, Dict[str, Any]]] = {name: {} for name in templates}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(templates) * len(chunks)))) as executor:
+        futures = {}
+        for index, chunk in enumerate(chunks):
+            # Chunks are sized for the full prompts, so responsibilities read all of each one
+            values = extraction_prompt_values(chunk, company_context, excerpt_tokens=None)
+            for name, template in templates.items():
+                future = executor.submit(
+                    _run_single_extraction, client, name, render_prompt(template, values), model,
+                    temperature, max_tokens, cache, bypass_cache, max_retries, recorder
+                )
+                futures[future] = (name, index)
+
+        for future in as_completed(futures):
+            name, index = futures[future]
+            partials[name][index] = future.result()
+            pending[name] -= 1
+            if pending[name]:
+                continue
+
+            results = [partials[name][i] for i in range(len(chunks))]
+            errors = [result['error'] for result in results if result['error']]
+            data = None if errors else merge_extraction_data(name, [result['data'] for result in results])
+            yield {
+                'name': name,
+                'text': None if errors else json.dumps(data, indent=2),
+                'data': data,
+                'repaired': next((result['repaired'] for result in results if result['repaired']), None),
+                'elapsed': time.perf_counter() - started,
+                'usage': _sum_usage([result['usage'] for result in results]),
+                'cached': all(result['cached'] for result in results),
+                'chunks': len(chunks),
+                'error': errors[0] if errors else None
+            }
@@ -0,0 +1,144 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function that noticed it was cancelled"""
+
+
+class Job:
+    """One unit of background work and the state the UI polls
+
+    Job functions report partial output through progress and must not call
+    Streamlit: they run off the script thread.
+    """
+
+    def __init__(self, kind: str, label: str, meta: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.label = label
+        self.meta = meta or {}
+        self.status = JOB_QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result = None
+        self.error: Optional[str] = None
+        self.applied = False
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_event = threading.Event()
+        self._future = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def check_cancelled(self):
+        """Stop the job at a safe point if cancellation was requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Runs jobs on a thread pool so they survive Streamlit reruns and navigation
+
+    Each job gets an id, a status (queued, running, done, failed, cancelled)
+    and cooperative cancellation. Only the most recent finished jobs are kept.
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished: int = 20):
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, kind: str, label: str, fn: Callable, *args,
+               meta: Optional[Dict[str, Any]] = None, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs); its return value becomes job.result"""
+        job = Job(kind, label, meta)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        if job.cancelled:
+            job.status = JOB_CANCELLED
+            job.finished_at = time.time()
+            return
+        job.started_at = time.time()
+        job.status = JOB_RUNNING
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = JOB_DONE
+        except JobCancelled:
+            job.status = JOB_CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job outright, or ask a running one to stop; False if already finished"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel_event.set()
+        if job._future is not None and job._future.cancel():
+            job.status = JOB_CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, kind: Optional[str] = None) -> List[Job]:
+        """All tracked jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(
+            (job for job in jobs if kind is None or job.kind == kind),
+            key=lambda job: job.created_at,
+            reverse=True
+        )
+
+    def active(self, kind: Optional[str] = None) -> List[Job]:
+        return [job for job in self.jobs(kind) if not job.finished]
+
+    def _prune(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished and job.applied),
+            key=lambda job: job.created_at
+        )
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+    def shutdown(self):
+        """Cancel everything and stop the worker threads"""
+        for job in self.active():
+            self.cancel(job.id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
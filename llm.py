@@ -0,0 +1,406 @@
+import hashlib
+import random
+import threading
+import time
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import openai
+
+try:
+    import httpx
+except ImportError:  # newer openai releases ship on the httpx2 fork
+    import httpx2 as httpx
+
+# Connection pool and retry defaults for shared clients
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_CLIENT_RETRIES = 2
+
+# How long an API key check result is trusted before the key is checked again
+KEY_VALIDATION_TTL = 3600.0
+
+# Errors worth retrying: rate limits, dropped connections/timeouts and 5xx responses
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Set in a 429 response's extensions by a rate limiter that will hold the retry itself
+LIMITER_PAUSED = 'rate_limiter_paused'
+
+
+def create_client(api_key: str, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                  max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                  keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                  timeout: float = DEFAULT_TIMEOUT, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                  max_retries: int = DEFAULT_CLIENT_RETRIES,
+                  event_hooks: Optional[Dict[str, list]] = None,
+                  base_url: Optional[str] = None) -> openai.OpenAI:
+    """Create an OpenAI client backed by a keep-alive connection pool
+
+    The client is thread-safe and meant to be created once and shared, so
+    repeated calls reuse open connections and TLS sessions. event_hooks are
+    passed to the underlying httpx client; base_url points it at any
+    OpenAI-compatible server instead of the OpenAI API.
+    """
+    http_client = openai.DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=openai.Timeout(timeout, connect=connect_timeout),
+        event_hooks=event_hooks
+    )
+    return openai.OpenAI(api_key=api_key, http_client=http_client, max_retries=max_retries, base_url=base_url)
+
+
+class StepRouter:
+    """Sends each pipeline step's calls to its own client and model
+
+    Pass it wherever a client is expected: chat_completion and
+    stream_chat_completion ask it for the client and model of their step.
+    routes maps a step name to {'client', 'model', 'backend'} and an
+    optional 'context_window' configured for the backend; repair calls
+    follow their extraction, and unrouted steps go to the default client
+    with the model they were called with.
+    """
+
+    def __init__(self, default_client, routes: Dict[str, Dict[str, Any]]):
+        self.default_client = default_client
+        self.routes = routes
+
+    def _route(self, step: str) -> Optional[Dict[str, Any]]:
+        return self.routes.get(step[:-len('_repair')] if step.endswith('_repair') else step)
+
+    def resolve(self, step: str, model: str) -> Tuple[Any, str]:
+        route = self._route(step)
+        if route is None:
+            return self.default_client, model
+        return route['client'], route['model']
+
+    def context_window(self, step: str) -> Optional[int]:
+        """The window configured for a routed step's backend, if any"""
+        route = self._route(step)
+        return route.get('context_window') if route else None
+
+    def labels(self) -> Dict[str, str]:
+        """backend/model per routed step, for display and for telling runs apart"""
+        return {step: f"{route['backend']}/{route['model']}" for step, route in sorted(self.routes.items())}
+
+    @property
+    def models(self):
+        # Lets check_api_key validate the default client's key
+        return self.default_client.models
+
+
+def resolve_client(client, step: str, model: str) -> Tuple[Any, str]:
+    """The client and model a call for this step goes to"""
+    if isinstance(client, StepRouter):
+        return client.resolve(step, model)
+    return client, model
+
+
+def route_labels(client) -> Dict[str, str]:
+    """The routed steps of a StepRouter as backend/model labels; empty for a plain client"""
+    return client.labels() if isinstance(client, StepRouter) else {}
+
+
+class KeyValidationCache:
+    """Remembers which API keys were accepted or rejected, for a limited time
+
+    Entries are keyed by a SHA-256 hash so the keys themselves are never
+    kept. Results come from an explicit check or from the status of real
+    API responses via response_hook.
+    """
+
+    def __init__(self, ttl: float = KEY_VALIDATION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Any] = {}
+
+    @staticmethod
+    def _fingerprint(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    def get(self, api_key: str) -> Optional[bool]:
+        """Return True/False for a recently checked key, or None if it is unknown or expired"""
+        with self._lock:
+            entry = self._entries.get(self._fingerprint(api_key))
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def set(self, api_key: str, valid: bool):
+        with self._lock:
+            self._entries[self._fingerprint(api_key)] = (valid, time.monotonic())
+
+    def response_hook(self, api_key: str):
+        """httpx response hook that marks the key valid or invalid from real API traffic"""
+        def record_status(response):
+            if response.status_code == 401:
+                self.set(api_key, False)
+            elif response.status_code < 400:
+                self.set(api_key, True)
+        return record_status
+
+
+def check_api_key(client) -> bool:
+    """Check an API key with a models listing, which is cheap and isn't billed
+
+    Returns False when the key is rejected; other errors such as network
+    failures are raised, since they say nothing about the key.
+    """
+    try:
+        client.models.list()
+        return True
+    except openai.AuthenticationError:
+        return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's requested retry delay from an API error, if any"""
+    return retry_after_from_headers(getattr(getattr(error, 'response', None), 'headers', None))
+
+
+def retry_after_from_headers(headers) -> Optional[float]:
+    """Read a retry-after-ms or retry-after header, in seconds"""
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def _create_with_retries(client, max_retries: int, retries: Dict[str, int], **params):
+    """Call chat.completions.create, retrying rate limits and transient errors
+
+    The number of retries taken is written to retries['count'], including
+    when the call finally fails.
+    """
+    retries['count'] = 0
+    while True:
+        try:
+            return client.chat.completions.create(**params)
+        except RETRYABLE_ERRORS as e:
+            if retries['count'] >= max_retries:
+                raise
+            # A rate limiter that saw the 429 already queues the retry until the pause is over
+            response = getattr(e, 'response', None)
+            if not (response is not None and response.extensions.get(LIMITER_PAUSED)):
+                delay = retry_after_seconds(e)
+                time.sleep(delay if delay is not None else backoff_delay(retries['count']))
+            retries['count'] += 1
+
+
+def _record(recorder, step: str, model: str, started: float, usage=None, retries: int = 0,
+            cached: bool = False, error: Optional[str] = None):
+    """Report one call to the telemetry recorder, if any"""
+    if recorder is None:
+        return
+    try:
+        recorder({
+            'step': step,
+            'model': model,
+            'latency': time.perf_counter() - started,
+            'usage': usage,
+            'retries': retries,
+            'cached': cached,
+            'error': error
+        })
+    except Exception:
+        # Telemetry must never break the call it describes
+        pass
+
+
+def _build_messages(system_prompt: str, user_prompt: str):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def usage_to_dict(usage) -> Optional[Dict[str, int]]:
+    """Convert an API usage object into a plain dict of token counts"""
+    if usage is None:
+        return None
+    return {
+        'prompt_tokens': usage.prompt_tokens or 0,
+        'completion_tokens': usage.completion_tokens or 0,
+        'total_tokens': usage.total_tokens or 0
+    }
+
+
+def chat_completion(client, model: str, system_prompt: str, user_prompt: str,
+                    temperature: float, max_tokens: int, cache=None,
+                    bypass_cache: bool = False, max_retries: int = 0,
+                    response_format: Optional[Dict[str, Any]] = None,
+                    step: str = '', recorder=None) -> Dict[str, Any]:
+    """Run a single chat completion and return its text with timing and token usage
+
+    When a response cache is given, identical requests are served from it
+    unless bypass_cache is set, in which case the fresh response replaces
+    the cached one; a miss for a request another caller is already making
+    waits for that response instead of repeating the call. Rate limits and transient errors are retried up to
+    max_retries times with jittered exponential backoff. Every call,
+    including cache hits and failures, is reported to the recorder
+    callback under the given step name. A StepRouter client picks the
+    client and model for that step.
+    """
+    client, model = resolve_client(client, step, model)
+    messages = _build_messages(system_prompt, user_prompt)
+    params = {'temperature': temperature, 'max_tokens': max_tokens}
+    if response_format is not None:
+        params['response_format'] = response_format
+    started = time.perf_counter()
+
+    cache_key = None
+    claim = None
+    if cache is not None:
+        cache_key = cache.make_key(model, messages, **params)
+        if not bypass_cache:
+            # An identical request already in flight is waited for rather than repeated
+            cached, claim = cache.get_or_claim(cache_key)
+            if cached is not None:
+                _record(recorder, step, model, started, usage=cached.get('usage'), cached=True)
+                return {
+                    'content': cached['content'],
+                    'elapsed': time.perf_counter() - started,
+                    'usage': cached.get('usage'),
+                    'cached': True
+                }
+
+    try:
+        retries = {}
+        try:
+            response = _create_with_retries(
+                client, max_retries, retries, model=model, messages=messages, **params
+            )
+        except Exception as e:
+            _record(recorder, step, model, started, retries=retries.get('count', 0), error=str(e))
+            raise
+        content = response.choices[0].message.content
+        usage = usage_to_dict(getattr(response, 'usage', None))
+        _record(recorder, step, model, started, usage=usage, retries=retries['count'])
+
+        if cache_key is not None:
+            try:
+                cache.set(cache_key, {'content': content, 'usage': usage})
+            except OSError:
+                # A cache write failure should never fail the call itself
+                pass
+    finally:
+        if claim is not None:
+            cache.release(cache_key, claim)
+
+    return {
+        'content': content,
+        'elapsed': time.perf_counter() - started,
+        'usage': usage,
+        'cached': False
+    }
+
+
+def stream_chat_completion(client, model: str, system_prompt: str, user_prompt: str,
+                           temperature: float, max_tokens: int, stats: Dict[str, Any],
+                           cache=None, bypass_cache: bool = False,
+                           max_retries: int = 0, step: str = '',
+                           recorder=None) -> Iterator[str]:
+    """Stream a chat completion, yielding text deltas as they arrive
+
+    Once the generator is exhausted, stats holds the full content, total
+    elapsed time, time to first token, completion token count and
+    tokens per second. Cached responses, including ones another caller
+    was still streaming when this one started, are yielded in one piece.
+    """
+    client, model = resolve_client(client, step, model)
+    messages = _build_messages(system_prompt, user_prompt)
+    started = time.perf_counter()
+    stats.update({'content': '', 'cached': False, 'usage': None, 'ttft': None, 'completion_tokens': 0,
+                  'tokens_per_second': None, 'elapsed': 0.0})
+
+    cache_key = None
+    claim = None
+    if cache is not None:
+        cache_key = cache.make_key(model, messages, temperature=temperature, max_tokens=max_tokens)
+        if not bypass_cache:
+            cached, claim = cache.get_or_claim(cache_key)
+            if cached is not None:
+                stats.update({'content': cached['content'], 'cached': True, 'usage': cached.get('usage'),
+                              'ttft': time.perf_counter() - started,
+                              'elapsed': time.perf_counter() - started})
+                _record(recorder, step, model, started, usage=cached.get('usage'), cached=True)
+                yield cached['content']
+                return
+
+    try:
+        retries = {}
+        try:
+            stream = _create_with_retries(
+                client, max_retries, retries,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        except Exception as e:
+            _record(recorder, step, model, started, retries=retries.get('count', 0), error=str(e))
+            raise
+
+        parts = []
+        chunk_count = 0
+        usage = None
+        try:
+            for chunk in stream:
+                # The final chunk carries usage and no choices
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if stats['ttft'] is None:
+                    stats['ttft'] = time.perf_counter() - started
+                chunk_count += 1
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            _record(recorder, step, model, started, retries=retries['count'], error=str(e))
+            raise
+
+        elapsed = time.perf_counter() - started
+        content = ''.join(parts)
+        # Each streamed chunk is roughly one token when the API doesn't report usage
+        completion_tokens = usage.completion_tokens if usage else chunk_count
+        generation_time = elapsed - (stats['ttft'] or 0)
+        stats.update({
+            'content': content,
+            'usage': usage_to_dict(usage),
+            'elapsed': elapsed,
+            'completion_tokens': completion_tokens,
+            'tokens_per_second': completion_tokens / generation_time if generation_time > 0 else None
+        })
+
+        _record(recorder, step, model, started, usage=stats['usage'], retries=retries['count'])
+
+        if cache_key is not None:
+            try:
+                cache.set(cache_key, {'content': content, 'usage': stats['usage']})
+            except OSError:
+                pass
+    finally:
+        if claim is not None:
+            cache.release(cache_key, claim)
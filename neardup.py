@@ -0,0 +1,73 @@
+import hashlib
+import random
+import re
+import struct
+from functools import lru_cache
+from typing import List, Set, Tuple
+
+# Word shingles of this length are compared between job descriptions
+SHINGLE_SIZE = 5
+
+# Signature length and LSH banding: 16 bands of 4 rows make runs with
+# roughly 50% or more shingle overlap candidates, which are then checked
+# against the similarity threshold
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 61) - 1
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Fixed seed: signatures are stored, so the permutations must never change
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_SIGNATURE_FORMAT = f'<{NUM_PERMUTATIONS}Q'
+
+
+def shingles(text: str) -> Set[int]:
+    """64-bit hashes of the overlapping word shingles in lowercased text"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        groups = [words] if words else []
+    else:
+        groups = [words[index:index + SHINGLE_SIZE] for index in range(len(words) - SHINGLE_SIZE + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(' '.join(group).encode('utf-8'), digest_size=8).digest(), 'little')
+        for group in groups
+    }
+
+
+@lru_cache(maxsize=128)
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature of a text; memoized since the UI checks the same JD on every rerun"""
+    hashes = shingles(text)
+    if not hashes:
+        return (_MAX_HASH,) * NUM_PERMUTATIONS
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERMUTATIONS
+
+
+def lsh_buckets(signature: Tuple[int, ...]) -> List[str]:
+    """One bucket key per band; texts sharing any bucket are near-duplicate candidates"""
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'<{ROWS_PER_BAND}Q', *rows), digest_size=8).hexdigest()
+        buckets.append(f"{band}:{digest}")
+    return buckets
+
+
+def pack_signature(signature: Tuple[int, ...]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack_signature(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(_SIGNATURE_FORMAT, data)
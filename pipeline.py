@@ -0,0 +1,204 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, Optional
+
+from extraction import (
+    EXTRACTION_NAMES,
+    base_info_cutoff,
+    plan_extraction_chunks,
+    planning_model,
+    planning_window,
+    run_chunked_extractions,
+    run_extractions,
+    step_context_window
+)
+from llm import chat_completion, resolve_client, stream_chat_completion
+from prompts import (
+    ENHANCEMENT_SYSTEM_PROMPT,
+    compile_template,
+    step1_prompt_values,
+    extraction_prompt_values,
+    render_prompt
+)
+from tokens import (
+    REPLY_PRIMER_TOKENS,
+    TOKENS_PER_MESSAGE,
+    count_tokens,
+    describe_plan,
+    fit_max_tokens,
+    plan_call,
+    plan_tokens
+)
+
+def build_extraction_prompts(enhanced_text: str, company_context: Dict[str, str],
+                             templates: Dict[str, str]) -> Dict[str, str]:
+    """Render the three Step 2 prompts for an enhanced job description"""
+    values = extraction_prompt_values(enhanced_text, company_context)
+    return {name: render_prompt(templates[f"{name}_prompt"], values) for name in EXTRACTION_NAMES}
+
+
+def estimate_enhancement_plan(model: str, template: str, values: Dict[str, str],
+                              max_tokens: int, window: Optional[int] = None) -> Dict[str, Any]:
+    """Approximate Step 1 token budget for display, without rendering the prompt"""
+    input_tokens = 2 * TOKENS_PER_MESSAGE + REPLY_PRIMER_TOKENS \
+        + count_tokens(ENHANCEMENT_SYSTEM_PROMPT, model) \
+        + compile_template(template).count_tokens(values, model)
+    return plan_tokens(model, input_tokens, max_tokens, window)
+
+
+def fit_enhancement_budget(model: str, prompt: str, max_tokens: int,
+                           window: Optional[int] = None) -> Dict[str, Any]:
+    """Check the Step 1 prompt against the context window before sending it
+
+    Returns the plan and the max_tokens to use, lowered (with a warning) when
+    input plus max_tokens would overflow. Raises ValueError when the input
+    alone doesn't fit, since that call could only fail.
+    """
+    plan = plan_call(model, ENHANCEMENT_SYSTEM_PROMPT, prompt, max_tokens, window)
+    fitted = fit_max_tokens(plan)
+    if fitted is None:
+        raise ValueError(
+            f"The job description is too long for {model}: {describe_plan(plan)}. "
+            "Shorten the text or choose a model with a larger context window."
+        )
+    warning = None
+    if fitted < max_tokens:
+        warning = (f"Input plus max tokens exceeds the {plan['context_window']:,}-token window; "
+                   f"max tokens lowered from {max_tokens:,} to {fitted:,}.")
+    return {'plan': plan, 'max_tokens': fitted, 'warning': warning}
+
+
+def enhance_jd(client, jd_text: str, company_context: Dict[str, str], templates: Dict[str, str],
+               model: str, temperature: float, max_tokens: int, cache=None,
+               bypass_cache: bool = False, max_retries: int = 0, recorder=None) -> Dict[str, Any]:
+    """Step 1: enhance a raw job description"""
+    prompt = render_prompt(templates['step1_prompt'], step1_prompt_values(jd_text, company_context))
+    budget = fit_enhancement_budget(
+        resolve_client(client, 'enhancement', model)[1], prompt, max_tokens,
+        step_context_window(client, 'enhancement', model)
+    )
+    return chat_completion(
+        client, model, ENHANCEMENT_SYSTEM_PROMPT, prompt, temperature, budget['max_tokens'],
+        cache=cache, bypass_cache=bypass_cache, max_retries=max_retries, step='enhancement', recorder=recorder
+    )
+
+
+def process_jd(client, jd_text: str, company_context: Dict[str, str], templates: Dict[str, str],
+               model: str, temperature: float, max_tokens: int, cache=None,
+               bypass_cache: bool = False, max_retries: int = 0, recorder=None) -> Dict[str, Any]:
+    """Run the full enhance -> extract pipeline for one job description
+
+    extraction_results holds the parsed, validated objects; repaired notes
+    which of them needed a local fix or a repair retry. Raises RuntimeError
+    if any extraction fails, so callers can retry the item.
+    """
+    started = time.perf_counter()
+    enhancement = enhance_jd(
+        client, jd_text, company_context, templates, model, temperature, max_tokens,
+        cache=cache, bypass_cache=bypass_cache, max_retries=max_retries, recorder=recorder
+    )
+    enhanced_text = enhancement['content']
+
+    extraction_templates = {name: templates[f"{name}_prompt"] for name in EXTRACTION_NAMES}
+    chunks = plan_extraction_chunks(
+        extraction_templates, enhanced_text, company_context,
+        planning_model(client, extraction_templates, model), max_tokens,
+        planning_window(client, extraction_templates, model)
+    )
+    if len(chunks) == 1:
+        prompts = build_extraction_prompts(enhanced_text, company_context, templates)
+        extraction_results = run_extractions(
+            client, prompts, model, temperature, max_tokens,
+            cache=cache, bypass_cache=bypass_cache, max_retries=max_retries, recorder=recorder
+        )
+    else:
+        # Oversized text: extract per chunk and merge
+        extraction_results = run_chunked_extractions(
+            client, extraction_templates, chunks, company_context, model, temperature, max_tokens,
+            cache=cache, bypass_cache=bypass_cache, max_retries=max_retries, recorder=recorder
+        )
+    results = {result['name']: result for result in extraction_results}
+
+    failed = {name: result['error'] for name, result in results.items() if result['error']}
+    if failed:
+        raise RuntimeError("; ".join(f"{name}: {error}" for name, error in failed.items()))
+
+    timings = {'enhancement': enhancement['elapsed'], 'chunks': len(chunks)}
+    timings.update({name: result['elapsed'] for name, result in results.items()})
+    timings['total'] = time.perf_counter() - started
+
+    return {
+        'enhanced_text': enhanced_text,
+        'extraction_results': {name: results[name]['data'] for name in EXTRACTION_NAMES},
+        'repaired': {name: results[name]['repaired'] for name in EXTRACTION_NAMES},
+        'timings': timings
+    }
+
+
+def _run_extraction_templates(client, templates: Dict[str, str], enhanced_text: str,
+                              company_context: Dict[str, str], model: str, temperature: float,
+                              max_tokens: int, **options) -> Dict[str, Dict[str, Any]]:
+    """Run extractions on one text, chunking it if needed; results by name"""
+    chunks = plan_extraction_chunks(
+        templates, enhanced_text, company_context, planning_model(client, templates, model), max_tokens,
+        planning_window(client, templates, model)
+    )
+    if len(chunks) == 1:
+        values = extraction_prompt_values(enhanced_text, company_context)
+        prompts = {name: render_prompt(template, values) for name, template in templates.items()}
+        results = run_extractions(client, prompts, model, temperature, max_tokens, **options)
+    else:
+        results = run_chunked_extractions(
+            client, templates, chunks, company_context, model, temperature, max_tokens, **options
+        )
+    return {result['name']: result for result in results}
+
+
+def stream_pipelined(client, model: str, prompt: str, temperature: float, max_tokens: int,
+                     stats: Dict[str, Any], templates: Dict[str, str], company_context: Dict[str, str],
+                     cache=None, bypass_cache: bool = False, max_retries: int = 0,
+                     recorder=None) -> Iterator[str]:
+    """Stream Step 1 and overlap Step 2 with it, yielding text deltas like stream_chat_completion
+
+    Base info extraction starts on the partial text as soon as the sections
+    it reads from have streamed in; skills and responsibilities need the
+    whole text and start when the stream ends. Once the generator is
+    exhausted, stats holds the enhancement stats plus 'extractions' (results
+    by name), 'base_info_started' (seconds into the stream, None if the
+    cutoff never appeared and base info waited for the full text),
+    'base_info_chars' (length of the text it saw) and 'wall_clock' for the
+    whole enhance -> extract run.
+    """
+    started = time.perf_counter()
+    options = {'cache': cache, 'bypass_cache': bypass_cache, 'max_retries': max_retries, 'recorder': recorder}
+    stats.update({'extractions': {}, 'base_info_started': None, 'base_info_chars': None})
+    text = ''
+    early = None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for delta in stream_chat_completion(
+            client, model, ENHANCEMENT_SYSTEM_PROMPT, prompt, temperature, max_tokens, stats,
+            step='enhancement', **options
+        ):
+            # Rescan only from the line the delta started on
+            scan_from = text.rfind('\n') + 1
+            text += delta
+            yield delta
+            if early is None:
+                cutoff = base_info_cutoff(text, scan_from)
+                if cutoff is not None:
+                    stats['base_info_started'] = time.perf_counter() - started
+                    stats['base_info_chars'] = cutoff
+                    early = executor.submit(
+                        _run_extraction_templates, client, {'base_info': templates['base_info']}, text[:cutoff],
+                        company_context, model, temperature, max_tokens, **options
+                    )
+
+        remaining = {name: templates[name] for name in EXTRACTION_NAMES if early is None or name != 'base_info'}
+        if early is None:
+            stats['base_info_chars'] = len(text)
+        stats['extractions'] = _run_extraction_templates(
+            client, remaining, text, company_context, model, temperature, max_tokens, **options
+        )
+        if early is not None:
+            stats['extractions'].update(early.result())
+    stats['wall_clock'] = time.perf_counter() - started
@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+
+class PromptStore:
+    """In-memory view of the saved prompts file, reloaded only when it changes on disk
+
+    Saved prompts stay in the flat {name: template} JSON file; every save is
+    also appended to a JSONL history file so earlier versions can be restored.
+    Writes are serialized with a lock (a file lock across processes where
+    available) and land atomically via a temp file and rename.
+    """
+
+    def __init__(self, path: str = "saved_prompts.json", history_path: Optional[str] = None,
+                 check_interval: float = 1.0):
+        self.path = path
+        self.history_path = history_path or os.path.splitext(path)[0] + "_history.jsonl"
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._prompts: Dict[str, str] = {}
+        self._signature = None
+        self._last_check = 0.0
+        self._history: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._history_signature = None
+        self._history_last_check = 0.0
+
+    @staticmethod
+    def _file_signature(path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self, force: bool = False):
+        """Reload the prompts file if its mtime or size changed since the last load"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        signature = self._file_signature(self.path)
+        if signature == self._signature and not force:
+            return
+        if signature is None:
+            self._prompts = {}
+        else:
+            with open(self.path, 'r') as f:
+                self._prompts = json.load(f)
+        self._signature = signature
+
+    def get(self, name: str, default: str) -> str:
+        """Return a saved prompt, or the default when none is saved"""
+        with self._lock:
+            self._refresh()
+            return self._prompts.get(name, default)
+
+    def all(self) -> Dict[str, str]:
+        """Return a copy of every saved prompt"""
+        with self._lock:
+            self._refresh()
+            return dict(self._prompts)
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers within this process and, where supported, across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_atomic(self, prompts: Dict[str, str]):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(prompts, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save(self, name: str, content: str) -> int:
+        """Save a prompt and record it in the history; returns its new version number"""
+        with self._write_lock():
+            # Re-read under the lock so concurrent sessions don't drop each other's saves
+            self._refresh(force=True)
+            prompts = dict(self._prompts)
+            prompts[name] = content
+            self._write_atomic(prompts)
+
+            self._history_last_check = 0.0
+            version = len(self._load_history().get(name, [])) + 1
+            entry = {'name': name, 'version': version, 'content': content,
+                     'saved_at': time.strftime("%Y-%m-%d %H:%M:%S")}
+            with open(self.history_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+            self._prompts = prompts
+            self._signature = self._file_signature(self.path)
+            self._history.setdefault(name, []).append(entry)
+            self._history_signature = self._file_signature(self.history_path)
+            return version
+
+    def reset(self) -> bool:
+        """Remove all saved prompts; history is kept so versions can still be restored"""
+        with self._write_lock():
+            existed = os.path.exists(self.path)
+            if existed:
+                os.remove(self.path)
+            self._refresh(force=True)
+            return existed
+
+    def _load_history(self) -> Dict[str, List[Dict[str, Any]]]:
+        now = time.monotonic()
+        if self._history is not None and now - self._history_last_check < self.check_interval:
+            return self._history
+        self._history_last_check = now
+        signature = self._file_signature(self.history_path)
+        if self._history is not None and signature == self._history_signature:
+            return self._history
+        history: Dict[str, List[Dict[str, Any]]] = {}
+        if signature is not None:
+            with open(self.history_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    history.setdefault(entry['name'], []).append(entry)
+        self._history = history
+        self._history_signature = signature
+        return history
+
+    def history(self, name: str) -> List[Dict[str, Any]]:
+        """Return every saved version of a prompt, oldest first"""
+        with self._lock:
+            return list(self._load_history().get(name, []))
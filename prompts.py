@@ -0,0 +1,516 @@
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from prompt_store import PromptStore
+from tokens import count_tokens, truncate_to_tokens
+from validation import PROFICIENCY_LEVELS, SENIORITY_LEVELS, SKILL_TYPES
+
+# Prompts are stored as templates with {slot} placeholders for the values that
+# change per job description, so the same prompt can be reused across inputs.
+PROMPT_NAMES = ('step1_prompt', 'skills_prompt', 'responsibilities_prompt', 'base_info_prompt')
+
+# Input slots a prompt cannot work without
+REQUIRED_SLOTS = {
+    'step1_prompt': ('jd_text',),
+    'skills_prompt': ('enhanced_text',),
+    'responsibilities_prompt': ('enhanced_text_excerpt',),
+    'base_info_prompt': ('enhanced_text',)
+}
+
+# The responsibilities prompt only needs the start of the enhanced text
+RESPONSIBILITIES_EXCERPT_TOKENS = 1000
+
+_SLOT_PATTERN = re.compile(r'\{(\w+)\}')
+_LINE_ENDINGS = re.compile(r'\r\n?')
+_SPACE_RUNS = re.compile(r'(?<=\S)[ \t\u00a0]+')
+_TRAILING_SPACE = re.compile(r'[ \t]+\n')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+ENHANCEMENT_SYSTEM_PROMPT = "You are a world-class job description enhancement specialist with deep expertise in HR, recruiting, and talent acquisition. Your job is to transform basic job descriptions into comprehensive, precise, and compelling documents focused on the job content itself. DO NOT include company information sections. Focus on enhancing and structuring the actual job requirements, responsibilities, and qualifications. For industry classification, use ONLY actual business sector industries (not job functions) from standard categories. Return only formatted text paragraphs, not JSON. For skills, use format 'Skill Name (Proficiency Level)' not JSON objects."
+
+STEP1_PROMPT_TEMPLATE = """You are a professional job description writer and enhancer with expertise in talent acquisition and HR. 
+Extract and significantly enhance the following job description to create a comprehensive, compelling, and precise document.
+
+Your task is to transform this job description into a well-formatted, enhanced text document that covers all the important fields that would typically be in a structured job description. The output should be in PLAIN TEXT format for display in a simple text box.
+
+{company_context}
+
+# ENHANCEMENT REQUIREMENTS:
+
+## Format the output as readable plain text covering these sections:
+1. Job Title and Basic Information - Include job title, job code (if any), department, job level, job function, and seniority level
+2. Industry Classification - List the most relevant industries this position belongs to
+3. Experience Requirements - Detail the experience range and qualifications needed
+4. Job Summary - A comprehensive overview of the position
+5. Key Responsibilities - Detailed list of what the person will do
+6. Required Qualifications - Education, experience, and mandatory requirements including college/university preferences
+7. Preferred Qualifications - Nice-to-have qualifications, postgraduate degrees, and field of study preferences
+8. Skills Required - Technical, domain, and soft skills with proficiency levels
+9. Languages and Certifications - Required languages and certifications (if any). If no specific language is mentioned, automatically detect the language of the input text and list it as a required language with "Fluent" proficiency
+10. Work Environment and Arrangements:
+    - Employment type (full-time, part-time, contract)
+    - Workplace type (remote, hybrid, onsite)
+    - Location information
+    - Travel requirements and shift types
+11. Compensation and Benefits (if specified):
+    - Base salary and salary ranges
+    - Benefits package and perks
+    - Relocation assistance and visa sponsorship details
+12. Interview Process (if specified):
+    - Number of interview rounds
+    - Reporting structure and team dynamics
+13. Key Performance Indicators - Success metrics for the role
+
+# DETAILED ENHANCEMENT INSTRUCTIONS:
+
+## IMPORTANT: FOCUS ON JOB CONTENT ONLY
+- DO NOT include company information sections
+- Focus entirely on the job description content and requirements
+- Enhance and structure the actual job-related information
+- Make the output clean, professional, and focused on the role itself
+
+## For ALL fields:
+- Transform vague or generic descriptions into specific, detailed, and meaningful content
+- Use professional, industry-standard terminology and clear language
+- Ensure all content is actionable, measurable, and relevant for candidate evaluation
+- For any fields with no information available, mention "Not specified" or skip the section
+- Remove redundant language and filler content that doesn't add value
+- **CRITICAL: PRESERVE ALL INFORMATION** - Ensure no information from the original job description is lost or omitted. Every detail, requirement, qualification, responsibility, and specification must be included in the enhanced output
+
+## EXCLUSIVE GUIDELINE -
+- Use every single field provided as context or input.
+- Establish a user-based relationship by leveraging all available context.
+- When generating or enhancing the job description, identify and incorporate all context in a logical, coherent flow.
+- Ensure the flow of information justifies the creation or enhancement of the job description.
+- The enhanced job description must contribute to the relevance and accuracy of future candidate searches.
+- Prioritize sub-industry and company context provided by the user for industry tagging. If additional relevant industries are found, add them; if any are missing, note as such.
+
+## JOB TITLE GENERATION (MOST CRITICAL - COMPREHENSIVE ANALYSIS ACROSS ALL PARAMETERS):
+- Generate exactly 4-5 OPTIMAL job titles through COMPREHENSIVE PARAMETER ANALYSIS
+- Analyze ALL parameters: responsibilities, skills, experience level, company industry, company size, company stage, qualifications, and role scope
+- These titles MUST be optimized for LinkedIn matching and cover different ways this role might be advertised across ALL industries
+- Base titles on COMPLETE analysis of job content, company context, and market standards
+
+## IMPORTANT OUTPUT FORMAT:
+- Return ONLY formatted text paragraphs, NOT JSON
+- Use clear section headers with proper formatting
+- Make the text readable and professional with good spacing
+- Include all relevant information in a structured, easy-to-read format
+- Do NOT include any JSON formatting, brackets, or technical syntax
+- The output should be human-readable text suitable for display in a text box
+- For skills: Use format "Skill Name (Proficiency Level)" - NOT JSON objects
+- For all sections: Use bullet points or numbered lists with plain text, not structured data
+- **SPACING**: Add extra line breaks between sections for better readability
+- **SECTION SEPARATION**: Use clear visual separation between major sections
+- **FORMATTING**: Use consistent formatting with proper indentation and spacing
+
+Enhanced Job Description Text:
+{jd_text}
+
+Return only the enhanced job description text in a readable, formatted paragraph structure without any JSON formatting. Focus on the job content, requirements, and responsibilities - do not include company information sections."""
+
+SKILLS_PROMPT_TEMPLATE = """You are a skill extraction expert. ALWAYS prioritize the job role over company context. Extract skills appropriate for the specific role, not the company's main business. Return ONLY a JSON array.
+
+Job Title: [Extract from text]
+Industry: [Extract from text]
+Experience Level: [Extract from text]
+Company Info: {company_info}
+
+CRITICAL ROLE-BASED SKILL SELECTION RULES:
+1. **MANDATORY ROLE-FIRST APPROACH**: Extract skills appropriate for THIS SPECIFIC ROLE, NOT the company's main business
+2. **FOR UNRELATED ROLES**: Use ONLY standard industry skills for that role, ignore company-specific technologies
+3. **ONLY for DIRECTLY RELATED ROLES**: Integrate relevant company-specific technologies
+4. **VALIDATION**: If role is NOT related to company's main business, company-specific tech skills should NOT appear
+5. **CRITICAL**: Do NOT include advertising, marketing, or tech skills unless the role is directly related to those functions
+
+**EXPLICIT UNRELATED ROLE INSTRUCTIONS - CRITICAL FOR SKILLS GENERATION:**
+- **IF THE ROLE IS UNRELATED TO COMPANY'S MAIN BUSINESS**: 
+  - DO NOT use any company-specific technologies, tools, or platforms mentioned in company context
+  - DO NOT use company's industry-specific skills unless they directly apply to the role
+  - DO NOT use company's proprietary systems or internal tools
+  - DO NOT use company's specific methodologies or frameworks unless they are industry-standard for the role
+  - DO NOT use company's business domain knowledge unless it's directly relevant to the role
+  - **ONLY use standard, industry-appropriate skills for the specific role type**
+  - **IGNORE company context completely for skill selection**
+
+**EXAMPLES OF UNRELATED ROLES:**
+- If company is a tech company but hiring an HR Manager → Use HR skills, NOT tech skills
+- If company is a healthcare company but hiring an Accountant → Use accounting skills, NOT healthcare skills  
+- If company is a finance company but hiring a Marketing Specialist → Use marketing skills, NOT finance skills
+- If company is a manufacturing company but hiring a Sales Representative → Use sales skills, NOT manufacturing skills
+
+**EXAMPLES OF RELATED ROLES:**
+- If company is a tech company hiring a Software Engineer → Use tech skills + company-specific technologies
+- If company is a healthcare company hiring a Nurse → Use healthcare skills + company-specific medical systems
+- If company is a finance company hiring a Financial Analyst → Use finance skills + company-specific financial tools
+
+DOMAIN-SPECIFIC SKILLS (60-70% of skills):
+- Focus on skills that are specific to the role's domain and industry
+- Select skills that professionals in this exact role would list on LinkedIn
+- Avoid generic skills that don't match the role's specific domain
+- Use industry-standard skills for the role's domain
+
+TECHNICAL SKILLS (if relevant, 20-30%):
+- Use standard tool/platform names relevant to the role's domain
+- Use standard methodologies appropriate for the role's industry
+- Use standard technologies that professionals in this role would use
+
+SOFT SKILLS (10-20% maximum):
+- Use common LinkedIn terms appropriate for the role's seniority level
+- Focus on leadership, communication, and management skills relevant to the role
+
+Format:
+   - Return ONLY a JSON array of skill objects
+   - Each object: {"skill_name": "skill", "skill_type": "technical/domain/soft", "proficiency_level": "Beginner/Intermediate/Advanced/Expert"}
+   - Order by importance: domain skills first, then technical, soft skills last
+   - No repetition or compound skills
+   - Extract EXACTLY 8-10 skills - no more, no less
+
+Remember: Skills must match what successful professionals in this exact role/industry list on LinkedIn.
+
+Enhanced Job Description Text:
+{enhanced_text}"""
+
+RESPONSIBILITIES_PROMPT_TEMPLATE = """You are a LinkedIn talent sourcing expert. Extract EXACTLY 6 responsibilities that match how real professionals describe their work on LinkedIn.
+
+Job Title: [Extract from text]
+Job Description:
+{enhanced_text_excerpt}
+
+CRITICAL RULES FOR LINKEDIN OPTIMIZATION:
+1. Think about the ACTUAL day-to-day work:
+   - For technical roles: Focus on technical tasks, tools used, and team interactions
+   - For business roles: Focus on business impact, client/stakeholder interaction, and deliverables
+   - For manual/operational roles: Focus on physical tasks, equipment operated, and procedures followed
+
+2. Format each responsibility:
+   - Use 3-6 words, action-oriented
+   - Start with strong verbs (e.g., "Lead", "Develop", "Manage", "Implement")
+   - Include measurable outcomes where possible
+   - Use industry-standard terminology
+
+3. AVOID:
+   - Generic responsibilities that could apply to any job
+   - Company-specific jargon or acronyms
+   - Overly detailed or technical descriptions
+   - Responsibilities that don't match the seniority level
+
+4. Structure:
+   - Return ONLY a JSON array of 6 strings
+   - Order by importance (most critical first)
+   - No repetition
+   - Each responsibility should be distinct
+
+Example for a Senior Software Engineer:
+[
+    "Lead backend development team",
+    "Architect cloud infrastructure solutions",
+    "Implement CI/CD automation pipelines",
+    "Mentor junior developers",
+    "Design system architecture",
+    "Optimize application performance"
+]
+
+Example for a Warehouse Operator:
+[
+    "Operate forklift equipment safely",
+    "Manage inventory tracking system",
+    "Load/unload delivery trucks",
+    "Maintain warehouse organization",
+    "Process shipping documentation",
+    "Perform equipment maintenance checks"
+]
+
+Remember: These responsibilities should match what successful professionals in similar roles list on their LinkedIn profiles."""
+
+BASE_INFO_PROMPT_TEMPLATE = """Extract ONLY these fields from the job description. Return ONLY JSON.
+
+CRITICAL RULES:
+1. Return ONLY a JSON object with these fields: job_title, job_code, job_level, department, job_function, jd_industry, experience_range, job_summary, required_qualifications, seniority_level, location
+2. Use null for missing fields
+3. PROCESS ORDER: First extract experience range, then use that to determine seniority level
+4. For job titles: 4-5 LinkedIn-optimized titles
+5. For jd_industry: CRITICAL ROLE-BASED CLASSIFICATION - Use ONLY industry names from standard categories:
+   **MANDATORY RULE**: Classify based on the ROLE'S industry, NOT the company's industry
+   **VALIDATION**: If role is NOT related to company's main business, the company industry should NOT appear in jd_industry
+   **EXAMPLES OF PROPER INDUSTRIES**: "Software Development", "IT Services and IT Consulting", "Financial Services", "Healthcare", "Manufacturing", "Retail", "Education", "Consulting"
+   **EXAMPLES OF WHAT NOT TO USE**: "Quality Assurance", "Testing", "Development", "Sales", "Marketing" (these are job functions, not industries)
+
+6. For experience: {min: X, max: Y} - CRITICAL RULES:
+   - Extract the EXACT minimum years from the job description
+   - If job says "11 years experience" = min: 11, max: 11 (NOT min: 8, max: 11)
+   - If job says "8-11 years experience" = min: 8, max: 11
+   - If job says "5+ years experience" = min: 5, max: based on seniority level
+   - Set MAXIMUM based on seniority level (don't set both min and max to the same value unless job specifies exact years):
+     * Internship: max 1 year
+     * Entry Level: max 3 years
+     * Junior: max 5 years
+     * Junior to Mid: max 7 years
+     * Mid Level: max 10 years
+     * Mid - Senior: max 12 years
+     * Senior Level: max 15 years
+     * CXO: max 20 years
+
+7. For seniority_level: Use EXACTLY these values: Internship/Entry Level/Junior/Junior to Mid/Mid Level/Mid - Senior/Senior Level/CXO
+   - Determine from experience range and job requirements
+   - If experience is 0-1 years: Internship
+   - If experience is 1-3 years: Entry Level
+   - If experience is 3-5 years: Junior
+   - If experience is 5-7 years: Junior to Mid
+   - If experience is 7-10 years: Mid Level
+   - If experience is 10-12 years: Mid - Senior
+   - If experience is 12+ years: Senior Level
+   - If job title contains C-level terms (CEO, CTO, CFO, etc.): CXO
+
+8. For location: Extract ONLY the physical location, not remote/hybrid status
+   - Examples: "San Francisco, CA", "New York, NY", "London, UK"
+   - Do NOT include: "Remote", "Hybrid", "On-site" in location field
+
+Enhanced Job Description Text:
+{enhanced_text}
+
+Return ONLY a valid JSON object with the specified fields."""
+
+DEFAULT_PROMPT_TEMPLATES = {
+    'step1_prompt': STEP1_PROMPT_TEMPLATE,
+    'skills_prompt': SKILLS_PROMPT_TEMPLATE,
+    'responsibilities_prompt': RESPONSIBILITIES_PROMPT_TEMPLATE,
+    'base_info_prompt': BASE_INFO_PROMPT_TEMPLATE
+}
+
+
+SINGLE_PASS_SYSTEM_PROMPT = "You are a job description extraction expert. Perform every extraction task you are given on the same job description and return ONLY one valid JSON object containing all results."
+
+# Placeholder bound into the per-task prompts so the job description is sent only once
+SINGLE_PASS_TEXT_REFERENCE = "[See the shared job description at the end of this message]"
+
+SINGLE_PASS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "base_info": {
+            "type": "object",
+            "description": "Result of the base_info task: job_title, job_code, job_level, department, job_function, jd_industry, experience_range, job_summary, required_qualifications, seniority_level, location",
+            "properties": {
+                "experience_range": {
+                    "type": ["object", "null"],
+                    "properties": {"min": {"type": ["number", "null"]}, "max": {"type": ["number", "null"]}}
+                },
+                "seniority_level": {"enum": [*SENIORITY_LEVELS, None]}
+            }
+        },
+        "skills": {
+            "type": "array",
+            "description": "Result of the skills task: 8-10 skill objects",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "skill_name": {"type": "string"},
+                    "skill_type": {"enum": list(SKILL_TYPES)},
+                    "proficiency_level": {"enum": list(PROFICIENCY_LEVELS)}
+                }
+            }
+        },
+        "responsibilities": {
+            "type": "array",
+            "description": "Result of the responsibilities task: exactly 6 strings",
+            "items": {"type": "string"}
+        }
+    },
+    "required": ["base_info", "skills", "responsibilities"]
+}
+
+REPAIR_SYSTEM_PROMPT = "You fix malformed JSON extraction results. Return ONLY the corrected JSON value, with no commentary and no code fences."
+
+
+def merge_company_context(defaults: Dict[str, str], overrides) -> Dict[str, str]:
+    """Lay one JD's company context over the defaults; fields it leaves out or sets to null keep the default"""
+    if not isinstance(overrides, dict):
+        return dict(defaults)
+    return {**defaults, **{field: value for field, value in overrides.items() if value is not None}}
+
+
+def build_company_context_section(company_context: Dict[str, str]) -> str:
+    """Build the company context block embedded in the Step 1 prompt"""
+    return f"""
+# MINIMAL COMPANY CONTEXT (FOR ROLE ANALYSIS ONLY):
+Company Information Available (for context only - DO NOT include in output):
+- Name: {company_context.get('name') or 'Not specified'}
+- Industry: {company_context.get('industry') or 'Not specified'}
+- Size: {company_context.get('company_size') or 'Not specified'}
+- Location: {company_context.get('headquarters') or 'Not specified'}
+
+CONTEXT APPLICATION RULES:
+1. USE FOR ROLE ANALYSIS ONLY: Use company context only to understand the role better
+2. DO NOT INCLUDE COMPANY INFO: Do not display company information in the enhanced output
+3. FOCUS ON JOB CONTENT: Prioritize and enhance the actual job description content
+4. ROLE-SPECIFIC ENHANCEMENT: Enhance based on what the role actually requires, not company details
+"""
+
+
+def normalize_input_text(text: str) -> str:
+    """Even out whitespace in JD or enhanced text while keeping its lines
+
+    Line endings, runs of spaces and tabs within lines, trailing spaces
+    and stacks of blank lines are made canonical; indentation is kept, so the same text pasted again renders
+    the same prompt and hits the response cache.
+    """
+    text = _LINE_ENDINGS.sub('\n', text)
+    text = _SPACE_RUNS.sub(' ', text)
+    text = _TRAILING_SPACE.sub('\n', text)
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def step1_prompt_values(jd_text: str, company_context: Dict[str, str]) -> Dict[str, str]:
+    """Slot values for the Step 1 enhancement prompt"""
+    return {
+        'company_context': build_company_context_section(company_context),
+        'jd_text': normalize_input_text(jd_text)
+    }
+
+
+def extraction_prompt_values(enhanced_text: str, company_context: Dict[str, str],
+                             excerpt_tokens: Optional[int] = RESPONSIBILITIES_EXCERPT_TOKENS) -> Dict[str, str]:
+    """Slot values for the Step 2 extraction prompts
+
+    excerpt_tokens=None puts the whole text in the excerpt, for chunks that
+    are already sized to fit every prompt.
+    """
+    enhanced_text = normalize_input_text(enhanced_text)
+    excerpt = enhanced_text if excerpt_tokens is None else truncate_to_tokens(enhanced_text, excerpt_tokens)
+    return {
+        'company_info': str(company_context),
+        'enhanced_text': enhanced_text,
+        'enhanced_text_excerpt': excerpt
+    }
+
+
+def responsibilities_excerpt_truncated(enhanced_text: str) -> bool:
+    """Whether a single responsibilities call sees only the start of the enhanced text"""
+    return count_tokens(normalize_input_text(enhanced_text)) > RESPONSIBILITIES_EXCERPT_TOKENS
+
+
+class CompiledTemplate:
+    """A prompt template split once into its static text and {slot} references
+
+    Rendering only joins the pre-split pieces with the bound values, so the
+    static prompt body is never re-scanned or re-counted. Unknown
+    placeholders and literal braces (e.g. JSON examples) are left untouched.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        # Even indexes hold static text, odd indexes hold slot names
+        self._pieces = _SLOT_PATTERN.split(template)
+        self.slots = frozenset(self._pieces[1::2])
+        self._static_tokens: Dict[str, int] = {}
+
+    def render(self, values: Dict[str, str]) -> str:
+        pieces = self._pieces
+        rendered = [pieces[0]]
+        for index in range(1, len(pieces), 2):
+            slot = pieces[index]
+            rendered.append(values[slot] if slot in values else '{' + slot + '}')
+            rendered.append(pieces[index + 1])
+        return ''.join(rendered)
+
+    def count_tokens(self, values: Dict[str, str], model: str) -> int:
+        """Token count of the rendered prompt, without rendering it
+
+        The static text is counted once per model; slot values are counted
+        separately, so the total can differ from the rendered prompt's count
+        by a token or so per slot.
+        """
+        if model not in self._static_tokens:
+            self._static_tokens[model] = count_tokens(''.join(self._pieces[0::2]), model)
+        return self._static_tokens[model] + sum(
+            count_tokens(values.get(slot, '{' + slot + '}'), model) for slot in self._pieces[1::2]
+        )
+
+
+@lru_cache(maxsize=64)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template once; edited templates are compiled on first use"""
+    return CompiledTemplate(template)
+
+
+def render_prompt(template: str, values: Dict[str, str]) -> str:
+    """Fill the {slot} placeholders of a template from its compiled form"""
+    return compile_template(template).render(values)
+
+
+def missing_required_slots(prompt_name: str, template: str) -> List[str]:
+    """Return the input slots a template lacks, e.g. a prompt saved with a JD baked in"""
+    present = compile_template(template).slots
+    return [slot for slot in REQUIRED_SLOTS[prompt_name] if slot not in present]
+
+
+# The default prompt bodies are compiled once at startup
+for _template in DEFAULT_PROMPT_TEMPLATES.values():
+    compile_template(_template)
+
+
+def load_prompt_templates(prompts_file: str = "saved_prompts.json") -> Tuple[Dict[str, str], List[str]]:
+    """Load saved prompt templates over the defaults for headless use
+
+    Saved prompts that lack their input slot cannot be reused for other job
+    descriptions, so they fall back to the default with a warning.
+    """
+    templates = dict(DEFAULT_PROMPT_TEMPLATES)
+    warnings = []
+    saved = PromptStore(prompts_file).all()
+
+    for name in PROMPT_NAMES:
+        if name not in saved:
+            continue
+        missing = missing_required_slots(name, saved[name])
+        if missing:
+            warnings.append(
+                f"Saved {name} has no {', '.join('{' + slot + '}' for slot in missing)} slot; using the default prompt"
+            )
+            continue
+        templates[name] = saved[name]
+    return templates, warnings
+
+
+def build_single_pass_prompt(templates: Dict[str, str], enhanced_text: str,
+                             company_context: Dict[str, str]) -> str:
+    """Combine the three extraction prompts into one that sends the job description once
+
+    templates maps each extraction name (base_info, skills, responsibilities)
+    to its prompt template. Each task keeps its own instructions, with its
+    input slot pointing at the shared text appended once at the end.
+    """
+    values = extraction_prompt_values(SINGLE_PASS_TEXT_REFERENCE, company_context)
+    values['enhanced_text_excerpt'] = SINGLE_PASS_TEXT_REFERENCE
+    tasks = "\n\n".join(
+        f"## TASK \"{name}\"\n{render_prompt(template, values)}"
+        for name, template in templates.items()
+    )
+    return f"""Perform the following {len(templates)} extraction tasks on the same job description.
+Return ONE JSON object with exactly these keys: {", ".join(f'"{name}"' for name in templates)}.
+Each key holds the JSON result that its task asks for (the object or array only, no extra text).
+
+{tasks}
+
+# OUTPUT JSON SCHEMA
+{json.dumps(SINGLE_PASS_SCHEMA, indent=2)}
+
+# SHARED JOB DESCRIPTION (used by all tasks)
+{enhanced_text}"""
+
+
+def build_repair_prompt(name: str, output: str, errors: List[str]) -> str:
+    """Ask the model to correct one extraction's invalid output, without redoing the extraction"""
+    problems = "\n".join(f"- {error}" for error in errors)
+    return f"""This {name} extraction result failed validation:
+{problems}
+
+Expected JSON schema:
+{json.dumps(SINGLE_PASS_SCHEMA['properties'][name], indent=2)}
+
+Result to fix:
+{output}
+
+Return ONLY the corrected JSON, keeping the extracted content unchanged."""
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from llm import LIMITER_PAUSED, retry_after_from_headers
+from tokens import count_tokens
+
+# OpenAI request and token limits are per minute
+WINDOW_SECONDS = 60.0
+
+# Pause applied to a model after a 429 that carries no retry or reset hint
+DEFAULT_PENALTY_SECONDS = 1.0
+
+# Waits shorter than this are not counted as throttling
+MIN_THROTTLE_SECONDS = 0.001
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNIT_SECONDS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a limit resets, from OpenAI's "6m0s" / "20ms" style headers"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _UNIT_SECONDS[unit] for number, unit in parts)
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers[name]) if headers.get(name) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def budget_scope(host: str, api_key: Optional[str]) -> str:
+    """The budgets a call draws on: limits belong to one API key on one server
+
+    Only a short hash of the key is kept.
+    """
+    digest = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:12]
+    return f"{host}#{digest}"
+
+
+def client_scope(client) -> str:
+    """The budget scope of the calls an OpenAI client makes"""
+    return budget_scope(client.base_url.netloc.decode('ascii'), client.api_key)
+
+
+def _request_scope(request) -> str:
+    authorization = request.headers.get('authorization', '')
+    api_key = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else authorization
+    return budget_scope(request.url.netloc.decode('ascii'), api_key)
+
+
+def _chat_call(request) -> Optional[Tuple[str, str, int]]:
+    """Budget scope, model and estimated token cost of a chat completion request, or None for other requests"""
+    if not request.url.path.endswith('/chat/completions'):
+        return None
+    try:
+        body = json.loads(request.content)
+    except (ValueError, TypeError):
+        return None
+    model = body.get('model', '')
+    # Rate limits count the prompt plus the requested completion budget
+    tokens = body.get('max_tokens') or body.get('max_completion_tokens') or 0
+    for message in body.get('messages', []):
+        if isinstance(message.get('content'), str):
+            tokens += count_tokens(message['content'], model)
+    return _request_scope(request), model, tokens
+
+
+class _ModelBudget:
+    """Sliding one-minute window of sent calls plus what the API last reported"""
+
+    def __init__(self, requests_per_minute: Optional[int], tokens_per_minute: Optional[int]):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.sent: deque = deque()
+        self.remaining_requests: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.remaining_tokens: Optional[int] = None
+        self.tokens_reset_at = 0.0
+        self.blocked_until = 0.0
+
+    def wait_time(self, now: float, tokens: int) -> float:
+        """Seconds until a call of this many tokens fits every known budget
+
+        Once the API has reported remaining requests/tokens those are
+        authoritative (refilled to the limit at their reset time); until
+        then the configured per-minute budgets apply over a sliding window.
+        """
+        while self.sent and now - self.sent[0][0] >= WINDOW_SECONDS:
+            self.sent.popleft()
+        if self.remaining_requests is not None and now >= self.requests_reset_at:
+            self.remaining_requests = self.requests_per_minute
+        if self.remaining_tokens is not None and now >= self.tokens_reset_at:
+            self.remaining_tokens = self.tokens_per_minute
+
+        waits = [self.blocked_until - now]
+        if self.remaining_requests is not None:
+            if self.remaining_requests <= 0:
+                waits.append(self.requests_reset_at - now)
+        elif self.requests_per_minute and len(self.sent) >= self.requests_per_minute:
+            waits.append(self.sent[0][0] + WINDOW_SECONDS - now)
+        if self.remaining_tokens is not None:
+            if self.remaining_tokens < tokens:
+                waits.append(self.tokens_reset_at - now)
+        elif self.tokens_per_minute and self.sent:
+            excess = sum(sent_tokens for _, sent_tokens in self.sent) + tokens - self.tokens_per_minute
+            for sent_at, sent_tokens in self.sent:
+                if excess <= 0:
+                    break
+                excess -= sent_tokens
+                waits.append(sent_at + WINDOW_SECONDS - now)
+        return max(waits)
+
+    def record(self, now: float, tokens: int):
+        self.sent.append((now, tokens))
+        # Spend the reported budget locally so concurrent calls don't all see the same headroom
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens -= tokens
+
+
+class RateLimiter:
+    """Request and token budgets per API key, server and model, shared by every call through its clients
+
+    Install request_hook and response_hook as httpx event hooks: each chat
+    completion request then waits (queues) until its budgets have room, and
+    every response updates them from OpenAI's x-ratelimit-* headers.
+    Budgets are kept per scope (server plus a hash of the API key, see
+    budget_scope) and model, so one key or local server hitting its limits
+    never slows another. A 429 pauses that scope and model for all callers
+    until its retry-after or reset time, so concurrent calls back off
+    together instead of each tripping the limit again; the response is
+    marked so chat_completion's retry leaves the waiting to the limiter.
+    Budgets start from the given defaults (None means unknown) and follow
+    the headers once responses arrive.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._changed = threading.Condition()
+        self._budgets: Dict[Tuple[str, str], _ModelBudget] = {}
+        self._queue_depth = 0
+        self._peak_queue_depth = 0
+        self._throttled_calls = 0
+        self._throttle_seconds = 0.0
+        self._rate_limited = 0
+
+    def _budget(self, scope: str, model: str) -> _ModelBudget:
+        if (scope, model) not in self._budgets:
+            self._budgets[scope, model] = _ModelBudget(self.requests_per_minute, self.tokens_per_minute)
+        return self._budgets[scope, model]
+
+    def acquire(self, scope: str, model: str, tokens: int) -> float:
+        """Block until the scope's budgets for the model allow a call of this size; returns seconds waited"""
+        started = time.monotonic()
+        with self._changed:
+            self._queue_depth += 1
+            self._peak_queue_depth = max(self._peak_queue_depth, self._queue_depth)
+            try:
+                budget = self._budget(scope, model)
+                while True:
+                    now = time.monotonic()
+                    wait = budget.wait_time(now, tokens)
+                    if wait <= 0:
+                        break
+                    # Woken early when new headers change the budget
+                    self._changed.wait(wait)
+                budget.record(now, tokens)
+            finally:
+                self._queue_depth -= 1
+            waited = time.monotonic() - started
+            if waited >= MIN_THROTTLE_SECONDS:
+                self._throttled_calls += 1
+                self._throttle_seconds += waited
+        return waited
+
+    def observe(self, scope: str, model: str, status_code: int, headers) -> bool:
+        """Update the scope's budgets for a model from one response's rate limit headers
+
+        Returns True when a 429 paused the budget, i.e. the next call for it
+        will wait in acquire() until the pause is over.
+        """
+        now = time.monotonic()
+        with self._changed:
+            budget = self._budget(scope, model)
+            requests_limit = _int_header(headers, 'x-ratelimit-limit-requests')
+            if requests_limit:
+                budget.requests_per_minute = requests_limit
+            tokens_limit = _int_header(headers, 'x-ratelimit-limit-tokens')
+            if tokens_limit:
+                budget.tokens_per_minute = tokens_limit
+
+            requests_reset = parse_reset(headers.get('x-ratelimit-reset-requests'))
+            tokens_reset = parse_reset(headers.get('x-ratelimit-reset-tokens'))
+            remaining_requests = _int_header(headers, 'x-ratelimit-remaining-requests')
+            if remaining_requests is not None:
+                budget.remaining_requests = remaining_requests
+                budget.requests_reset_at = now + (requests_reset or 0.0)
+            remaining_tokens = _int_header(headers, 'x-ratelimit-remaining-tokens')
+            if remaining_tokens is not None:
+                budget.remaining_tokens = remaining_tokens
+                budget.tokens_reset_at = now + (tokens_reset or 0.0)
+
+            if status_code == 429:
+                self._rate_limited += 1
+                delay = retry_after_from_headers(headers)
+                if delay is None:
+                    delay = max(requests_reset or 0.0, tokens_reset or 0.0) or DEFAULT_PENALTY_SECONDS
+                budget.blocked_until = max(budget.blocked_until, now + delay)
+            self._changed.notify_all()
+            return status_code == 429
+
+    def request_hook(self):
+        """httpx request hook that queues chat completions until their budget allows"""
+        def wait_for_budget(request):
+            call = _chat_call(request)
+            if call is not None:
+                self.acquire(*call)
+        return wait_for_budget
+
+    def response_hook(self):
+        """httpx response hook that feeds rate limit headers and 429s back into the budgets"""
+        def update_budget(response):
+            call = _chat_call(response.request)
+            if call is not None and self.observe(call[0], call[1], response.status_code, response.headers):
+                response.extensions[LIMITER_PAUSED] = True
+        return update_budget
+
+    def stats(self, scopes: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Queue depth, throttling totals and the current budget per model
+
+        Budgets are listed as "model @ server"; scopes restricts them to
+        those of the given budget scopes, e.g. one session's clients.
+        """
+        scopes = set(scopes) if scopes is not None else None
+        with self._changed:
+            budgets = {}
+            for (scope, model), budget in self._budgets.items():
+                if scopes is not None and scope not in scopes:
+                    continue
+                host, digest = scope.split('#')
+                label = f"{model} @ {host}"
+                if label in budgets:
+                    # Another API key on the same server
+                    label = f"{label} (key {digest[:6]})"
+                budgets[label] = {
+                    'requests_per_minute': budget.requests_per_minute,
+                    'tokens_per_minute': budget.tokens_per_minute,
+                    'remaining_requests': budget.remaining_requests,
+                    'remaining_tokens': budget.remaining_tokens
+                }
+            return {
+                'queue_depth': self._queue_depth,
+                'peak_queue_depth': self._peak_queue_depth,
+                'throttled_calls': self._throttled_calls,
+                'throttle_seconds': self._throttle_seconds,
+                'rate_limited': self._rate_limited,
+                'models': budgets
+            }
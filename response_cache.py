@@ -0,0 +1,544 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+SQLITE_PREFIX = 'sqlite:///'
+REDIS_PREFIXES = ('redis://', 'rediss://', 'unix://')
+
+
+# How often a directory store re-reads its files to pick up other processes' changes
+DIRECTORY_RESCAN_SECONDS = 300.0
+
+# Hits served from memory refresh the store's last-access time at most this often
+STORE_TOUCH_SECONDS = 60.0
+
+
+class DirectoryStore:
+    """Cache entries as JSON files in a directory
+
+    An in-memory index of each entry's creation time, last access and size
+    drives eviction, so writes never rescan the directory; it is rebuilt
+    from the files every DIRECTORY_RESCAN_SECONDS. Reads don't touch the
+    files, so their mtime stays the creation time that expiry is judged by.
+    """
+
+    name = 'directory'
+
+    def __init__(self, directory: str = ".response_cache"):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # key -> [created_at, accessed_at, size]
+        self._index: Dict[str, List[float]] = {}
+        self._scanned_at = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._rescan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _rescan(self):
+        """Rebuild the index from the files, keeping known access times; the caller holds the lock"""
+        index = {}
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, file_name))
+            except OSError:
+                continue
+            key = file_name[:-len('.json')]
+            known = self._index.get(key)
+            index[key] = [stat.st_mtime, known[1] if known else stat.st_mtime, stat.st_size]
+        self._index = index
+        self._scanned_at = time.time()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                data = f.read()
+            entry = json.loads(data)
+        except (OSError, ValueError):
+            with self._lock:
+                self._index.pop(key, None)
+            return None
+        with self._lock:
+            self._index[key] = [entry.get('created_at', 0), time.time(), len(data.encode('utf-8'))]
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        """Write an entry atomically; expiry is left to evict()"""
+        data = json.dumps(entry, ensure_ascii=False)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        with self._lock:
+            self._index[key] = [entry['created_at'], time.time(), len(data.encode('utf-8'))]
+
+    def touch(self, key: str):
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = time.time()
+
+    def delete(self, key: str):
+        self._remove(self._path(key))
+        with self._lock:
+            self._index.pop(key, None)
+
+    def evict(self, max_entries: int, max_bytes: int, max_age_seconds: float):
+        """Remove expired entries, then the least recently used ones over the size limits"""
+        now = time.time()
+        with self._lock:
+            if now - self._scanned_at > DIRECTORY_RESCAN_SECONDS:
+                self._rescan()
+            stale = [key for key, (created_at, _, _) in self._index.items() if now - created_at > max_age_seconds]
+            total_bytes = sum(size for key, (_, _, size) in self._index.items() if key not in stale)
+            count = len(self._index) - len(stale)
+            if count > max_entries or total_bytes > max_bytes:
+                expired = set(stale)
+                for key, (_, _, size) in sorted(self._index.items(), key=lambda item: item[1][1]):
+                    if count <= max_entries and total_bytes <= max_bytes:
+                        break
+                    if key in expired:
+                        continue
+                    stale.append(key)
+                    count -= 1
+                    total_bytes -= size
+            for key in stale:
+                del self._index[key]
+        for key in stale:
+            self._remove(self._path(key))
+
+    def clear(self):
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.json'):
+                self._remove(os.path.join(self.directory, file_name))
+        with self._lock:
+            self._index.clear()
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class SQLiteStore:
+    """Cache entries in one SQLite file, which several app processes can share
+
+    Like the Redis store, a locked or damaged database degrades to cache
+    misses: reads return None and failed writes raise OSError, which
+    callers treat as a cache they couldn't write to.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = "response_cache.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL, size INTEGER NOT NULL, entry TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+
+    def _rollback(self):
+        """Drop a failed statement's transaction so the connection stays usable; the caller holds the lock"""
+        try:
+            self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT entry FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            except sqlite3.Error:
+                self._rollback()
+                return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        text = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, created_at, accessed_at, size, entry) VALUES (?, ?, ?, ?, ?)",
+                    (key, entry['created_at'], time.time(), len(text.encode('utf-8')), text)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._rollback()
+                raise OSError(f"SQLite cache write failed: {str(e)}") from e
+
+    def _write(self, sql: str, params: Tuple = ()):
+        """Run a best-effort write, ignoring database errors"""
+        with self._lock:
+            try:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._rollback()
+
+    def touch(self, key: str):
+        self._write("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+    def delete(self, key: str):
+        self._write("DELETE FROM entries WHERE key = ?", (key,))
+
+    def evict(self, max_entries: int, max_bytes: int, max_age_seconds: float):
+        """Remove expired entries, then the least recently used ones over the size limits"""
+        with self._lock:
+            try:
+                self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - max_age_seconds,))
+                count, total_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+                if count > max_entries or total_bytes > max_bytes:
+                    stale = []
+                    for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                        if count <= max_entries and total_bytes <= max_bytes:
+                            break
+                        stale.append((key,))
+                        count -= 1
+                        total_bytes -= size
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._rollback()
+
+    def clear(self):
+        self._write("DELETE FROM entries")
+
+    def count(self) -> int:
+        with self._lock:
+            try:
+                return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+
+class RedisStore:
+    """Cache entries in a Redis-compatible server (Redis, Valkey, KeyDB, Dragonfly)
+
+    Entries expire through the server's TTLs; the size limits are the
+    server's own (maxmemory with an allkeys-lru policy), so evict() only
+    has to cap the entry count. A sorted set of keys by last access keeps
+    that cap O(log n) per write instead of a scan of the keyspace.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "jd-response-cache:"):
+        if redis is None:
+            raise ValueError("A Redis cache needs the redis package (pip install redis)")
+        self.url = url
+        self.prefix = prefix
+        # Outside the entry key pattern, so scans for entries never return it
+        self.index_key = prefix.rstrip(':') + "-index"
+        self._client = redis.Redis.from_url(url)
+
+    def _accessed(self, key: str):
+        """Record an entry's last access in the index"""
+        self._client.zadd(self.index_key, {key: time.time()})
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = self._client.get(self.prefix + key)
+            if data is None:
+                return None
+            self._accessed(key)
+            return json.loads(data)
+        except (redis.RedisError, ValueError):
+            return None
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.set(self.prefix + key, json.dumps(entry, ensure_ascii=False), ex=max(1, int(ttl)))
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.execute()
+        except redis.RedisError as e:
+            raise OSError(f"Redis cache write failed: {str(e)}") from e
+
+    def touch(self, key: str):
+        try:
+            self._client.touch(self.prefix + key)
+            self._accessed(key)
+        except redis.RedisError:
+            pass
+
+    def delete(self, key: str):
+        try:
+            self._client.delete(self.prefix + key)
+            self._client.zrem(self.index_key, key)
+        except redis.RedisError:
+            pass
+
+    def _keys(self) -> List[bytes]:
+        return list(self._client.scan_iter(match=self.prefix + '*', count=500))
+
+    def evict(self, max_entries: int, max_bytes: int, max_age_seconds: float):
+        """Drop index entries for keys past their TTL, then the least recently used over max_entries"""
+        try:
+            # A key not accessed for longer than its TTL has certainly expired on the server
+            self._client.zremrangebyscore(self.index_key, '-inf', time.time() - max_age_seconds)
+            excess = self._client.zcard(self.index_key) - max_entries
+            if excess <= 0:
+                return
+            keys = [key.decode('utf-8') for key in self._client.zrange(self.index_key, 0, excess - 1)]
+            pipe = self._client.pipeline(transaction=False)
+            pipe.delete(*[self.prefix + key for key in keys])
+            pipe.zrem(self.index_key, *keys)
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def clear(self):
+        try:
+            keys = self._keys()
+            if keys:
+                self._client.delete(*keys)
+            self._client.delete(self.index_key)
+        except redis.RedisError:
+            pass
+
+    def count(self) -> int:
+        """Entries in the index, which can include keys the server evicted under maxmemory"""
+        try:
+            return self._client.zcard(self.index_key)
+        except redis.RedisError:
+            return 0
+
+
+def open_store(location: str):
+    """The entry store for a cache location: a sqlite:///path or redis:// URL, or a directory"""
+    if location.startswith(SQLITE_PREFIX):
+        return SQLiteStore(location[len(SQLITE_PREFIX):])
+    if location.startswith(REDIS_PREFIXES):
+        return RedisStore(location)
+    return DirectoryStore(location)
+
+
+class ResponseCache:
+    """Cache of chat completion responses keyed by request content, shared by every caller in the process
+
+    Entries are persisted in a store (JSON files in a directory, or SQLite
+    or Redis so several processes can share them) behind an in-memory LRU
+    tier capped by entry count and bytes. Identical requests that miss at
+    the same time are coalesced within the process: the first caller
+    claims the key and the others wait for its response (get_or_claim).
+    """
+
+    def __init__(self, location: str = ".response_cache", max_entries: int = 500,
+                 max_bytes: int = 50 * 1024 * 1024, max_age_seconds: float = 7 * 24 * 3600,
+                 memory_entries: int = 200, memory_bytes: int = 8 * 1024 * 1024,
+                 wait_seconds: float = 300.0):
+        self.store = open_store(location)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.memory_entries = memory_entries
+        self.memory_bytes = memory_bytes
+        self.wait_seconds = wait_seconds
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        # key -> [created_at, value, size, store touched_at]
+        self._memory: 'OrderedDict[str, List[Any]]' = OrderedDict()
+        self._memory_used = 0
+        self._in_flight: Dict[str, threading.Event] = {}
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], **params) -> str:
+        """Build a content hash from the model, messages and sampling parameters
+
+        Messages are keyed exactly, so any prompt edit, formatting included,
+        gets a fresh response; JD and enhanced text are normalized where
+        they are bound into the prompts (prompts.normalize_input_text).
+        """
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'params': params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The entry's value from the memory tier, or None; the caller holds the lock"""
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        created_at, value, size, _ = item
+        if time.time() - created_at > self.max_age_seconds:
+            del self._memory[key]
+            self._memory_used -= size
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, created_at: float, value: Dict[str, Any]):
+        """Keep a value in the memory tier, dropping the least recently used over the caps; the caller holds the lock"""
+        size = len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        if key in self._memory:
+            self._memory_used -= self._memory.pop(key)[2]
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = [created_at, value, size, time.time()]
+        self._memory_used += size
+        while len(self._memory) > self.memory_entries or self._memory_used > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_used -= dropped[2]
+
+    def _touch(self, key: str):
+        """Refresh the store's last access for a hit served from memory, at most every STORE_TOUCH_SECONDS"""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None or now - item[3] < STORE_TOUCH_SECONDS:
+                return
+            item[3] = now
+        self.store.touch(key)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an entry from the store into the memory tier; None on a miss or expiry"""
+        entry = self.store.get(key)
+        if entry is None or 'value' not in entry:
+            return None
+        if time.time() - entry.get('created_at', 0) > self.max_age_seconds:
+            self.store.delete(key)
+            return None
+        with self._lock:
+            self._memory_put(key, entry['created_at'], entry['value'])
+        return entry['value']
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a key, or None on a miss or expiry"""
+        with self._lock:
+            value = self._memory_get(key)
+        if value is None:
+            value = self._load(key)
+        else:
+            self._touch(key)
+        self._record(hit=value is not None)
+        return value
+
+    def get_or_claim(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[threading.Event]]:
+        """The cached entry for a key, waiting out an identical request already in flight
+
+        Returns (value, None) on a hit. On a miss returns (None, claim): the
+        caller makes the request, stores the response with set() and then
+        calls release(key, claim), also when the request fails, so that any
+        waiting callers retry. A caller that waited longer than wait_seconds
+        gets (None, None) and makes its own request.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                value = self._memory_get(key)
+                event = None if value is not None else self._in_flight.get(key)
+            if value is None and event is None:
+                value = self._load(key)
+                if value is None:
+                    with self._lock:
+                        value = self._memory_get(key)
+                        event = self._in_flight.get(key)
+                        if value is None and event is None:
+                            claim = self._in_flight[key] = threading.Event()
+                            self.misses += 1
+                            return None, claim
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    if waited:
+                        self.coalesced += 1
+                self._touch(key)
+                return value, None
+            waited = True
+            if not event.wait(self.wait_seconds):
+                self._record(hit=False)
+                return None, None
+
+    def release(self, key: str, claim: Optional[threading.Event]):
+        """Hand a claimed key back and wake the callers waiting on it"""
+        if claim is None:
+            return
+        with self._lock:
+            if self._in_flight.get(key) is claim:
+                del self._in_flight[key]
+        claim.set()
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store an entry and evict old entries if over the limits"""
+        created_at = time.time()
+        with self._lock:
+            self._memory_put(key, created_at, value)
+        self.store.set(key, {'created_at': created_at, 'value': value}, self.max_age_seconds)
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries from the store, then the least recently used ones over the size limits"""
+        self.store.evict(self.max_entries, self.max_bytes, self.max_age_seconds)
+
+    def clear(self):
+        """Remove every cached entry and reset the counters"""
+        self.store.clear()
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/coalesced counters, the stored entry count and memory tier usage"""
+        entries = self.store.count()
+        with self._lock:
+            return {
+                'backend': self.store.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._in_flight),
+                'entries': entries,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_used
+            }
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
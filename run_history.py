@@ -0,0 +1,316 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional
+
+from neardup import lsh_buckets, minhash, pack_signature, similarity, unpack_signature
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    run_key TEXT NOT NULL,
+    source TEXT,
+    jd_text TEXT NOT NULL,
+    job_title TEXT,
+    model TEXT,
+    temperature REAL,
+    max_tokens INTEGER,
+    company_context TEXT,
+    prompts TEXT,
+    enhanced_text TEXT,
+    extraction_results TEXT,
+    timings TEXT,
+    routes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_key ON runs (run_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created_at);
+CREATE TABLE IF NOT EXISTS run_signatures (
+    run_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_buckets (
+    bucket TEXT NOT NULL,
+    run_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_buckets ON run_buckets (bucket);
+"""
+
+# Full-text index over JD text and titles, kept in sync by trigger
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+    jd_text, job_title, content='runs', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS runs_fts_insert AFTER INSERT ON runs BEGIN
+    INSERT INTO runs_fts (rowid, jd_text, job_title) VALUES (new.id, new.jd_text, new.job_title);
+END;
+"""
+
+_JSON_COLUMNS = ('company_context', 'prompts', 'extraction_results', 'timings', 'routes')
+_SUMMARY_COLUMNS = "runs.id, runs.created_at, runs.source, runs.job_title, runs.model, substr(runs.jd_text, 1, 200)"
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize_jd(jd_text: str) -> str:
+    """Collapse whitespace so re-pasting the same JD maps to the same run key"""
+    return ' '.join(jd_text.split())
+
+
+def run_key(jd_text: str, company_context: Dict[str, str], templates: Dict[str, str],
+            model: str, temperature: float, max_tokens: int,
+            routes: Optional[Dict[str, str]] = None) -> str:
+    """Identify a run by everything that shapes its output
+
+    routes holds the backend/model of steps sent somewhere other than model;
+    it is left out when empty so unrouted runs keep their keys.
+    """
+    inputs = {
+        'jd_text': normalize_jd(jd_text),
+        'company_context': company_context,
+        'templates': templates,
+        'model': model,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }
+    if routes:
+        inputs['routes'] = routes
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def prompt_version(templates: Dict[str, str]) -> str:
+    """Short fingerprint of a set of prompt templates, for labelling runs made with them"""
+    payload = json.dumps(templates or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:8]
+
+
+def input_differences(run: Dict[str, Any], inputs: Dict[str, Any]) -> List[str]:
+    """Which of a stored run's inputs, other than the JD, differ from these
+
+    inputs holds company_context, templates, model, temperature, max_tokens
+    and routes, as passed to find(); runs stored without routes count as
+    unrouted.
+    """
+    stored = {
+        'prompts': prompt_version(run['prompts']),
+        'model': run['model'],
+        'temperature': run['temperature'],
+        'max_tokens': run['max_tokens'],
+        'company context': run['company_context'] or {},
+        'routes': run.get('routes') or {}
+    }
+    current = {
+        'prompts': prompt_version(inputs['templates']),
+        'model': inputs['model'],
+        'temperature': inputs['temperature'],
+        'max_tokens': inputs['max_tokens'],
+        'company context': inputs['company_context'] or {},
+        'routes': inputs.get('routes') or {}
+    }
+    return [name for name in stored if stored[name] != current[name]]
+
+
+def _job_title(extraction_results: Dict[str, Any]) -> Optional[str]:
+    title = ((extraction_results or {}).get('base_info') or {}).get('job_title')
+    if isinstance(title, list):
+        return ', '.join(str(part) for part in title)
+    return title
+
+
+class RunHistory:
+    """Local SQLite store of finished runs, searchable by JD text and job title
+
+    Each run keeps the input JD, prompt templates, model settings, enhanced
+    text, extraction results and timings. find() returns the latest run with
+    the same inputs so a known JD can be answered without any API call, and
+    similar() finds reposts with minor edits through a MinHash/LSH index.
+    Full-text search uses FTS5 when SQLite has it, otherwise LIKE matching.
+    """
+
+    def __init__(self, path: str = "run_history.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.full_text = False
+        self._conn.commit()
+        self._index_unsigned_runs()
+
+    def _add_missing_columns(self):
+        """Add columns introduced after a history file was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if 'routes' not in columns:
+            self._conn.execute("ALTER TABLE runs ADD COLUMN routes TEXT")
+
+    def _index_signature(self, run_id: int, jd_text: str):
+        """Store a run's MinHash signature and LSH buckets; the caller holds the lock and commits"""
+        signature = minhash(jd_text)
+        self._conn.execute("INSERT OR REPLACE INTO run_signatures (run_id, signature) VALUES (?, ?)",
+                           (run_id, pack_signature(signature)))
+        self._conn.executemany("INSERT INTO run_buckets (bucket, run_id) VALUES (?, ?)",
+                               [(bucket, run_id) for bucket in lsh_buckets(signature)])
+
+    def _index_unsigned_runs(self):
+        """Add runs stored before the near-duplicate index existed"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, jd_text FROM runs WHERE id NOT IN (SELECT run_id FROM run_signatures)"
+            ).fetchall()
+            for run_id, jd_text in rows:
+                self._index_signature(run_id, jd_text)
+            self._conn.commit()
+
+    def add(self, jd_text: str, company_context: Dict[str, str], templates: Dict[str, str],
+            model: str, temperature: float, max_tokens: int, enhanced_text: str,
+            extraction_results: Dict[str, Any], timings: Optional[Dict[str, Any]] = None,
+            source: str = 'app', routes: Optional[Dict[str, str]] = None) -> int:
+        """Append one finished run and return its id"""
+        key = run_key(jd_text, company_context, templates, model, temperature, max_tokens, routes)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (created_at, run_key, source, jd_text, job_title, model, temperature, "
+                "max_tokens, company_context, prompts, enhanced_text, extraction_results, timings, routes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), key, source, jd_text, _job_title(extraction_results), model, temperature,
+                 max_tokens, json.dumps(company_context), json.dumps(templates), enhanced_text,
+                 json.dumps(extraction_results, ensure_ascii=False), json.dumps(timings or {}),
+                 json.dumps(routes or {}))
+            )
+            self._index_signature(cursor.lastrowid, jd_text)
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def _fetch_run(self, where: str, params) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT * FROM runs WHERE {where} ORDER BY created_at DESC LIMIT 1", params)
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            run = dict(zip([column[0] for column in cursor.description], row))
+        return self._decode(run)
+
+    @staticmethod
+    def _decode(run: Dict[str, Any]) -> Dict[str, Any]:
+        for column in _JSON_COLUMNS:
+            run[column] = json.loads(run[column]) if run[column] else None
+        return run
+
+    def get(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """A stored run with its inputs and outputs, or None"""
+        return self._fetch_run("id = ?", (run_id,))
+
+    def find(self, jd_text: str, company_context: Dict[str, str], templates: Dict[str, str],
+             model: str, temperature: float, max_tokens: int,
+             routes: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """The latest run with exactly these inputs, or None"""
+        key = run_key(jd_text, company_context, templates, model, temperature, max_tokens, routes)
+        return self._fetch_run("run_key = ?", (key,))
+
+    def similar(self, jd_text: str, threshold: float, limit: int = 5,
+                inputs: Optional[Dict[str, Any]] = None, same_inputs_only: bool = False) -> List[Dict[str, Any]]:
+        """Stored runs whose JD is a near-duplicate of this one, most similar first
+
+        Candidates sharing an LSH bucket are scored by estimated Jaccard
+        similarity of their word shingles; only one run per distinct JD text
+        (the newest) is returned. Each match carries the prompt_version its
+        outputs were made with; given the current inputs (as for find()), it
+        also lists the differing ones under 'differences', and
+        same_inputs_only keeps just the runs where there are none.
+        """
+        signature = minhash(jd_text)
+        buckets = lsh_buckets(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT runs.id, runs.created_at, runs.job_title, runs.model, runs.temperature, runs.max_tokens, "
+                "runs.company_context, runs.prompts, runs.routes, runs.jd_text, run_signatures.signature "
+                "FROM run_signatures JOIN runs ON runs.id = run_signatures.run_id "
+                f"WHERE run_signatures.run_id IN (SELECT run_id FROM run_buckets WHERE bucket IN ({', '.join('?' * len(buckets))})) "
+                "ORDER BY runs.created_at DESC",
+                buckets
+            ).fetchall()
+        matches = {}
+        for run_id, created_at, job_title, model, temperature, max_tokens, company_context, prompts, routes, \
+                stored_text, stored_signature in rows:
+            score = similarity(signature, unpack_signature(stored_signature))
+            if score < threshold or stored_text in matches:
+                continue
+            run = {
+                'model': model, 'temperature': temperature, 'max_tokens': max_tokens,
+                'company_context': json.loads(company_context) if company_context else None,
+                'prompts': json.loads(prompts) if prompts else None,
+                'routes': json.loads(routes) if routes else None
+            }
+            differences = input_differences(run, inputs) if inputs is not None else None
+            if same_inputs_only and differences:
+                continue
+            matches[stored_text] = {
+                'id': run_id,
+                'similarity': score,
+                'job_title': job_title,
+                'model': model,
+                'prompt_version': prompt_version(run['prompts']),
+                'differences': differences,
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created_at))
+            }
+        return sorted(matches.values(), key=lambda match: -match['similarity'])[:limit]
+
+    def _filter(self, query: str):
+        """FROM/WHERE clause and parameters matching every word of a search query"""
+        words = _WORD_PATTERN.findall(query)
+        if not words:
+            return "FROM runs WHERE 1", ()
+        if self.full_text:
+            # Quote each word so FTS syntax characters in the query are taken literally
+            match = ' '.join(f'"{word}"*' for word in words)
+            return "FROM runs JOIN runs_fts ON runs_fts.rowid = runs.id WHERE runs_fts MATCH ?", (match,)
+        conditions = ' AND '.join("(runs.jd_text LIKE ? OR runs.job_title LIKE ?)" for _ in words)
+        return f"FROM runs WHERE {conditions}", tuple(pattern for word in words for pattern in (f"%{word}%", f"%{word}%"))
+
+    def search(self, query: str = '', limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest runs whose JD text or job title match every word of the query"""
+        clause, params = self._filter(query)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} {clause} ORDER BY runs.created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [
+            {'id': run_id, 'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created_at)),
+             'source': source, 'job_title': job_title, 'model': model, 'jd_preview': preview}
+            for run_id, created_at, source, job_title, model, preview in rows
+        ]
+
+    def iter_runs(self, query: str = '', batch_size: int = 200) -> Iterator[Dict[str, Any]]:
+        """Every matching run in full, oldest first, fetched a page at a time
+
+        Pages are keyed on the run id, so memory stays bounded however many
+        runs are stored and runs added meanwhile are picked up at the end.
+        """
+        clause, params = self._filter(query)
+        last_id = 0
+        while True:
+            with self._lock:
+                cursor = self._conn.execute(
+                    f"SELECT runs.* {clause} AND runs.id > ? ORDER BY runs.id LIMIT ?",
+                    (*params, last_id, batch_size)
+                )
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._decode(dict(zip(columns, row)))
+            last_id = rows[-1][0]
+
+    def count(self, query: str = '') -> int:
+        """Number of stored runs matching the query (all runs when it is empty)"""
+        clause, params = self._filter(query)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
@@ -0,0 +1,152 @@
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+# Estimated USD price per 1M tokens as (input, output); unknown models get no cost estimate
+MODEL_PRICING = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-3.5-turbo': (0.50, 1.50)
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    session_id TEXT,
+    step TEXT,
+    model TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    latency REAL,
+    retries INTEGER,
+    cached INTEGER,
+    cost REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_calls_session ON calls (session_id, timestamp);
+"""
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimate the USD cost of a call from its token counts"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        # Dated snapshots (e.g. gpt-4o-2024-08-06) share their base model's pricing
+        pricing = next((price for name, price in sorted(MODEL_PRICING.items(), key=lambda item: -len(item[0]))
+                        if model.startswith(name)), None)
+    if pricing is None:
+        return None
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _percentile_sql(fraction: float) -> str:
+    """SQL for the nearest-rank percentile of latency over rows numbered by call_rank out of live"""
+    scaled = f"{fraction!r} * live"
+    # ceil() isn't built into every SQLite, so round up by hand
+    nearest = f"MAX(1, CAST({scaled} AS INTEGER) + ({scaled} > CAST({scaled} AS INTEGER)))"
+    return f"MAX(CASE WHEN call_rank = {nearest} THEN latency END)"
+
+
+class TelemetryLog:
+    """Local SQLite log of every chat completion call: tokens, latency, retries and cost"""
+
+    def __init__(self, path: str = "telemetry.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def record(self, session_id: str, step: str, model: str, latency: float,
+               usage: Optional[Dict[str, int]] = None, retries: int = 0,
+               cached: bool = False, error: Optional[str] = None):
+        """Append one call to the log; cached calls are recorded with no cost"""
+        prompt_tokens = (usage or {}).get('prompt_tokens', 0)
+        completion_tokens = (usage or {}).get('completion_tokens', 0)
+        cost = 0.0 if cached else estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO calls (timestamp, session_id, step, model, prompt_tokens, completion_tokens, "
+                "latency, retries, cached, cost, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), session_id, step, model, prompt_tokens, completion_tokens,
+                 latency, retries, int(cached), cost, error)
+            )
+            self._conn.commit()
+
+    def recorder(self, session_id: str):
+        """Return a callback that records call events for one session"""
+        def record(event: Dict[str, Any]):
+            self.record(session_id=session_id, **event)
+        return record
+
+    @staticmethod
+    def _where(session_id: Optional[str]):
+        """WHERE clause and parameters limiting calls to one session, or to none"""
+        if session_id is None:
+            return "WHERE 1", ()
+        return "WHERE session_id = ?", (session_id,)
+
+    def totals(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Call count, token totals and estimated cost, for one session or overall"""
+        where, params = self._where(session_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(cached), 0), COALESCE(SUM(error != ''), 0), "
+                "COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(cost), 0.0) "
+                f"FROM calls {where}",
+                params
+            ).fetchone()
+        return dict(zip(('calls', 'cached_calls', 'errors', 'prompt_tokens', 'completion_tokens', 'cost'), row))
+
+    def step_summary(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-step latency percentiles and token/cost totals for live (uncached) calls"""
+        where, params = self._where(session_id)
+        with self._lock:
+            totals = self._conn.execute(
+                "SELECT COALESCE(step, 'unknown') AS step_name, COUNT(*), COALESCE(SUM(cached), 0), "
+                "COALESCE(SUM(error != ''), 0), COALESCE(SUM(retries), 0), COALESCE(SUM(prompt_tokens), 0), "
+                "COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(cost), 0.0) "
+                f"FROM calls {where} GROUP BY step_name ORDER BY step_name",
+                params
+            ).fetchall()
+            # Nearest-rank percentiles of successful live calls, picked by rank within each step
+            latencies = {
+                step: values for step, *values in self._conn.execute(
+                    f"SELECT step_name, {', '.join(_percentile_sql(fraction) for fraction in (0.50, 0.95, 0.99))} "
+                    "FROM (SELECT COALESCE(step, 'unknown') AS step_name, latency, "
+                    "ROW_NUMBER() OVER (PARTITION BY COALESCE(step, 'unknown') ORDER BY latency) AS call_rank, "
+                    "COUNT(*) OVER (PARTITION BY COALESCE(step, 'unknown')) AS live "
+                    f"FROM calls {where} AND cached = 0 AND COALESCE(error, '') = '') GROUP BY step_name",
+                    params
+                )
+            }
+
+        summary = []
+        for step, calls, cached, errors, retries, prompt_tokens, completion_tokens, cost in totals:
+            p50, p95, p99 = latencies.get(step, (None, None, None))
+            summary.append({
+                'step': step,
+                'calls': calls,
+                'cached': cached,
+                'errors': errors,
+                'retries': retries,
+                'p50_latency_s': p50,
+                'p95_latency_s': p95,
+                'p99_latency_s': p99,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'cost_usd': cost
+            })
+        return summary
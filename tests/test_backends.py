@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from backends import LOCAL_API_KEY, OPENAI_BACKEND, build_router, load_backends, parse_route
+from extraction import planning_model, planning_window, step_context_window
+from llm import StepRouter
+from tokens import MODEL_CONTEXT_WINDOWS
+
+
+def _write(tmp_path, config) -> str:
+    path = tmp_path / 'backends.json'
+    path.write_text(json.dumps(config), encoding='utf-8')
+    return str(path)
+
+
+def test_missing_file_means_openai_only(tmp_path):
+    backends, warnings = load_backends(str(tmp_path / 'absent.json'))
+    assert list(backends) == [OPENAI_BACKEND]
+    assert warnings == []
+
+
+def test_valid_entries_carry_their_context_window(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCAL_KEY', "secret")
+    path = _write(tmp_path, {
+        'local': {'base_url': "http://localhost:8080/v1", 'models': ["llama3"], 'context_window': 4096},
+        'keyed': {'base_url': "http://gpu:8000/v1", 'models': ["qwen"], 'api_key_env': 'LOCAL_KEY'}
+    })
+    backends, warnings = load_backends(path)
+    assert warnings == []
+    assert backends['local'] == {'base_url': "http://localhost:8080/v1", 'api_key': LOCAL_API_KEY,
+                                 'models': ["llama3"], 'context_window': 4096}
+    assert backends['keyed']['api_key'] == "secret"
+    assert backends['keyed']['context_window'] is None
+    # Windows stay with the backend config instead of leaking into the shared table
+    assert 'llama3' not in MODEL_CONTEXT_WINDOWS
+
+
+@pytest.mark.parametrize('entry', [
+    [1, 2],
+    {'models': ["m"]},
+    {'base_url': "http://x", 'models': "m"},
+    {'base_url': "http://x", 'models': []},
+    {'base_url': "http://x", 'models': ["m"], 'context_window': "lots"},
+    {'base_url': "http://x", 'models': ["m"], 'context_window': -5},
+    {'base_url': "http://x", 'models': ["m"], 'context_window': 1.5},
+    {'base_url': "http://x", 'models': ["m"], 'api_key': 123}
+])
+def test_bad_entries_are_skipped_with_a_warning(tmp_path, entry):
+    backends, warnings = load_backends(_write(tmp_path, {'bad': entry}))
+    assert list(backends) == [OPENAI_BACKEND]
+    assert len(warnings) == 1 and warnings[0].startswith("Skipping backend 'bad'")
+
+
+def test_unreadable_file_is_a_warning(tmp_path):
+    path = tmp_path / 'backends.json'
+    path.write_text("{not json", encoding='utf-8')
+    backends, warnings = load_backends(str(path))
+    assert list(backends) == [OPENAI_BACKEND] and warnings
+    backends, warnings = load_backends(_write(tmp_path, [1]))
+    assert list(backends) == [OPENAI_BACKEND] and warnings
+
+
+def test_parse_route():
+    assert parse_route("skills=local/llama3") == ('skills', 'local', 'llama3')
+    with pytest.raises(ValueError):
+        parse_route("unknown=local/llama3")
+    with pytest.raises(ValueError):
+        parse_route("skills=local")
+
+
+def test_router_shares_one_client_per_backend_and_carries_windows(tmp_path):
+    backends, _ = load_backends(_write(tmp_path, {
+        'local': {'base_url': "http://localhost:8080/v1", 'models': ["llama3"], 'context_window': 4096}
+    }))
+    made = []
+    default = object()
+    router = build_router(default, backends, {'skills': ('local', 'llama3'), 'base_info': ('local', 'llama3'),
+                                              'enhancement': ('openai', 'gpt-4o')},
+                          lambda backend: made.append(backend) or object())
+    assert len(made) == 1
+    assert router.resolve('skills', 'gpt-4o-mini') == router.resolve('base_info_repair', 'gpt-4o-mini')
+    assert router.resolve('enhancement', 'gpt-4o-mini') == (default, 'gpt-4o')
+    assert router.resolve('responsibilities', 'gpt-4o-mini') == (default, 'gpt-4o-mini')
+    assert router.context_window('skills_repair') == 4096
+    assert router.context_window('enhancement') is None
+    assert build_router(default, backends, {}, lambda backend: object()) is None
+    with pytest.raises(ValueError):
+        build_router(default, backends, {'skills': ('nope', 'm')}, lambda backend: object())
+
+
+def test_routed_backend_windows_drive_planning():
+    router = StepRouter(object(), {
+        'skills': {'client': object(), 'model': 'llama3', 'backend': 'local', 'context_window': 4096}
+    })
+    assert step_context_window(router, 'skills', 'gpt-4o-mini') == 4096
+    assert step_context_window(router, 'skills_repair', 'gpt-4o-mini') == 4096
+    assert step_context_window(router, 'base_info', 'gpt-4o-mini') == 128000
+    assert planning_window(router, ['base_info', 'skills'], 'gpt-4o-mini') == 4096
+    assert planning_model(router, ['base_info', 'skills'], 'gpt-4o-mini') == 'llama3'
+    assert planning_window(object(), ['base_info'], 'gpt-3.5-turbo') == 16385
@@ -0,0 +1,97 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from export import FLAT_COLUMNS, available_formats, format_for_path, write_export
+from run_history import RunHistory
+
+TEMPLATES = {'step1_prompt': "Enhance {jd_text}"}
+RESULTS = {
+    'base_info': {'job_title': "Data Engineer", 'seniority_level': "Mid Level", 'location': "Zürich"},
+    'skills': [{'skill_name': "SQL", 'skill_type': "technical", 'proficiency_level': "Advanced"}],
+    'responsibilities': ["Build pipelines", "Own data quality"]
+}
+
+
+@pytest.fixture
+def runs(tmp_path):
+    history = RunHistory(str(tmp_path / 'runs.db'))
+    for index in range(3):
+        history.add(f"Data engineer JD {index}, naïve “quotes”", {'name': "Acme"}, TEMPLATES,
+                    'gpt-4o-mini', 0.1, 500, f"Enhanced {index}", RESULTS, {'total': 1.5})
+    return list(history.iter_runs())
+
+
+def _export(runs, export_format: str) -> bytes:
+    out = io.BytesIO()
+    assert write_export(iter(runs), export_format, out) == len(runs)
+    return out.getvalue()
+
+
+def test_format_for_path_prefers_the_longest_extension():
+    assert format_for_path("runs.jsonl") == 'jsonl'
+    assert format_for_path("runs.jsonl.gz") == 'jsonl.gz'
+    assert format_for_path("runs.jsonl.zst") == 'jsonl.zst'
+    assert format_for_path("runs.csv") == 'csv'
+    assert format_for_path("runs.txt") is None
+
+
+def test_jsonl_round_trips_runs(runs):
+    lines = _export(runs, 'jsonl').decode('utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record['id'] for record in records] == [run['id'] for run in runs]
+    assert records[0]['extraction_results'] == RESULTS
+    assert records[0]['jd_text'] == runs[0]['jd_text']
+    assert isinstance(records[0]['created_at'], str) and 'T' in records[0]['created_at']
+
+
+def test_gzip_holds_the_same_jsonl(runs):
+    assert gzip.decompress(_export(runs, 'jsonl.gz')) == _export(runs, 'jsonl')
+
+
+def test_zstd_holds_the_same_jsonl(runs):
+    zstandard = pytest.importorskip('zstandard')
+    compressed = _export(runs, 'jsonl.zst')
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(compressed) == _export(runs, 'jsonl')
+
+
+def test_csv_has_one_flat_row_per_run(runs):
+    out = io.BytesIO()
+    write_export(iter(runs), 'csv', out)
+    # The caller's stream stays open after writing
+    assert not out.closed
+    rows = list(csv.DictReader(io.StringIO(out.getvalue().decode('utf-8'))))
+    assert len(rows) == 3
+    assert tuple(rows[0]) == FLAT_COLUMNS
+    assert rows[0]['job_title'] == "Data Engineer"
+    assert rows[0]['seniority_level'] == "Mid Level"
+    assert rows[0]['location'] == "Zürich"
+    assert (rows[0]['skill_count'], rows[0]['responsibility_count']) == ('1', '2')
+    assert json.loads(rows[0]['skills']) == RESULTS['skills']
+    assert json.loads(rows[0]['base_info']) == RESULTS['base_info']
+
+
+def test_parquet_has_one_row_per_run(runs):
+    pytest.importorskip('pyarrow')
+    from pyarrow import parquet
+    table = parquet.read_table(io.BytesIO(_export(runs, 'parquet')))
+    assert table.num_rows == 3
+    assert tuple(table.column_names) == FLAT_COLUMNS
+
+
+def test_empty_export_writes_a_valid_file():
+    assert _export([], 'jsonl') == b''
+    assert gzip.decompress(_export([], 'jsonl.gz')) == b''
+    assert _export([], 'csv').decode('utf-8').strip() == ','.join(FLAT_COLUMNS)
+
+
+def test_unavailable_format_is_rejected():
+    with pytest.raises(ValueError):
+        write_export([], 'xml', io.BytesIO())
+    missing = [name for name in ('jsonl.zst', 'parquet') if name not in available_formats()]
+    for name in missing:
+        with pytest.raises(ValueError):
+            write_export([], name, io.BytesIO())
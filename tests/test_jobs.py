@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_RUNNING, JobRunner
+
+
+def _wait(job, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert job.finished, job.status
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=1)
+    yield runner
+    runner.shutdown()
+
+
+def test_result_and_progress_of_a_finished_job(runner):
+    def work(job, count, suffix=''):
+        for index in range(count):
+            job.progress['done'] = index + 1
+        return f"{count}{suffix}"
+
+    job = runner.submit('enhancement', "Enhance JD", work, 3, suffix='!', meta={'model': 'gpt-4o-mini'})
+    _wait(job)
+    assert (job.status, job.result, job.progress, job.error) == (JOB_DONE, "3!", {'done': 3}, None)
+    assert job.meta == {'model': 'gpt-4o-mini'}
+    assert job.elapsed >= 0 and job.finished_at >= job.started_at
+
+
+def test_an_exception_fails_the_job(runner):
+    def work(job):
+        raise ValueError("bad input")
+
+    job = runner.submit('extraction', "Extract", work)
+    _wait(job)
+    assert (job.status, job.error, job.result) == (JOB_FAILED, "bad input", None)
+
+
+def test_running_job_stops_at_its_next_check(runner):
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while True:
+            job.check_cancelled()
+            time.sleep(0.005)
+
+    job = runner.submit('enhancement', "Enhance JD", work)
+    assert started.wait(5)
+    assert job.status == JOB_RUNNING
+    assert runner.cancel(job.id)
+    _wait(job)
+    assert job.status == JOB_CANCELLED
+    assert not runner.cancel(job.id)
+
+
+def test_queued_job_is_cancelled_without_running(runner):
+    release = threading.Event()
+    ran = []
+    blocker = runner.submit('enhancement', "Blocker", lambda job: release.wait(5))
+    queued = runner.submit('extraction', "Queued", lambda job: ran.append(job.id))
+    assert runner.cancel(queued.id)
+    assert queued.status == JOB_CANCELLED
+    release.set()
+    _wait(blocker)
+    assert ran == []
+
+
+def test_jobs_are_listed_newest_first_by_kind(runner):
+    release = threading.Event()
+    first = runner.submit('enhancement', "First", lambda job: release.wait(5))
+    second = runner.submit('extraction', "Second", lambda job: None)
+    time.sleep(0.001)
+    third = runner.submit('extraction', "Third", lambda job: None)
+    assert [job.id for job in runner.jobs('extraction')] == [third.id, second.id]
+    assert {job.id for job in runner.active()} == {first.id, second.id, third.id}
+    release.set()
+    for job in (first, second, third):
+        _wait(job)
+    assert runner.active() == []
+    assert runner.get(first.id) is first
+
+
+def test_only_applied_finished_jobs_are_pruned():
+    runner = JobRunner(max_workers=1, max_finished=1)
+    try:
+        old = runner.submit('enhancement', "Old", lambda job: None)
+        _wait(old)
+        unapplied = runner.submit('enhancement', "Unapplied", lambda job: None)
+        _wait(unapplied)
+        old.applied = True
+        time.sleep(0.001)
+        newer = runner.submit('enhancement', "Newer", lambda job: None)
+        _wait(newer)
+        newer.applied = True
+        runner.submit('enhancement', "Trigger", lambda job: None)
+        assert runner.get(old.id) is None
+        assert runner.get(unapplied.id) is unapplied
+        assert runner.get(newer.id) is newer
+    finally:
+        runner.shutdown()
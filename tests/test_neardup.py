@@ -0,0 +1,63 @@
+import random
+
+from neardup import (
+    NUM_BANDS,
+    NUM_PERMUTATIONS,
+    lsh_buckets,
+    minhash,
+    pack_signature,
+    shingles,
+    similarity,
+    unpack_signature
+)
+
+_WORDS = ("design build operate scalable backend services python kubernetes team mentor review code "
+          "customers data pipelines reliability on call metrics product roadmap cloud security").split()
+
+
+def _text(seed: int, length: int = 300) -> str:
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(_WORDS) for _ in range(length))
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Senior Python Engineer, remote!") == shingles("senior python engineer remote")
+    assert shingles("") == set()
+    assert len(shingles("one two")) == 1
+
+
+def test_identical_text_has_identical_signature():
+    text = _text(1)
+    assert minhash(text) == minhash(text)
+    assert len(minhash(text)) == NUM_PERMUTATIONS
+    assert similarity(minhash(text), minhash(text)) == 1.0
+
+
+def test_similarity_tracks_how_much_text_is_shared():
+    text = _text(1)
+    words = text.split()
+    edited = ' '.join(words[:-10] + _text(2, 10).split())
+    unrelated = _text(3)
+    assert similarity(minhash(text), minhash(edited)) > 0.8
+    assert similarity(minhash(text), minhash(unrelated)) < 0.3
+
+
+def test_near_duplicates_share_an_lsh_bucket_and_unrelated_texts_do_not():
+    text = _text(1)
+    edited = text.replace(text.split()[50], "changed", 1)
+    buckets = lsh_buckets(minhash(text))
+    assert len(buckets) == NUM_BANDS
+    assert set(buckets) & set(lsh_buckets(minhash(edited)))
+    assert not set(buckets) & set(lsh_buckets(minhash(_text(3))))
+
+
+def test_buckets_are_per_band():
+    signature = minhash(_text(1))
+    assert [bucket.split(':')[0] for bucket in lsh_buckets(signature)] == [str(band) for band in range(NUM_BANDS)]
+
+
+def test_signature_packing_round_trips():
+    signature = minhash(_text(4))
+    assert unpack_signature(pack_signature(signature)) == signature
+    empty = minhash("")
+    assert unpack_signature(pack_signature(empty)) == empty
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from benchmarks.mock_server import ENHANCED_TEXT, MockOpenAIServer, MockSettings
+from extraction import EXTRACTION_NAMES, base_info_cutoff, base_info_text, extraction_fingerprint
+from llm import create_client
+from pipeline import stream_pipelined
+from prompts import DEFAULT_PROMPT_TEMPLATES, render_prompt, step1_prompt_values
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL = 'gpt-4o-mini'
+COMPANY_CONTEXT = {'name': "TechCorp Inc.", 'industry': "Software", 'company_size': "500-1000",
+                   'headquarters': "San Francisco, CA"}
+TEMPLATES = {name: DEFAULT_PROMPT_TEMPLATES[f"{name}_prompt"] for name in EXTRACTION_NAMES}
+
+
+@pytest.fixture
+def client():
+    with MockOpenAIServer(MockSettings(latency=0)) as server:
+        yield create_client('sk-test', max_retries=0, base_url=server.base_url)
+
+
+@pytest.mark.parametrize('heading', [
+    "6. Compensation and Benefits",
+    "## Interview Process",
+    "**7) Key Performance Indicators**",
+    "  * compensation"
+])
+def test_cutoff_finds_the_first_later_heading(heading):
+    text = f"1. Job Title\nEngineer\n\n{heading}\nNot specified\n"
+    assert base_info_cutoff(text) is not None
+    assert base_info_text(text) == "1. Job Title\nEngineer"
+
+
+def test_cutoff_is_none_until_a_later_heading_arrives():
+    text = "1. Job Title\nEngineer\nSalary and compensation are discussed later\n"
+    assert base_info_cutoff("1. Job Title\nEngineer\n") is None
+    assert base_info_cutoff(text) is None
+    assert base_info_text(text) == text.rstrip()
+
+
+def test_base_info_fingerprint_ignores_the_later_sections():
+    def fingerprint(name, text):
+        return extraction_fingerprint(name, TEMPLATES[name], text, COMPANY_CONTEXT, MODEL, 0.1, 1000)
+
+    changed = ENHANCED_TEXT.replace("Not specified", "$150k-$200k")
+    assert fingerprint('base_info', ENHANCED_TEXT) == fingerprint('base_info', changed)
+    assert fingerprint('skills', ENHANCED_TEXT) != fingerprint('skills', changed)
+    earlier = ENHANCED_TEXT.replace("San Francisco, CA (Hybrid)", "Remote")
+    assert fingerprint('base_info', ENHANCED_TEXT) != fingerprint('base_info', earlier)
+
+
+def test_pipelined_base_info_is_current_for_the_final_text(client):
+    with open(os.path.join(REPO_DIR, 'sample_jd.txt'), 'r', encoding='utf-8') as f:
+        jd_text = f.read()
+    prompt = render_prompt(DEFAULT_PROMPT_TEMPLATES['step1_prompt'], step1_prompt_values(jd_text, COMPANY_CONTEXT))
+    stats = {}
+    content = ''.join(stream_pipelined(client, MODEL, prompt, 0.1, 1000, stats, TEMPLATES, COMPANY_CONTEXT))
+
+    # Base info started before the stream ended, on text cut off at the compensation section
+    assert stats['base_info_started'] is not None
+    assert stats['base_info_chars'] < len(content)
+    seen = content[:stats['base_info_chars']]
+    assert base_info_text(seen) == base_info_text(content)
+    assert (extraction_fingerprint('base_info', TEMPLATES['base_info'], seen, COMPANY_CONTEXT, MODEL, 0.1, 1000)
+            == extraction_fingerprint('base_info', TEMPLATES['base_info'], content, COMPANY_CONTEXT, MODEL, 0.1, 1000))
+    assert set(stats['extractions']) == set(EXTRACTION_NAMES)
+    assert not any(result['error'] for result in stats['extractions'].values())
@@ -0,0 +1,71 @@
+import json
+import threading
+
+import pytest
+
+from prompt_store import PromptStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'saved_prompts.json')
+
+
+def test_missing_file_gives_the_defaults(path):
+    store = PromptStore(path)
+    assert store.get('skills_prompt', "default") == "default"
+    assert store.all() == {}
+    assert store.history('skills_prompt') == []
+
+
+def test_save_writes_the_file_and_numbers_versions(path):
+    store = PromptStore(path)
+    assert store.save('skills_prompt', "v1 {enhanced_text}") == 1
+    assert store.save('skills_prompt', "v2 {enhanced_text}") == 2
+    assert store.save('step1_prompt', "enhance {jd_text}") == 1
+    with open(path) as f:
+        assert json.load(f) == {'skills_prompt': "v2 {enhanced_text}", 'step1_prompt': "enhance {jd_text}"}
+    assert [entry['content'] for entry in store.history('skills_prompt')] == ["v1 {enhanced_text}",
+                                                                               "v2 {enhanced_text}"]
+    assert PromptStore(path).history('skills_prompt')[-1]['version'] == 2
+
+
+def test_reads_are_served_from_memory_until_the_check_interval(path):
+    store = PromptStore(path, check_interval=3600)
+    store.save('skills_prompt', "saved")
+    with open(path, 'w') as f:
+        json.dump({'skills_prompt': "edited elsewhere"}, f)
+    assert store.get('skills_prompt', "default") == "saved"
+
+    fresh = PromptStore(path, check_interval=0)
+    assert fresh.get('skills_prompt', "default") == "edited elsewhere"
+
+
+def test_changes_on_disk_are_picked_up(path):
+    store = PromptStore(path, check_interval=0)
+    store.save('skills_prompt', "saved")
+    other = PromptStore(path, check_interval=0)
+    other.save('responsibilities_prompt', "from another session")
+    assert store.all() == {'skills_prompt': "saved", 'responsibilities_prompt': "from another session"}
+
+
+def test_concurrent_saves_keep_every_prompt(path):
+    stores = [PromptStore(path, check_interval=0) for _ in range(4)]
+    threads = [
+        threading.Thread(target=store.save, args=(f"prompt_{index}", f"content {index}"))
+        for index, store in enumerate(stores)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert PromptStore(path).all() == {f"prompt_{index}": f"content {index}" for index in range(4)}
+
+
+def test_reset_removes_prompts_but_keeps_history(path):
+    store = PromptStore(path, check_interval=0)
+    store.save('skills_prompt', "saved")
+    assert store.reset()
+    assert store.get('skills_prompt', "default") == "default"
+    assert len(store.history('skills_prompt')) == 1
+    assert not store.reset()
@@ -0,0 +1,137 @@
+import json
+import time
+
+import pytest
+
+from llm import LIMITER_PAUSED, httpx
+from ratelimit import DEFAULT_PENALTY_SECONDS, RateLimiter, budget_scope, parse_reset
+
+SCOPE = budget_scope('api.openai.com', 'sk-a')
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ("6m0s", 360.0),
+    ("1s", 1.0),
+    ("20ms", 0.02),
+    ("1h2m3.5s", 3723.5),
+    ("2.5", 2.5),
+    ("", None),
+    (None, None),
+    ("soon", None)
+])
+def test_parse_reset(value, seconds):
+    if seconds is None:
+        assert parse_reset(value) is None
+    else:
+        assert parse_reset(value) == pytest.approx(seconds)
+
+
+def test_budget_scope_separates_keys_and_hosts_without_keeping_the_key():
+    scope = budget_scope('api.openai.com', 'sk-secret')
+    assert 'sk-secret' not in scope
+    assert scope == budget_scope('api.openai.com', 'sk-secret')
+    assert scope != budget_scope('api.openai.com', 'sk-other')
+    assert scope != budget_scope('localhost:8000', 'sk-secret')
+
+
+def test_requests_per_minute_window():
+    limiter = RateLimiter(requests_per_minute=2)
+    assert limiter.acquire(SCOPE, 'gpt-4o-mini', 10) < 0.01
+    assert limiter.acquire(SCOPE, 'gpt-4o-mini', 10) < 0.01
+    budget = limiter._budget(SCOPE, 'gpt-4o-mini')
+    assert budget.wait_time(time.monotonic(), 10) > 59
+
+
+def test_tokens_per_minute_window():
+    limiter = RateLimiter(tokens_per_minute=100)
+    limiter.acquire(SCOPE, 'gpt-4o-mini', 80)
+    budget = limiter._budget(SCOPE, 'gpt-4o-mini')
+    assert budget.wait_time(time.monotonic(), 10) <= 0
+    assert budget.wait_time(time.monotonic(), 30) > 59
+
+
+def test_headers_become_authoritative():
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=10 ** 6)
+    paused = limiter.observe(SCOPE, 'gpt-4o-mini', 200, {
+        'x-ratelimit-limit-requests': '500',
+        'x-ratelimit-limit-tokens': '30000',
+        'x-ratelimit-remaining-requests': '0',
+        'x-ratelimit-remaining-tokens': '29000',
+        'x-ratelimit-reset-requests': '2s',
+        'x-ratelimit-reset-tokens': '120ms'
+    })
+    assert not paused
+    budget = limiter._budget(SCOPE, 'gpt-4o-mini')
+    assert (budget.requests_per_minute, budget.tokens_per_minute) == (500, 30000)
+    assert budget.wait_time(time.monotonic(), 10) == pytest.approx(2.0, abs=0.1)
+    models = limiter.stats()['models']
+    assert models['gpt-4o-mini @ api.openai.com']['remaining_tokens'] == 29000
+
+
+def test_malformed_headers_are_ignored():
+    limiter = RateLimiter(requests_per_minute=60)
+    limiter.observe(SCOPE, 'gpt-4o-mini', 200, {'x-ratelimit-limit-requests': 'lots',
+                                                'x-ratelimit-remaining-requests': ''})
+    budget = limiter._budget(SCOPE, 'gpt-4o-mini')
+    assert budget.requests_per_minute == 60
+    assert budget.remaining_requests is None
+
+
+def test_429_pauses_only_its_scope_and_model():
+    limiter = RateLimiter()
+    assert limiter.observe(SCOPE, 'gpt-4o-mini', 429, {'retry-after-ms': '1500'})
+    now = time.monotonic()
+    assert limiter._budget(SCOPE, 'gpt-4o-mini').wait_time(now, 1) == pytest.approx(1.5, abs=0.1)
+    assert limiter._budget(SCOPE, 'gpt-4o').wait_time(now, 1) <= 0
+    other_key = budget_scope('api.openai.com', 'sk-b')
+    assert limiter._budget(other_key, 'gpt-4o-mini').wait_time(now, 1) <= 0
+    assert limiter.stats()['rate_limited'] == 1
+
+
+def test_429_without_hints_uses_the_default_penalty():
+    limiter = RateLimiter()
+    limiter.observe(SCOPE, 'gpt-4o-mini', 429, {})
+    wait = limiter._budget(SCOPE, 'gpt-4o-mini').wait_time(time.monotonic(), 1)
+    assert wait == pytest.approx(DEFAULT_PENALTY_SECONDS, abs=0.1)
+
+
+def test_stats_can_be_limited_to_scopes_and_label_key_collisions():
+    limiter = RateLimiter()
+    other_key = budget_scope('api.openai.com', 'sk-b')
+    limiter.acquire(SCOPE, 'gpt-4o-mini', 1)
+    limiter.acquire(other_key, 'gpt-4o-mini', 1)
+    labels = list(limiter.stats()['models'])
+    assert labels[0] == 'gpt-4o-mini @ api.openai.com'
+    assert labels[1].startswith('gpt-4o-mini @ api.openai.com (key ')
+    assert list(limiter.stats([other_key])['models']) == ['gpt-4o-mini @ api.openai.com']
+
+
+def _chat_request(api_key: str = 'sk-a') -> 'httpx.Request':
+    body = {'model': 'gpt-4o-mini', 'max_tokens': 50, 'messages': [{'role': 'user', 'content': "hello"}]}
+    return httpx.Request(
+        'POST', 'https://api.openai.com/v1/chat/completions',
+        headers={'authorization': f"Bearer {api_key}"}, content=json.dumps(body).encode('utf-8')
+    )
+
+
+def test_hooks_budget_chat_calls_and_mark_429s():
+    limiter = RateLimiter()
+    request = _chat_request()
+    limiter.request_hook()(request)
+    assert limiter._budget(SCOPE, 'gpt-4o-mini').sent[0][1] >= 50
+
+    response = httpx.Response(429, headers={'retry-after': '0.5'}, request=request)
+    limiter.response_hook()(response)
+    assert response.extensions.get(LIMITER_PAUSED) is True
+
+    ok = httpx.Response(200, request=_chat_request())
+    limiter.response_hook()(ok)
+    assert LIMITER_PAUSED not in ok.extensions
+
+
+def test_hooks_ignore_other_requests():
+    limiter = RateLimiter(requests_per_minute=1)
+    request = httpx.Request('GET', 'https://api.openai.com/v1/models')
+    limiter.request_hook()(request)
+    limiter.response_hook()(httpx.Response(429, request=request))
+    assert limiter.stats()['models'] == {}
@@ -0,0 +1,248 @@
+import fnmatch
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import response_cache
+from response_cache import DirectoryStore, RedisStore, ResponseCache
+
+
+@pytest.fixture(params=['directory', 'sqlite'])
+def location(request, tmp_path):
+    if request.param == 'sqlite':
+        return f"sqlite:///{tmp_path / 'cache.db'}"
+    return str(tmp_path / 'cache')
+
+
+def test_make_key_is_exact_about_messages():
+    messages = [{'role': 'user', 'content': "Extract skills"}]
+    key = ResponseCache.make_key('gpt-4o-mini', messages, temperature=0.1)
+    assert key == ResponseCache.make_key('gpt-4o-mini', list(messages), temperature=0.1)
+    assert key != ResponseCache.make_key('gpt-4o-mini', [{'role': 'user', 'content': "Extract  skills"}],
+                                         temperature=0.1)
+    assert key != ResponseCache.make_key('gpt-4o', messages, temperature=0.1)
+    assert key != ResponseCache.make_key('gpt-4o-mini', messages, temperature=0.2)
+
+
+def test_get_set_round_trip_and_counters(location):
+    cache = ResponseCache(location)
+    assert cache.get('k') is None
+    cache.set('k', {'content': "hello"})
+    assert cache.get('k') == {'content': "hello"}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_store_survives_a_new_cache_instance(location):
+    ResponseCache(location).set('k', {'content': "persisted"})
+    assert ResponseCache(location).get('k') == {'content': "persisted"}
+
+
+def test_evicts_least_recently_used_over_max_entries(location):
+    cache = ResponseCache(location, max_entries=2, memory_entries=0)
+    cache.set('a', {'content': "a"})
+    time.sleep(0.01)
+    cache.set('b', {'content': "b"})
+    time.sleep(0.01)
+    assert cache.get('a') is not None
+    time.sleep(0.01)
+    cache.set('c', {'content': "c"})
+    assert cache.stats()['entries'] == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == {'content': "a"}
+    assert cache.get('c') == {'content': "c"}
+
+
+def test_memory_hits_refresh_the_store_lru_order(location, monkeypatch):
+    monkeypatch.setattr(response_cache, 'STORE_TOUCH_SECONDS', 0.0)
+    cache = ResponseCache(location, max_entries=2)
+    cache.set('a', {'content': "a"})
+    time.sleep(0.01)
+    cache.set('b', {'content': "b"})
+    time.sleep(0.01)
+    # Served from the memory tier, but the store must still see 'a' as recently used
+    assert cache.get('a') is not None
+    time.sleep(0.01)
+    cache.set('c', {'content': "c"})
+    fresh = ResponseCache(location)
+    assert fresh.get('a') is not None
+    assert fresh.get('b') is None
+
+
+def test_expired_entries_are_misses_in_both_tiers(location):
+    cache = ResponseCache(location, max_age_seconds=0.05)
+    cache.set('k', {'content': "old"})
+    time.sleep(0.1)
+    assert cache.get('k') is None
+    assert ResponseCache(location, max_age_seconds=0.05).get('k') is None
+
+
+def test_memory_tier_is_capped_by_entries_and_bytes(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'entries'), memory_entries=2)
+    for key in 'abc':
+        cache.set(key, {'content': key})
+    assert cache.stats()['memory_entries'] == 2
+
+    cache = ResponseCache(str(tmp_path / 'bytes'), memory_bytes=100)
+    cache.set('big', {'content': "x" * 200})
+    assert cache.stats()['memory_entries'] == 0
+    assert cache.get('big') == {'content': "x" * 200}
+
+
+def test_directory_store_writes_do_not_rescan(tmp_path, monkeypatch):
+    store = DirectoryStore(str(tmp_path))
+    scans = []
+    monkeypatch.setattr(store, '_rescan', lambda: scans.append(1))
+    for index in range(5):
+        store.set(f"k{index}", {'created_at': time.time(), 'value': {}}, ttl=60)
+        store.evict(max_entries=3, max_bytes=10 ** 6, max_age_seconds=60)
+    assert scans == []
+    assert store.count() == 3
+
+
+def test_get_or_claim_coalesces_identical_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    value, claim = cache.get_or_claim('k')
+    assert value is None and claim is not None
+
+    results = []
+
+    def waiter():
+        results.append(cache.get_or_claim('k'))
+
+    threads = [threading.Thread(target=waiter) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert results == []
+    cache.set('k', {'content': "shared"})
+    cache.release('k', claim)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == [({'content': "shared"}, None)] * 3
+    stats = cache.stats()
+    assert (stats['misses'], stats['coalesced'], stats['in_flight']) == (1, 3, 0)
+
+
+def test_failed_claim_lets_one_waiter_retry(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    _, claim = cache.get_or_claim('k')
+    results = []
+    thread = threading.Thread(target=lambda: results.append(cache.get_or_claim('k')))
+    thread.start()
+    time.sleep(0.05)
+    # The first request failed: nothing was stored, so the waiter gets its own claim
+    cache.release('k', claim)
+    thread.join(timeout=5)
+    value, retry_claim = results[0]
+    assert value is None and retry_claim is not None
+    cache.release('k', retry_claim)
+
+
+def test_waiter_gives_up_after_wait_seconds(tmp_path):
+    cache = ResponseCache(str(tmp_path), wait_seconds=0.05)
+    _, claim = cache.get_or_claim('k')
+    assert cache.get_or_claim('k') == (None, None)
+    cache.release('k', claim)
+
+
+def test_sqlite_errors_degrade_to_misses_and_oserror_writes(tmp_path):
+    path = tmp_path / 'cache.db'
+    cache = ResponseCache(f"sqlite:///{path}", memory_entries=0)
+    cache.set('k', {'content': "stored"})
+    # Another process breaks the database under the open connection
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("DROP TABLE entries")
+    value, claim = cache.get_or_claim('k')
+    assert value is None and claim is not None
+    with pytest.raises(OSError):
+        cache.set('k', {'content': "fresh"})
+    cache.release('k', claim)
+    assert cache.stats()['entries'] == 0
+    cache.clear()
+
+
+class FakeRedis:
+    """The few Redis commands RedisStore uses, counting keyspace scans"""
+
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+        self.scans = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode('utf-8')
+
+    def touch(self, key):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+
+    def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+
+    def zrem(self, name, *members):
+        for member in members:
+            self.zsets.get(name, {}).pop(member, None)
+
+    def zcard(self, name):
+        return len(self.zsets.get(name, {}))
+
+    def zrange(self, name, start, end):
+        ordered = sorted(self.zsets.get(name, {}).items(), key=lambda item: item[1])
+        return [member.encode('utf-8') for member, _ in ordered[start:end + 1]]
+
+    def zremrangebyscore(self, name, low, high):
+        zset = self.zsets.get(name, {})
+        for member in [member for member, score in zset.items() if score <= high]:
+            del zset[member]
+
+    def scan_iter(self, match, count=None):
+        self.scans += 1
+        return [key for key in list(self.values) if fnmatch.fnmatch(key, match)]
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def test_redis_eviction_uses_the_access_index_without_scanning(monkeypatch):
+    client = FakeRedis()
+    fake_module = SimpleNamespace(RedisError=Exception,
+                                  Redis=SimpleNamespace(from_url=lambda url: client))
+    monkeypatch.setattr(response_cache, 'redis', fake_module)
+    store = RedisStore()
+    cache = ResponseCache("redis://localhost:6379/0", max_entries=2, memory_entries=0)
+    cache.set('a', {'content': "a"})
+    time.sleep(0.01)
+    cache.set('b', {'content': "b"})
+    time.sleep(0.01)
+    assert cache.get('a') == {'content': "a"}
+    time.sleep(0.01)
+    cache.set('c', {'content': "c"})
+    assert cache.stats()['entries'] == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == {'content': "a"}
+    assert client.scans == 0
+    cache.clear()
+    assert store.count() == 0 and client.values == {}
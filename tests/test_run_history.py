@@ -0,0 +1,108 @@
+import sqlite3
+
+import pytest
+
+from run_history import RunHistory, input_differences
+
+TEMPLATES = {'step1_prompt': "Enhance {jd_text}", 'skills_prompt': "Skills from {enhanced_text}"}
+CONTEXT = {'name': "Acme", 'industry': "Retail"}
+RESULTS = {'base_info': {'job_title': "Data Engineer"}, 'skills': [], 'responsibilities': []}
+JD = ("We are hiring a data engineer to design, build and operate batch and streaming pipelines, "
+      "own data quality and reliability, mentor analysts and partner with product on the data roadmap. ") * 3
+INPUTS = {'company_context': CONTEXT, 'templates': TEMPLATES, 'model': 'gpt-4o-mini',
+          'temperature': 0.1, 'max_tokens': 500, 'routes': {}}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return RunHistory(str(tmp_path / 'runs.db'))
+
+
+def _add(history, jd_text=JD, routes=None, **overrides):
+    inputs = {**INPUTS, **overrides}
+    return history.add(jd_text, inputs['company_context'], inputs['templates'], inputs['model'],
+                       inputs['temperature'], inputs['max_tokens'], "Enhanced", RESULTS, routes=routes)
+
+
+def test_similar_lists_the_inputs_that_differ(history):
+    run_id = _add(history, model='gpt-4o', routes={'skills': "local/llama"})
+    edited = JD.replace("mentor analysts", "coach analysts", 1)
+    [match] = history.similar(edited, 0.5, inputs=INPUTS)
+    assert match['id'] == run_id and match['similarity'] > 0.8
+    assert match['differences'] == ['model', 'routes']
+    assert history.similar(edited, 0.5, inputs=INPUTS, same_inputs_only=True) == []
+    routed = {**INPUTS, 'model': 'gpt-4o', 'routes': {'skills': "local/llama"}}
+    assert history.similar(edited, 0.5, inputs=routed, same_inputs_only=True)[0]['differences'] == []
+
+
+def test_runs_stored_without_routes_count_as_unrouted(history):
+    run = {'prompts': TEMPLATES, 'model': 'gpt-4o-mini', 'temperature': 0.1, 'max_tokens': 500,
+           'company_context': CONTEXT, 'routes': None}
+    assert input_differences(run, INPUTS) == []
+    assert input_differences(run, {**INPUTS, 'routes': {'skills': "local/llama"}}) == ['routes']
+
+
+def test_routes_are_stored_with_the_run(history):
+    run_id = _add(history, routes={'skills': "local/llama"})
+    assert history.get(run_id)['routes'] == {'skills': "local/llama"}
+
+
+def test_history_files_without_a_routes_column_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+            "run_key TEXT NOT NULL, source TEXT, jd_text TEXT NOT NULL, job_title TEXT, model TEXT, "
+            "temperature REAL, max_tokens INTEGER, company_context TEXT, prompts TEXT, enhanced_text TEXT, "
+            "extraction_results TEXT, timings TEXT)"
+        )
+        conn.execute("INSERT INTO runs (created_at, run_key, jd_text, model) VALUES (0, 'old', ?, 'gpt-4o-mini')", (JD,))
+    history = RunHistory(path)
+    assert history.get(1)['routes'] is None
+    run_id = _add(history, routes={'skills': "local/llama"})
+    assert history.get(run_id)['routes'] == {'skills': "local/llama"}
+    assert [match['id'] for match in history.similar(JD, 0.9)] == [run_id]
+
+
+def test_find_returns_the_latest_run_with_the_same_inputs(history):
+    _add(history)
+    latest = _add(history)
+    # Re-pasting the JD with different whitespace is the same run
+    assert history.find(JD.replace(". ", ".\n  "), CONTEXT, TEMPLATES, 'gpt-4o-mini', 0.1, 500)['id'] == latest
+    assert history.find(JD, CONTEXT, TEMPLATES, 'gpt-4o-mini', 0.2, 500) is None
+    assert history.find(JD, CONTEXT, TEMPLATES, 'gpt-4o-mini', 0.1, 500, routes={'skills': "local/llama"}) is None
+    routed = _add(history, routes={'skills': "local/llama"})
+    assert history.find(JD, CONTEXT, TEMPLATES, 'gpt-4o-mini', 0.1, 500, routes={'skills': "local/llama"})['id'] == routed
+
+
+def test_stored_runs_round_trip(history):
+    run = history.get(_add(history))
+    assert (run['job_title'], run['model'], run['enhanced_text']) == ("Data Engineer", 'gpt-4o-mini', "Enhanced")
+    assert (run['company_context'], run['prompts'], run['extraction_results']) == (CONTEXT, TEMPLATES, RESULTS)
+    assert history.get(999) is None
+
+
+def test_similar_keeps_the_newest_run_per_jd_and_skips_unrelated_ones(history):
+    _add(history)
+    newest = _add(history)
+    _add(history, jd_text="Registered nurse for the night shift in a busy emergency department. " * 5)
+    matches = history.similar(JD, 0.5)
+    assert [match['id'] for match in matches] == [newest]
+    assert matches[0]['differences'] is None
+
+
+def test_search_and_count_match_every_word(history):
+    engineer = _add(history)
+    nurse = history.add("Registered nurse for the night shift in a busy emergency department.", CONTEXT,
+                        TEMPLATES, 'gpt-4o-mini', 0.1, 500, "Enhanced",
+                        {**RESULTS, 'base_info': {'job_title': "Night Nurse"}})
+    assert [run['id'] for run in history.search("data engineer")] == [engineer]
+    assert [run['id'] for run in history.search("nurse shift")] == [nurse]
+    assert history.count("nurse pipelines") == 0
+    assert history.count() == 2
+    assert history.search('"(unbalanced') == []
+
+
+def test_iter_runs_pages_through_every_run_in_order(history):
+    ids = [_add(history) for _ in range(5)]
+    assert [run['id'] for run in history.iter_runs(batch_size=2)] == ids
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from telemetry import TelemetryLog, estimate_cost, percentile
+
+
+@pytest.fixture
+def log(tmp_path):
+    return TelemetryLog(str(tmp_path / 'telemetry.db'))
+
+
+def test_estimate_cost_uses_base_model_pricing_for_snapshots():
+    assert estimate_cost('gpt-4o-mini', 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost('gpt-4o-2024-08-06', 0, 1_000_000) == pytest.approx(10.0)
+    assert estimate_cost('llama-3.1-8b-instruct', 100, 100) is None
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 0.5) is None
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile([float(value) for value in range(1, 101)], 0.95) == 95.0
+    assert percentile([5.0], 0.99) == 5.0
+
+
+def test_totals_are_per_session_or_overall(log):
+    usage = {'prompt_tokens': 100, 'completion_tokens': 50}
+    log.record('a', 'enhancement', 'gpt-4o-mini', 1.0, usage)
+    log.record('a', 'skills', 'gpt-4o-mini', 0.5, usage, cached=True)
+    log.record('a', 'skills', 'gpt-4o-mini', 0.1, error="timeout")
+    log.record('b', 'skills', 'gpt-4o-mini', 0.2, usage)
+    totals = log.totals('a')
+    assert totals == {'calls': 3, 'cached_calls': 1, 'errors': 1, 'prompt_tokens': 200,
+                      'completion_tokens': 100, 'cost': pytest.approx(estimate_cost('gpt-4o-mini', 100, 50))}
+    assert log.totals()['calls'] == 4
+    assert log.totals('nobody') == {'calls': 0, 'cached_calls': 0, 'errors': 0, 'prompt_tokens': 0,
+                                    'completion_tokens': 0, 'cost': 0.0}
+
+
+def test_step_summary_matches_percentiles_of_live_calls(log):
+    rng = random.Random(7)
+    latencies = {'enhancement': [rng.uniform(0.5, 3.0) for _ in range(37)],
+                 'skills': [rng.uniform(0.1, 1.0) for _ in range(5)]}
+    for step, values in latencies.items():
+        for latency in values:
+            log.record('s', step, 'gpt-4o-mini', latency, {'prompt_tokens': 10, 'completion_tokens': 5}, retries=1)
+    # Cached and failed calls count but don't shape the latency percentiles
+    log.record('s', 'skills', 'gpt-4o-mini', 99.0, cached=True)
+    log.record('s', 'skills', 'gpt-4o-mini', 99.0, error="boom")
+    log.record('s', None, 'gpt-4o-mini', 99.0, cached=True)
+
+    summary = {row['step']: row for row in log.step_summary('s')}
+    assert list(summary) == ['enhancement', 'skills', 'unknown']
+    for step, values in latencies.items():
+        for fraction in (0.50, 0.95, 0.99):
+            assert summary[step][f"p{round(fraction * 100)}_latency_s"] == percentile(values, fraction)
+    skills = summary['skills']
+    assert (skills['calls'], skills['cached'], skills['errors'], skills['retries']) == (7, 1, 1, 5)
+    assert (skills['prompt_tokens'], skills['completion_tokens']) == (50, 25)
+    assert summary['unknown']['p50_latency_s'] is None
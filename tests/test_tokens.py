@@ -0,0 +1,142 @@
+import pytest
+
+import tokens
+from extraction import EXTRACTION_SYSTEM_PROMPTS, plan_extraction_chunks
+from prompts import (
+    DEFAULT_PROMPT_TEMPLATES,
+    RESPONSIBILITIES_EXCERPT_TOKENS,
+    extraction_prompt_values,
+    render_prompt,
+    responsibilities_excerpt_truncated
+)
+from tokens import (
+    DEFAULT_CONTEXT_WINDOW,
+    SAFETY_MARGIN_TOKENS,
+    chunk_text,
+    context_window,
+    count_message_tokens,
+    count_tokens,
+    fit_max_tokens,
+    plan_call,
+    truncate_to_tokens
+)
+
+COMPANY_CONTEXT = {'name': "Acme", 'industry': "Retail", 'company_size': "", 'headquarters': ""}
+
+
+def _paragraphs(count: int, words: int = 40) -> str:
+    return '\n\n'.join(' '.join(f"word{paragraph}x{index}" for index in range(words)) for paragraph in range(count))
+
+
+def test_context_window_matches_dated_snapshots():
+    assert context_window('gpt-4o-mini') == 128000
+    assert context_window('gpt-4o-mini-2024-07-18') == 128000
+    assert context_window('gpt-3.5-turbo-0125') == 16385
+    assert context_window('some-local-model') == DEFAULT_CONTEXT_WINDOW
+
+
+def test_short_text_is_one_chunk():
+    text = "A short job description."
+    assert chunk_text(text, 100) == [text]
+
+
+def test_chunks_fit_the_budget_and_keep_every_paragraph():
+    text = _paragraphs(12)
+    chunks = chunk_text(text, 200)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert '\n\n'.join(chunks) == text
+
+
+def test_oversized_paragraph_is_split_by_lines_then_words():
+    lines = '\n'.join(' '.join(f"l{line}w{index}" for index in range(30)) for line in range(10))
+    chunks = chunk_text(lines, 80)
+    assert all(count_tokens(chunk) <= 80 for chunk in chunks)
+    assert '\n'.join(chunks) == lines
+
+    words = ' '.join(f"w{index}" for index in range(500))
+    chunks = chunk_text(words, 50)
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert ' '.join(chunks) == words
+
+
+def test_chunking_needs_a_positive_budget():
+    with pytest.raises(ValueError):
+        chunk_text("text", 0)
+
+
+def test_truncate_prefers_a_paragraph_boundary():
+    text = _paragraphs(5)
+    truncated = truncate_to_tokens(text, 150)
+    assert count_tokens(truncated) <= 150
+    assert text.startswith(truncated) and truncated.endswith("x39")
+
+
+def test_plan_call_and_fit_max_tokens():
+    prompt = _paragraphs(30)
+    input_tokens = plan_call('gpt-3.5-turbo', "system", prompt, 0)['input_tokens']
+    plan = plan_call('gpt-3.5-turbo', "system", prompt, 16385 - input_tokens + 100)
+    assert plan['context_window'] == 16385
+    assert not plan['fits'] and plan['input_fits']
+    assert fit_max_tokens(plan) == plan['available_output'] == 16385 - input_tokens - SAFETY_MARGIN_TOKENS
+
+    small = plan_call('gpt-4o-mini', "system", _paragraphs(30), 500, window=1000)
+    assert small['context_window'] == 1000
+    assert fit_max_tokens(small) is None
+
+
+def test_extraction_chunks_fit_the_smallest_window():
+    templates = {name: DEFAULT_PROMPT_TEMPLATES[f"{name}_prompt"]
+                 for name in ('base_info', 'skills', 'responsibilities')}
+    text = _paragraphs(60)
+    assert plan_extraction_chunks(templates, text, COMPANY_CONTEXT, 'gpt-4o-mini', 1000) == [text]
+
+    chunks = plan_extraction_chunks(templates, text, COMPANY_CONTEXT, 'gpt-4o-mini', 1000, window=4096)
+    assert len(chunks) > 1
+    assert '\n\n'.join(chunks) == text
+    for chunk in chunks:
+        values = extraction_prompt_values(chunk, COMPANY_CONTEXT, excerpt_tokens=None)
+        for name, template in templates.items():
+            input_tokens = count_message_tokens([
+                {'role': 'system', 'content': EXTRACTION_SYSTEM_PROMPTS[name]},
+                {'role': 'user', 'content': render_prompt(template, values)}
+            ])
+            assert input_tokens + 1000 <= 4096
+
+
+def test_responsibilities_excerpt_is_truncated_only_outside_chunks():
+    text = _paragraphs(40)
+    assert responsibilities_excerpt_truncated(text)
+    assert not responsibilities_excerpt_truncated(_paragraphs(2))
+    excerpt = extraction_prompt_values(text, COMPANY_CONTEXT)['enhanced_text_excerpt']
+    assert count_tokens(excerpt) <= RESPONSIBILITIES_EXCERPT_TOKENS and text.startswith(excerpt)
+    assert extraction_prompt_values(text, COMPANY_CONTEXT, excerpt_tokens=None)['enhanced_text_excerpt'] == text
+
+
+def test_extraction_chunks_reject_a_window_too_small_for_the_prompts():
+    templates = {'skills': DEFAULT_PROMPT_TEMPLATES['skills_prompt']}
+    with pytest.raises(ValueError):
+        plan_extraction_chunks(templates, _paragraphs(5), COMPANY_CONTEXT, 'gpt-4o-mini', 1000, window=1200)
+
+
+def test_encodings_are_not_downloaded(tmp_path, monkeypatch):
+    loaded = []
+
+    class FakeTiktoken:
+        @staticmethod
+        def encoding_name_for_model(model):
+            raise KeyError(model)
+
+        @staticmethod
+        def get_encoding(name):
+            loaded.append(name)
+            return None
+
+    monkeypatch.setattr(tokens, 'tiktoken', FakeTiktoken)
+    monkeypatch.setenv('TIKTOKEN_CACHE_DIR', str(tmp_path))
+    tokens._get_encoding.cache_clear()
+    try:
+        assert tokens._get_encoding('gpt-4o-mini') is None
+        assert loaded == []
+    finally:
+        tokens._get_encoding.cache_clear()
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from validation import BASE_INFO_FIELDS, parse_extraction, repair_json, validate_extraction
+
+SKILL = {'skill_name': "Python", 'skill_type': "technical", 'proficiency_level': "Expert"}
+
+
+@pytest.mark.parametrize('text', [
+    '{"a": [1, 2]}',
+    '```json\n{"a": [1, 2]}\n```',
+    'Here is the result:\n{"a": [1, 2]}\nHope this helps!',
+    '{"a": [1, 2,],}',
+    '{“a”: [1, 2]}'
+])
+def test_repair_json_recovers_common_defects(text):
+    value, repaired = repair_json(text)
+    assert value == {'a': [1, 2]}
+    assert repaired == (text != '{"a": [1, 2]}')
+
+
+@pytest.mark.parametrize('text', [None, '', 'no json here', '{"a": '])
+def test_repair_json_gives_up_on_unparseable_text(text):
+    assert repair_json(text) == (None, False)
+
+
+def test_base_info_is_normalized_with_missing_fields_as_null():
+    parsed = parse_extraction('base_info', json.dumps({'job_title': "Engineer", 'seniority_level': "senior level"}))
+    assert parsed['errors'] == []
+    assert set(parsed['data']) == set(BASE_INFO_FIELDS)
+    assert parsed['data']['seniority_level'] == "Senior Level"
+    assert parsed['data']['location'] is None
+
+
+@pytest.mark.parametrize('base_info, problem', [
+    ([], "expected a JSON object"),
+    ({'location': 3}, "location"),
+    ({'job_title': [1, 2]}, "job_title"),
+    ({'experience_range': "5-8 years"}, "experience_range"),
+    ({'experience_range': {'min': -1, 'max': 3}}, "experience_range.min"),
+    ({'experience_range': {'min': 8, 'max': 5}}, "must not exceed"),
+    ({'seniority_level': "Senior"}, "seniority_level")
+])
+def test_base_info_field_checks(base_info, problem):
+    errors = validate_extraction('base_info', base_info)
+    assert any(problem in error for error in errors), errors
+
+
+def test_base_info_accepts_lists_and_open_experience_ranges():
+    base_info = {'job_title': ["Engineer", "Developer"], 'required_qualifications': "BS",
+                 'experience_range': {'min': 5, 'max': None}, 'seniority_level': None}
+    assert validate_extraction('base_info', base_info) == []
+
+
+def test_skill_enums_are_checked_and_canonicalized():
+    parsed = parse_extraction('skills', json.dumps([
+        SKILL, {'skill_name': "Go", 'skill_type': "Technical", 'proficiency_level': "advanced"},
+        {'skill_name': "Writing"}
+    ]))
+    assert parsed['errors'] == []
+    assert parsed['data'][1] == {'skill_name': "Go", 'skill_type': "technical", 'proficiency_level': "Advanced"}
+    assert parsed['data'][2] == {'skill_name': "Writing"}
+
+
+@pytest.mark.parametrize('skill, problem', [
+    ("Python", "non-empty skill_name"),
+    ({'skill_name': " "}, "non-empty skill_name"),
+    ({**SKILL, 'skill_type': "hard"}, "skill_type"),
+    ({**SKILL, 'proficiency_level': "Guru"}, "proficiency_level")
+])
+def test_skill_field_checks(skill, problem):
+    errors = validate_extraction('skills', [SKILL, skill])
+    assert len(errors) == 1 and errors[0].startswith("item 1") and problem in errors[0]
+
+
+def test_responsibilities_must_be_non_empty_strings():
+    assert validate_extraction('responsibilities', ["Lead the team", "Ship features"]) == []
+    assert validate_extraction('responsibilities', {'a': 1}) == ["expected a JSON array"]
+    assert validate_extraction('responsibilities', ["Lead", "", 3]) == [
+        "item 1 must be a non-empty string", "item 2 must be a non-empty string"
+    ]
+
+
+def test_parse_extraction_reports_repairs_and_failures():
+    parsed = parse_extraction('responsibilities', '```json\n["Lead the team",]\n```')
+    assert parsed == {'data': ["Lead the team"], 'errors': [], 'repaired': True}
+    assert parse_extraction('skills', "not json") == {
+        'data': None, 'errors': ["response is not valid JSON"], 'repaired': False
+    }
+    invalid = parse_extraction('skills', '[{"skill_type": "soft"}]')
+    assert invalid['data'] is None and invalid['errors']
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from benchmarks.mock_server import MockOpenAIServer, MockSettings
+from llm import create_client
+from prompts import DEFAULT_PROMPT_TEMPLATES
+from run_history import RunHistory
+from workspace import ITEM_DONE, jds_from_upload, run_workspace, split_pasted_jds, unique_ids
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL = 'gpt-4o-mini'
+COMPANY_CONTEXT = {'name': "TechCorp Inc.", 'industry': "Software", 'company_size': "", 'headquarters': ""}
+
+with open(os.path.join(REPO_DIR, 'sample_jd.txt'), 'r', encoding='utf-8') as f:
+    SAMPLE_JD = f.read()
+EDITED_JD = SAMPLE_JD.replace("San Francisco", "Oakland", 1)
+
+
+@pytest.fixture
+def server():
+    with MockOpenAIServer(MockSettings(latency=0)) as server:
+        yield server
+
+
+@pytest.fixture
+def history(tmp_path):
+    return RunHistory(str(tmp_path / 'runs.db'))
+
+
+def _run(server, history, items, **options):
+    client = create_client('sk-test', max_retries=0, base_url=server.base_url)
+    records = run_workspace(client, items, COMPANY_CONTEXT, DEFAULT_PROMPT_TEMPLATES, MODEL, 0.1, 1000,
+                            history=history, **options)
+    return {record['id']: record for record in records}
+
+
+def test_split_and_dedupe_pasted_jds():
+    assert split_pasted_jds("First JD\n---\nSecond JD\n  -----  \n\n") == ["First JD", "Second JD"]
+    items = unique_ids([{'id': "pasted"}, {'id': "pasted"}, {'id': "other"}])
+    assert [item['id'] for item in items] == ["pasted", "pasted #2", "other"]
+
+
+def test_jsonl_upload_has_one_item_per_line():
+    content = '{"id": "a", "text": "JD a"}\n\n{"jd_text": "JD b", "company_context": {"name": "B"}}\n'
+    items = jds_from_upload("jds.jsonl", content)
+    assert items == [{'id': "a", 'text': "JD a", 'company_context': None},
+                     {'id': "jds.jsonl:3", 'text': "JD b", 'company_context': {'name': "B"}}]
+    assert jds_from_upload("jd.txt", "JD") == [{'id': "jd.txt", 'text': "JD"}]
+
+
+def test_processed_jds_are_answered_from_history(server, history):
+    first = _run(server, history, [{'id': "a", 'text': SAMPLE_JD}])
+    assert first['a']['status'] == ITEM_DONE and not first['a'].get('from_history')
+    requests = server.settings.requests
+
+    again = _run(server, history, [{'id': "a", 'text': SAMPLE_JD}])
+    assert again['a']['from_history'] and again['a']['history_id'] == first['a']['history_id']
+    assert again['a']['extraction_results'] == first['a']['extraction_results']
+    assert server.settings.requests == requests
+
+    bypassed = _run(server, history, [{'id': "a", 'text': SAMPLE_JD}], bypass_cache=True)
+    assert not bypassed['a'].get('from_history')
+    assert server.settings.requests > requests
+
+
+def test_near_duplicates_are_labelled_and_reused_only_on_request(server, history):
+    stored_id = _run(server, history, [{'id': "a", 'text': SAMPLE_JD}])['a']['history_id']
+    requests = server.settings.requests
+
+    labelled = _run(server, history, [{'id': "b", 'text': EDITED_JD}], reuse_similar=0.8)['b']
+    assert labelled['similar_to'].startswith(f"#{stored_id} (") and not labelled.get('from_history')
+    assert server.settings.requests > requests
+
+    reused = _run(server, history, [{'id': "c", 'text': EDITED_JD.replace("Oakland", "Berkeley", 1)}],
+                  reuse_similar=0.8, reuse_stored_similar=True)['c']
+    assert reused['from_history']
+
+
+def test_near_duplicates_made_on_other_routes_are_not_reused(server, history):
+    stored_id = history.add(SAMPLE_JD, COMPANY_CONTEXT, DEFAULT_PROMPT_TEMPLATES, MODEL, 0.1, 1000, "Enhanced",
+                            {'base_info': {}, 'skills': [], 'responsibilities': []},
+                            routes={'skills': "local/llama-3.1-8b-instruct"})
+    record = _run(server, history, [{'id': "b", 'text': EDITED_JD}],
+                  reuse_similar=0.8, reuse_stored_similar=True)['b']
+    assert record['similar_to'].startswith(f"#{stored_id} (") and record['similar_to'].endswith(", different routes)")
+    assert not record.get('from_history')
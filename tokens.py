@@ -0,0 +1,219 @@
+import hashlib
+import math
+import os
+import re
+import tempfile
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window (input + output tokens) per model
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4o-mini': 128000,
+    'gpt-4o': 128000,
+    'gpt-3.5-turbo': 16385
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat formatting overhead: tokens per message plus the reply primer
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMER_TOKENS = 3
+
+# Headroom kept free so estimation error never pushes a call over the window
+SAFETY_MARGIN_TOKENS = 256
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]|\n", re.UNICODE)
+
+# BPE files tiktoken downloads per encoding; they are only used when already cached
+FALLBACK_ENCODING = "o200k_base"
+ENCODING_FILES = {
+    'o200k_base': "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+    'cl100k_base': "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+}
+
+
+def context_window(model: str) -> int:
+    """Context window size for a model, matching dated snapshots to their base model"""
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def _encoding_cached(name: str) -> bool:
+    """Whether tiktoken's cache already holds an encoding's BPE file, mirroring where tiktoken looks"""
+    if name not in ENCODING_FILES:
+        return False
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        # An empty cache dir turns caching off, so every load would download
+        return False
+    cache_key = hashlib.sha1(ENCODING_FILES[name].encode()).hexdigest()
+    return os.path.exists(os.path.join(cache_dir, cache_key))
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Load a tiktoken encoding from its local cache, or None to use the estimator
+
+    tiktoken downloads missing BPE files on first use, which would block
+    token counting on the network; an encoding is only loaded when its file
+    is already in tiktoken's cache (TIKTOKEN_CACHE_DIR), otherwise the
+    offline estimator is used.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        name = FALLBACK_ENCODING
+    except Exception:
+        return None
+    if not _encoding_cached(name):
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    """Offline BPE approximation: ~4 characters per token per word, one per symbol
+
+    It overestimates typical English text by roughly a quarter, which is the
+    safe side for budgeting.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE_PATTERN.findall(text))
+
+
+@lru_cache(maxsize=128)
+def _count_tokens_cached(text: str, model: str) -> int:
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _estimate_tokens(text)
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count the tokens in a piece of text locally, without any network call
+
+    Counts are memoized, so the same JD or prompt isn't re-tokenized on
+    every UI rerun.
+    """
+    if not text:
+        return 0
+    return _count_tokens_cached(text, model)
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "gpt-4o-mini") -> int:
+    """Count the input tokens of a chat request, including formatting overhead"""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(message['content'], model) for message in messages) \
+        + REPLY_PRIMER_TOKENS
+
+
+def plan_call(model: str, system_prompt: str, user_prompt: str, max_tokens: int,
+              window: Optional[int] = None) -> Dict[str, Any]:
+    """Budget a chat call against the model's context window before sending it
+
+    Returns the input token count, the window, whether input plus max_tokens
+    fits, and the largest max_tokens that would fit. window overrides the
+    model's known window, e.g. for a local backend's model.
+    """
+    input_tokens = count_message_tokens(
+        [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+        model
+    )
+    return plan_tokens(model, input_tokens, max_tokens, window)
+
+
+def plan_tokens(model: str, input_tokens: int, max_tokens: int, window: Optional[int] = None) -> Dict[str, Any]:
+    """Budget a call whose input token count is already known; see plan_call"""
+    window = window or context_window(model)
+    available_output = window - input_tokens - SAFETY_MARGIN_TOKENS
+    return {
+        'input_tokens': input_tokens,
+        'max_tokens': max_tokens,
+        'context_window': window,
+        'fits': input_tokens + max_tokens + SAFETY_MARGIN_TOKENS <= window,
+        'input_fits': available_output > 0,
+        'available_output': max(0, available_output)
+    }
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut text to at most max_tokens, preferring a paragraph or line boundary"""
+    return chunk_text(text, max_tokens, model)[0]
+
+
+def _split_oversized(piece: str, max_tokens: int, model: str) -> List[str]:
+    """Split a single paragraph that exceeds the budget by lines, then by words"""
+    separator = '\n' if '\n' in piece else ' '
+    parts = piece.split(separator)
+    if separator == ' ' and len(parts) == 1:
+        # One enormous token-like run: fall back to a character split
+        step = max(1, max_tokens * 3)
+        return [piece[i:i + step] for i in range(0, len(piece), step)]
+    return _pack(parts, separator, max_tokens, model)
+
+
+def _pack(parts: List[str], separator: str, max_tokens: int, model: str) -> List[str]:
+    """Greedily pack parts into chunks of at most max_tokens"""
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    separator_tokens = max(1, count_tokens(separator, model))
+    for part in parts:
+        part_tokens = count_tokens(part, model)
+        if part_tokens > max_tokens:
+            if current:
+                chunks.append(separator.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_split_oversized(part, max_tokens, model))
+            continue
+        if current and current_tokens + separator_tokens + part_tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += part_tokens + (separator_tokens if len(current) > 1 else 0)
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> List[str]:
+    """Split text into chunks of at most max_tokens along paragraph boundaries"""
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive to chunk text")
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+    paragraphs = [paragraph for paragraph in re.split(r'\n\s*\n', text) if paragraph.strip()]
+    return _pack(paragraphs, '\n\n', max_tokens, model)
+
+
+def describe_plan(plan: Dict[str, Any]) -> str:
+    """One-line summary of a call budget for display"""
+    return (f"{plan['input_tokens']:,} input + {plan['max_tokens']:,} max output tokens "
+            f"of a {plan['context_window']:,}-token window")
+
+
+def tokenizer_name(model: str) -> str:
+    """Name of the tokenizer used for a model, for display"""
+    return "tiktoken" if _get_encoding(model) is not None else "local estimator"
+
+
+def fit_max_tokens(plan: Dict[str, Any]) -> Optional[int]:
+    """Largest max_tokens that fits the window, or None if the input alone doesn't fit"""
+    if not plan['input_fits']:
+        return None
+    return min(plan['max_tokens'], plan['available_output'])
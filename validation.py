@@ -0,0 +1,179 @@
+import json
+import re
+from typing import Dict, Any, List, Optional
+
+# Fields the base info prompt asks for; missing ones are filled with null
+BASE_INFO_FIELDS = (
+    'job_title', 'job_code', 'job_level', 'department', 'job_function', 'jd_industry',
+    'experience_range', 'job_summary', 'required_qualifications', 'seniority_level', 'location'
+)
+# Base info fields holding one string, and those the prompts allow as a string or a list of them
+BASE_INFO_TEXT_FIELDS = ('job_code', 'job_level', 'department', 'job_function', 'job_summary', 'location')
+BASE_INFO_TEXT_OR_LIST_FIELDS = ('job_title', 'jd_industry', 'required_qualifications')
+
+# Allowed values the prompts spell out; matched case-insensitively and stored in this casing
+SENIORITY_LEVELS = (
+    'Internship', 'Entry Level', 'Junior', 'Junior to Mid', 'Mid Level', 'Mid - Senior', 'Senior Level', 'CXO'
+)
+SKILL_TYPES = ('technical', 'domain', 'soft')
+PROFICIENCY_LEVELS = ('Beginner', 'Intermediate', 'Advanced', 'Expert')
+
+_FENCE_PATTERN = re.compile(r'^\s*```[\w-]*[ \t]*\n?|\n?[ \t]*```\s*$')
+_TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding ```json ... ``` fence, if any"""
+    return _FENCE_PATTERN.sub('', text.strip())
+
+
+def _outermost_json(text: str) -> Optional[str]:
+    """Cut out the span from the first opening bracket to the last closing one"""
+    starts = [index for index in (text.find('{'), text.find('[')) if index >= 0]
+    if not starts:
+        return None
+    start = min(starts)
+    end = max(text.rfind('}'), text.rfind(']'))
+    return text[start:end + 1] if end > start else None
+
+
+def repair_json(text: Optional[str]):
+    """Parse model output as JSON, repairing common defects locally
+
+    Tries, in order: the text as-is, without code fences, the outermost
+    bracketed span (dropping surrounding prose), and that span with trailing
+    commas and typographic double quotes fixed. Returns (value, repaired),
+    or (None, False) when nothing parses.
+    """
+    if not text:
+        return None, False
+    try:
+        return json.loads(text), False
+    except ValueError:
+        pass
+
+    candidates = [strip_code_fences(text)]
+    span = _outermost_json(candidates[0])
+    if span is not None:
+        candidates.append(span)
+        candidates.append(_TRAILING_COMMA_PATTERN.sub(r'\1', span.translate(_SMART_QUOTES)))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), True
+        except ValueError:
+            continue
+    return None, False
+
+
+def _canonical(value: Any, allowed) -> Optional[str]:
+    """The allowed value matching value case-insensitively, or None"""
+    if not isinstance(value, str):
+        return None
+    matches = [option for option in allowed if option.lower() == value.strip().lower()]
+    return matches[0] if matches else None
+
+
+def _is_text_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _is_years(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def _validate_base_info(value: Any) -> List[str]:
+    if not isinstance(value, dict):
+        return ["expected a JSON object"]
+    errors = []
+    for field in BASE_INFO_TEXT_FIELDS:
+        if value.get(field) is not None and not isinstance(value[field], str):
+            errors.append(f"{field} must be a string or null")
+    for field in BASE_INFO_TEXT_OR_LIST_FIELDS:
+        if value.get(field) is not None and not isinstance(value[field], str) and not _is_text_list(value[field]):
+            errors.append(f"{field} must be a string, a list of strings or null")
+
+    experience = value.get('experience_range')
+    if experience is not None:
+        if not isinstance(experience, dict):
+            errors.append("experience_range must be an object with min and max")
+        else:
+            bounds = {bound: experience.get(bound) for bound in ('min', 'max')}
+            for bound, years in bounds.items():
+                if years is not None and not _is_years(years):
+                    errors.append(f"experience_range.{bound} must be a non-negative number of years or null")
+            if all(_is_years(years) for years in bounds.values()) and bounds['min'] > bounds['max']:
+                errors.append("experience_range.min must not exceed experience_range.max")
+
+    seniority = value.get('seniority_level')
+    if seniority is not None and _canonical(seniority, SENIORITY_LEVELS) is None:
+        errors.append(f"seniority_level must be one of: {', '.join(SENIORITY_LEVELS)}")
+    return errors
+
+
+def _validate_skill(index: int, item: Any) -> List[str]:
+    if not isinstance(item, dict) or not isinstance(item.get('skill_name'), str) or not item['skill_name'].strip():
+        return [f"item {index} must be an object with a non-empty skill_name"]
+    errors = []
+    for field, allowed in (('skill_type', SKILL_TYPES), ('proficiency_level', PROFICIENCY_LEVELS)):
+        if item.get(field) is not None and _canonical(item[field], allowed) is None:
+            errors.append(f"item {index} {field} must be one of: {', '.join(allowed)}")
+    return errors
+
+
+def validate_extraction(name: str, value: Any) -> List[str]:
+    """Check a parsed extraction's fields and allowed values; returns the problems found
+
+    Base info fields must have the types the prompt asks for, with
+    experience_range as {min, max} years and seniority_level from its fixed
+    list. Skills need a skill_name, and skill_type and proficiency_level,
+    when given, must be one of the prompt's values. Responsibilities must be
+    non-empty strings. Counts (8-10 skills, 6 responsibilities) are left to
+    the evaluation, not enforced here.
+    """
+    if name == 'base_info':
+        return _validate_base_info(value)
+
+    if not isinstance(value, list):
+        return ["expected a JSON array"]
+    errors = []
+    for index, item in enumerate(value):
+        if name == 'skills':
+            errors.extend(_validate_skill(index, item))
+        elif not isinstance(item, str) or not item.strip():
+            errors.append(f"item {index} must be a non-empty string")
+    return errors
+
+
+def normalize_extraction(name: str, value: Any) -> Any:
+    """Fill missing base info fields with null and put enum values in their canonical casing"""
+    if name == 'base_info':
+        value = {**{field: None for field in BASE_INFO_FIELDS}, **value}
+        if value['seniority_level'] is not None:
+            value['seniority_level'] = _canonical(value['seniority_level'], SENIORITY_LEVELS)
+        return value
+    if name == 'skills':
+        skills = []
+        for item in value:
+            item = dict(item)
+            for field, allowed in (('skill_type', SKILL_TYPES), ('proficiency_level', PROFICIENCY_LEVELS)):
+                if item.get(field) is not None:
+                    item[field] = _canonical(item[field], allowed)
+            skills.append(item)
+        return skills
+    return value
+
+
+def parse_extraction(name: str, text: Optional[str]) -> Dict[str, Any]:
+    """Parse, repair and validate one extraction's raw output
+
+    Returns {'data', 'errors', 'repaired'}; data is None unless the output
+    parsed and passed validation.
+    """
+    value, repaired = repair_json(text)
+    if value is None:
+        return {'data': None, 'errors': ["response is not valid JSON"], 'repaired': False}
+    errors = validate_extraction(name, value)
+    if errors:
+        return {'data': None, 'errors': errors, 'repaired': repaired}
+    return {'data': normalize_extraction(name, value), 'errors': [], 'repaired': repaired}
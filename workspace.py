@@ -0,0 +1,161 @@
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+from llm import route_labels
+from pipeline import process_jd
+from prompts import merge_company_context
+
+# A line holding only dashes separates job descriptions in pasted text
+_PASTE_SEPARATOR = re.compile(r'^\s*-{3,}\s*$', re.MULTILINE)
+
+ITEM_QUEUED = 'queued'
+ITEM_ENHANCING = 'enhancing'
+ITEM_EXTRACTING = 'extracting'
+ITEM_DONE = 'ok'
+ITEM_FAILED = 'error'
+
+
+def split_pasted_jds(text: str) -> List[str]:
+    """Split pasted text into job descriptions on lines of three or more dashes"""
+    return [part.strip() for part in _PASTE_SEPARATOR.split(text) if part.strip()]
+
+
+def jds_from_upload(file_name: str, content: str) -> List[Dict[str, Any]]:
+    """Job descriptions in one uploaded file: one per JSONL line, otherwise the whole file"""
+    if not file_name.endswith('.jsonl'):
+        return [{'id': file_name, 'text': content}]
+    items = []
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        items.append({
+            'id': str(record.get('id', f"{file_name}:{line_number}")),
+            'text': record.get('text') or record.get('jd_text') or '',
+            'company_context': record.get('company_context')
+        })
+    return items
+
+
+def unique_ids(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Suffix repeated ids (#2, #3, ...) so every item can be tracked separately"""
+    seen: Dict[str, int] = {}
+    unique = []
+    for item in items:
+        count = seen.get(item['id'], 0) + 1
+        seen[item['id']] = count
+        unique.append({**item, 'id': item['id'] if count == 1 else f"{item['id']} #{count}"})
+    return unique
+
+
+def run_workspace(client, items: List[Dict[str, Any]], company_context: Dict[str, str],
+                  templates: Dict[str, str], model: str, temperature: float, max_tokens: int,
+                  concurrency: int = 4, statuses: Optional[Dict[str, str]] = None,
+                  should_stop: Optional[Callable[[], bool]] = None, cache=None,
+                  bypass_cache: bool = False, max_retries: int = 0,
+                  recorder=None, history=None,
+                  reuse_similar: Optional[float] = None,
+                  reuse_stored_similar: bool = False) -> Iterator[Dict[str, Any]]:
+    """Run Step 1 and Step 2 for many job descriptions with bounded concurrency
+
+    Yields one record per JD as it finishes: the process_jd result plus id,
+    status and error. statuses, if given, is kept up to date with each JD's
+    stage (queued, enhancing, extracting, ok, error) for progress display;
+    should_stop is checked before each JD starts. With a run history, JDs
+    already processed with the same inputs are answered from it (unless
+    bypass_cache is set) and new results are added to it. JDs at least
+    reuse_similar similar to a stored run are labelled with it (similar_to);
+    with reuse_stored_similar they are also answered from it, but only when
+    that run was made with the same prompts, model, routes and settings.
+    """
+    statuses = statuses if statuses is not None else {}
+    routes = route_labels(client)
+    for item in items:
+        statuses[item['id']] = ITEM_QUEUED
+
+    def process(item: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        record = {'id': item['id']}
+        if should_stop is not None and should_stop():
+            statuses[item['id']] = ITEM_FAILED
+            return {**record, 'status': ITEM_FAILED, 'error': 'Cancelled', 'elapsed': 0.0}
+        jd_context = merge_company_context(company_context, item.get('company_context'))
+        if history is not None and not bypass_cache:
+            stored = history.find(item['text'], jd_context, templates, model, temperature, max_tokens, routes)
+            if stored is None and reuse_similar is not None:
+                inputs = {'company_context': jd_context, 'templates': templates, 'model': model,
+                          'temperature': temperature, 'max_tokens': max_tokens, 'routes': routes}
+                matches = history.similar(item['text'], reuse_similar, limit=1, inputs=inputs)
+                if matches:
+                    match = matches[0]
+                    record['similar_to'] = f"#{match['id']} ({match['similarity']:.0%}" + (
+                        f", different {', '.join(match['differences'])})" if match['differences'] else ")"
+                    )
+                    if reuse_stored_similar and not match['differences']:
+                        stored = history.get(match['id'])
+            if stored is not None:
+                statuses[item['id']] = ITEM_DONE
+                return {
+                    **record, 'status': ITEM_DONE, 'error': None, 'history_id': stored['id'], 'from_history': True,
+                    'enhanced_text': stored['enhanced_text'], 'extraction_results': stored['extraction_results'],
+                    'repaired': {}, 'timings': stored['timings'], 'elapsed': time.perf_counter() - started
+                }
+        statuses[item['id']] = ITEM_ENHANCING
+
+        def track(event: Dict[str, Any]):
+            if event['step'] == 'enhancement' and not event['error']:
+                statuses[item['id']] = ITEM_EXTRACTING
+            if recorder is not None:
+                recorder(event)
+
+        try:
+            result = process_jd(
+                client, item['text'], jd_context, templates,
+                model, temperature, max_tokens, cache=cache, bypass_cache=bypass_cache,
+                max_retries=max_retries, recorder=track
+            )
+            record.update({'status': ITEM_DONE, 'error': None, **result})
+            if history is not None:
+                record['history_id'] = history.add(
+                    item['text'], jd_context, templates, model, temperature, max_tokens,
+                    result['enhanced_text'], result['extraction_results'], result['timings'],
+                    source='workspace', routes=routes
+                )
+        except Exception as e:
+            record.update({'status': ITEM_FAILED, 'error': str(e)})
+        record['elapsed'] = time.perf_counter() - started
+        statuses[item['id']] = record['status']
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(process, item) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def workspace_table(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One summary row per processed JD for the results table"""
+    rows = []
+    for record in records:
+        results = record.get('extraction_results') or {}
+        base_info = results.get('base_info') or {}
+        skills = results.get('skills') or []
+        title = base_info.get('job_title')
+        rows.append({
+            'id': record['id'],
+            'status': record['status'],
+            'job_title': ', '.join(title) if isinstance(title, list) else title,
+            'seniority_level': base_info.get('seniority_level'),
+            'location': base_info.get('location'),
+            'skills': len(skills),
+            'top_skills': ', '.join(skill['skill_name'] for skill in skills[:3]),
+            'responsibilities': len(results.get('responsibilities') or []),
+            'elapsed_s': round(record.get('elapsed', 0.0), 2),
+            'from_history': record.get('from_history', False),
+            'similar_to': record.get('similar_to'),
+            'error': record.get('error')
+        })
+    return rows